@@ -0,0 +1,161 @@
+"""
+Local stand-in for the GitHub REST API, serving a synthetic star graph.
+
+Only the endpoints used by GitHubAPI are served, with the GitHub pagination
+(`Link` header) and rate-limit headers, behind a configurable latency.
+"""
+
+import asyncio
+import bisect
+import itertools
+import random
+from dataclasses import dataclass
+from time import time
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+
+OWNER = "bench"
+
+
+@dataclass
+class LatencyModel:
+    """
+    Log-normal latency, as observed on the GitHub API: most calls are close to the
+    median, with a long tail controlled by sigma.
+    """
+
+    median: float = 0.05
+    sigma: float = 0.5
+    seed: int = 0
+
+    def __post_init__(self):
+        self.random = random.Random(self.seed)
+
+    def sample(self) -> float:
+        if self.median <= 0:
+            return 0
+        return self.median * self.random.lognormvariate(0, self.sigma)
+
+
+class SyntheticStarGraph:
+    def __init__(
+        self,
+        nb_users: int = 5000,
+        nb_repos: int = 2000,
+        stars_per_user: int = 30,
+        seed: int = 0,
+    ):
+        """
+        Every user stars about stars_per_user repositories, picked with a Zipf
+        popularity: {OWNER}/repo0 is the most starred one, then repo1 and so on.
+        """
+        rand = random.Random(seed)
+        cum_weights = list(
+            itertools.accumulate(1 / (rank + 1) for rank in range(nb_repos))
+        )
+        self.repo_names = [f"{OWNER}/repo{rank}" for rank in range(nb_repos)]
+        self.user_logins = [f"user{i}" for i in range(nb_users)]
+        self.starred_by_user: list[list[int]] = []
+        self.stargazers_by_repo: list[list[int]] = [[] for _ in range(nb_repos)]
+        for user in range(nb_users):
+            nb_stars = max(1, int(rand.expovariate(1 / stars_per_user)))
+            starred = sorted(
+                {
+                    bisect.bisect_left(cum_weights, rand.random() * cum_weights[-1])
+                    for _ in range(nb_stars)
+                }
+            )
+            self.starred_by_user.append(starred)
+            for repo in starred:
+                self.stargazers_by_repo[repo].append(user)
+        self.repo_by_name = {name: rank for rank, name in enumerate(self.repo_names)}
+        self.user_by_login = {login: i for i, login in enumerate(self.user_logins)}
+
+
+def paginate(
+    request: Request, items: list, response: Response, per_page: int, page: int
+) -> list:
+    last_page = max(1, -(-len(items) // per_page))
+    links = []
+    if page < last_page:
+        links.append(f'<{request.url.include_query_params(page=page + 1)}>; rel="next"')
+        links.append(
+            f'<{request.url.include_query_params(page=last_page)}>; rel="last"'
+        )
+    if links:
+        response.headers["Link"] = ", ".join(links)
+    return items[(page - 1) * per_page : page * per_page]
+
+
+def create_github_stub(
+    graph: SyntheticStarGraph,
+    latency: LatencyModel | None = None,
+    rate_limit: int = 1_000_000,
+) -> FastAPI:
+    """
+    The served calls are counted in app.state.request_count
+    """
+    latency = latency or LatencyModel(median=0)
+    stub = FastAPI(default_response_class=ORJSONResponse)
+    stub.state.request_count = 0
+
+    @stub.middleware("http")
+    async def github_behaviour(request: Request, call_next):
+        stub.state.request_count += 1
+        await asyncio.sleep(latency.sample())
+        response = await call_next(request)
+        remaining = max(0, rate_limit - stub.state.request_count)
+        response.headers["X-RateLimit-Limit"] = str(rate_limit)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        response.headers["X-RateLimit-Reset"] = str(int(time()) + 3600)
+        return response
+
+    def get_repo(owner: str, repo: str) -> int:
+        if f"{owner}/{repo}" not in graph.repo_by_name:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return graph.repo_by_name[f"{owner}/{repo}"]
+
+    @stub.get("/repos/{owner}/{repo}")
+    async def get_repository(owner: str, repo: str):
+        rank = get_repo(owner, repo)
+        return {
+            "full_name": graph.repo_names[rank],
+            "stargazers_count": len(graph.stargazers_by_repo[rank]),
+        }
+
+    @stub.get("/repos/{owner}/{repo}/stargazers")
+    async def get_stargazers(
+        owner: str,
+        repo: str,
+        request: Request,
+        response: Response,
+        per_page: int = 30,
+        page: int = 1,
+    ):
+        stargazers = graph.stargazers_by_repo[get_repo(owner, repo)]
+        return [
+            {
+                "login": graph.user_logins[user],
+                "html_url": f"https://github.com/{graph.user_logins[user]}",
+            }
+            for user in paginate(request, stargazers, response, per_page, page)
+        ]
+
+    @stub.get("/users/{username}/starred")
+    async def get_starred(
+        username: str,
+        request: Request,
+        response: Response,
+        per_page: int = 30,
+        page: int = 1,
+    ):
+        if username not in graph.user_by_login:
+            raise HTTPException(status_code=404, detail="Not Found")
+        starred = graph.starred_by_user[graph.user_by_login[username]]
+        return [
+            {"full_name": graph.repo_names[rank]}
+            for rank in paginate(request, starred, response, per_page, page)
+        ]
+
+    return stub
@@ -0,0 +1,249 @@
+"""
+In-memory substitute of the redis.asyncio client, covering the commands used by
+RedisClient, so the benchmarks run without a Redis server.
+"""
+
+import fnmatch
+import pickle
+import random
+from time import monotonic
+from typing import Any
+
+from redis import WatchError
+
+from app.redis.engine import RedisClient
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.values: dict[str, Any] = {}
+        self.expires_at: dict[str, float] = {}
+
+    def _get(self, key: str) -> Any:
+        if key in self.expires_at and self.expires_at[key] <= monotonic():
+            self.values.pop(key, None)
+            del self.expires_at[key]
+        return self.values.get(key)
+
+    async def get(self, key: str) -> Any:
+        return self._get(key)
+
+    async def mget(self, keys: list[str]) -> list[Any]:
+        return [self._get(key) for key in keys]
+
+    async def set(
+        self, key: str, value: Any, ex: int | None = None, nx: bool = False
+    ) -> bool | None:
+        if nx and self._get(key) is not None:
+            return None
+        self.values[key] = value
+        await self.expire(key, ex)
+        return True
+
+    async def renamenx(self, key: str, new_key: str) -> bool:
+        if self._get(key) is None:
+            raise ValueError("ERR no such key")
+        if self._get(new_key) is not None:
+            return False
+        self.values[new_key] = self.values.pop(key)
+        if key in self.expires_at:
+            self.expires_at[new_key] = self.expires_at.pop(key)
+        return True
+
+    async def incrby(self, key: str, amount: int) -> int:
+        value = int(self._get(key) or 0) + amount
+        # Redis stores the counters as strings
+        self.values[key] = str(value)
+        return value
+
+    async def exists(self, key: str) -> int:
+        return int(self._get(key) is not None)
+
+    async def delete(self, *keys: str) -> int:
+        nb_deleted = 0
+        for key in keys:
+            self.expires_at.pop(key, None)
+            nb_deleted += self.values.pop(key, None) is not None
+        return nb_deleted
+
+    async def unlink(self, *keys: str) -> int:
+        return await self.delete(*keys)
+
+    async def memory_usage(self, key: str) -> int | None:
+        # Size of the value only, Redis adds its own overhead
+        value = self._get(key)
+        return None if value is None else len(pickle.dumps(value))
+
+    async def expire(self, key: str, ex: int | None) -> bool:
+        if ex:
+            self.expires_at[key] = monotonic() + ex
+        else:
+            self.expires_at.pop(key, None)
+        return key in self.values
+
+    async def sadd(self, key: str, *members: str) -> int:
+        members_set = self._get(key)
+        if members_set is None:
+            members_set = self.values[key] = set()
+        nb_members = len(members_set)
+        members_set.update(members)
+        return len(members_set) - nb_members
+
+    async def srem(self, key: str, *members: str) -> int:
+        members_set = self._get(key) or set()
+        nb_members = len(members_set)
+        members_set.difference_update(members)
+        return nb_members - len(members_set)
+
+    async def sscan(
+        self, key: str, cursor: int = 0, count: int | None = None
+    ) -> tuple[int, list[str]]:
+        members = sorted(self._get(key) or ())
+        next_cursor = cursor + (count or 10)
+        return (
+            next_cursor if next_cursor < len(members) else 0,
+            members[cursor:next_cursor],
+        )
+
+    async def srandmember(self, key: str, count: int) -> list[str]:
+        members = list(self._get(key) or ())
+        return random.sample(members, min(count, len(members)))
+
+    async def pttl(self, key: str) -> int:
+        if self._get(key) is None:
+            return -2
+        if key not in self.expires_at:
+            return -1
+        return int((self.expires_at[key] - monotonic()) * 1000)
+
+    async def scan(
+        self, cursor: int = 0, match: str | None = None, count: int | None = None
+    ) -> tuple[int, list[str]]:
+        keys = [key for key in list(self.values) if self._get(key) is not None]
+        if match:
+            keys = fnmatch.filter(keys, match)
+        count = count or 10
+        next_cursor = cursor + count
+        return (
+            next_cursor if next_cursor < len(keys) else 0,
+            keys[cursor:next_cursor],
+        )
+
+    async def dump(self, key: str) -> bytes | None:
+        # The serialization format differs from Redis, only restore() reads it
+        value = self._get(key)
+        return None if value is None else pickle.dumps(value)
+
+    async def restore(
+        self, key: str, ttl: int, value: bytes, replace: bool = False
+    ) -> bool:
+        if not replace and self._get(key) is not None:
+            raise ValueError("BUSYKEY Target key name already exists.")
+        self.values[key] = pickle.loads(value)
+        self.expires_at.pop(key, None)
+        if ttl:
+            self.expires_at[key] = monotonic() + ttl / 1000
+        return True
+
+    async def zincrby(self, key: str, amount: float, member: str) -> float:
+        scores = self._get(key)
+        if scores is None:
+            scores = self.values[key] = {}
+        scores[member] = scores.get(member, 0) + amount
+        return scores[member]
+
+    def _ranked_members(self, key: str) -> list[str]:
+        scores = self._get(key) or {}
+        return sorted(scores, key=lambda member: (-scores[member], member))
+
+    async def zrevrange(self, key: str, start: int, end: int) -> list[str]:
+        members = self._ranked_members(key)
+        return members[start : len(members) if end == -1 else end + 1]
+
+    async def zremrangebyrank(self, key: str, start: int, end: int) -> int:
+        # Ranks from the lowest score, negative ranks from the highest
+        members = self._ranked_members(key)[::-1]
+        removed = members[start : len(members) + end + 1 if end < 0 else end + 1]
+        scores = self._get(key) or {}
+        for member in removed:
+            del scores[member]
+        return len(removed)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def aclose(self) -> None:
+        pass
+
+    async def flushdb(self) -> bool:
+        self.values.clear()
+        self.expires_at.clear()
+        return True
+
+    def pipeline(self, transaction: bool = True) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+
+class MemoryPipeline:
+    def __init__(self, redis: MemoryRedis):
+        self.redis = redis
+        self.commands: list[Any] = []
+        # Values of the watched keys, the commands run immediately until multi()
+        self.watched: dict[str, Any] = {}
+        self.immediate = False
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.reset()
+
+    async def watch(self, *keys: str) -> bool:
+        self.watched.update((key, self.redis._get(key)) for key in keys)
+        self.immediate = True
+        return True
+
+    def multi(self) -> None:
+        self.immediate = False
+
+    async def reset(self) -> None:
+        self.commands.clear()
+        self.watched.clear()
+        self.immediate = False
+
+    def __getattr__(self, name: str):
+        command = getattr(self.redis, name)
+        if self.immediate:
+            return command
+
+        def queue(*args, **kwargs) -> "MemoryPipeline":
+            self.commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        # Any write replaces the value of a key
+        changed = any(
+            self.redis._get(key) is not value for key, value in self.watched.items()
+        )
+        try:
+            if changed:
+                raise WatchError("Watched variable changed.")
+            results = []
+            for command, args, kwargs in self.commands:
+                try:
+                    results.append(await command(*args, **kwargs))
+                except ValueError as e:
+                    if raise_on_error:
+                        raise
+                    results.append(e)
+            return results
+        finally:
+            await self.reset()
+
+
+def get_memory_redis_client(redis: MemoryRedis | None = None) -> RedisClient:
+    redis_client = RedisClient()
+    redis_client.redis_client = redis or MemoryRedis()
+    return redis_client
@@ -0,0 +1,245 @@
+"""
+Reproducible benchmarks of the /starneighbours endpoint against the GitHub stub.
+
+Every scenario runs in its own process, so the peak RSS is the one of the scenario.
+A cold query starts with an empty cache, a warm one is served from the cache primed
+by a first query. Results are compared with the stored baselines, and the command
+fails when a scenario regresses.
+
+Usage:
+    python -m app.benchmarks.run --sizes 20 100 1000 --queries 20
+    python -m app.benchmarks.run --update-baselines
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Sequence
+
+logger = logging.getLogger(__name__)
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+
+
+@dataclass
+class Scenario:
+    max_stargazers: int
+    warm: bool
+    queries: int
+    latency_median: float
+    latency_sigma: float
+    seed: int = 0
+
+    @property
+    def name(self) -> str:
+        return f"{'warm' if self.warm else 'cold'}-{self.max_stargazers}"
+
+
+class DetachedSketchIndex:
+    """
+    The sketches are updated after the response in production, they would only add
+    noise to the measured latencies
+    """
+
+    async def update(self, *_: Any) -> None:
+        return None
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+async def measure(scenario: Scenario) -> dict[str, Any]:
+    # The settings are read at import time, the benchmarks don't need real servers
+    os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    os.environ.setdefault("POSTGRES_DB", "postgresql://bench@localhost:5432/bench")
+
+    import httpx
+
+    from app.benchmarks.github_stub import (
+        LatencyModel,
+        SyntheticStarGraph,
+        create_github_stub,
+    )
+    from app.benchmarks.memory_redis import MemoryRedis, get_memory_redis_client
+    from app.main import app
+    from app.models import User
+    from app.repositories.star import get_star_repository
+    from app.routers.user import validate_api_key
+    from app.services.admission import AdmissionController, get_admission_controller
+    from app.services.github.api import GitHubAPI, get_github_api
+    from app.services.sketch import get_sketch_index
+
+    stub = create_github_stub(
+        SyntheticStarGraph(seed=scenario.seed),
+        LatencyModel(scenario.latency_median, scenario.latency_sigma, scenario.seed),
+    )
+    redis = MemoryRedis()
+    redis_client = get_memory_redis_client(redis)
+    app.dependency_overrides[get_github_api] = lambda: GitHubAPI(
+        base_url="http://github.stub/",
+        redis_client=redis_client,
+        token="bench",
+        transport=httpx.ASGITransport(app=stub),
+    )
+    app.dependency_overrides[validate_api_key] = lambda: User(id=1, email="bench")
+    app.dependency_overrides[get_star_repository] = lambda: None
+    app.dependency_overrides[get_admission_controller] = lambda: AdmissionController(
+        redis_client
+    )
+    app.dependency_overrides[get_sketch_index] = DetachedSketchIndex
+
+    url = f"/githubble/repos/bench/repo0/starneighbours?max_stargazers={scenario.max_stargazers}"
+    latencies = []
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://githubble"
+    ) as client:
+        if scenario.warm:
+            (await client.get(url)).raise_for_status()
+        request_count = stub.state.request_count
+        for _ in range(scenario.queries):
+            if not scenario.warm:
+                await redis.flushdb()
+            start = perf_counter()
+            (await client.get(url)).raise_for_status()
+            latencies.append(perf_counter() - start)
+
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "github_calls": (stub.state.request_count - request_count) / scenario.queries,
+        # Kilobytes on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+    }
+
+
+def run_scenario(scenario: Scenario) -> dict[str, Any]:
+    logging.disable(logging.WARNING)
+    return asyncio.run(measure(scenario))
+
+
+def find_regressions(
+    results: dict[str, dict[str, Any]],
+    baselines: dict[str, dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """
+    The GitHub calls are deterministic and must not increase, the latencies and
+    the memory are allowed to vary within the tolerance
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baselines:
+            continue
+        baseline = baselines[name]
+        if result["github_calls"] > baseline["github_calls"]:
+            regressions.append(
+                f"{name}: {result['github_calls']} GitHub calls per query instead of {baseline['github_calls']}"
+            )
+        for metric in ("p50_ms", "p99_ms", "peak_rss_mb"):
+            if result[metric] > baseline[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} above the baseline {baseline[metric]}"
+                )
+    return regressions
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark /starneighbours against a local GitHub stub."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+    parser.add_argument(
+        "--queries", type=int, default=20, help="Measured queries per scenario."
+    )
+    parser.add_argument(
+        "--latency-median",
+        type=float,
+        default=0.05,
+        help="Median latency of the GitHub stub, in seconds.",
+    )
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--baselines", type=Path, default=BASELINES_PATH)
+    parser.add_argument(
+        "--update-baselines",
+        action="store_true",
+        help="Store the results as the new baselines.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="Accepted relative increase of the latencies and memory.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    results = {}
+    for max_stargazers in args.sizes:
+        for warm in (False, True):
+            scenario = Scenario(
+                max_stargazers,
+                warm,
+                args.queries,
+                args.latency_median,
+                args.latency_sigma,
+            )
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                results[scenario.name] = executor.submit(
+                    run_scenario, scenario
+                ).result()
+            logger.info("%s: %s", scenario.name, results[scenario.name])
+
+    print(
+        f"{'scenario':<12}{'p50 ms':>10}{'p99 ms':>10}{'GitHub calls':>14}{'RSS MB':>8}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<12}{result['p50_ms']:>10}{result['p99_ms']:>10}"
+            f"{result['github_calls']:>14}{result['peak_rss_mb']:>8}"
+        )
+
+    if args.update_baselines:
+        args.baselines.write_text(
+            json.dumps(
+                {
+                    "settings": {
+                        "queries": args.queries,
+                        "latency_median": args.latency_median,
+                        "latency_sigma": args.latency_sigma,
+                    },
+                    "results": results,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        logger.info("Baselines written to %s", args.baselines)
+        return
+
+    if not args.baselines.exists():
+        logger.warning("No baselines found in %s", args.baselines)
+        return
+    baselines = json.loads(args.baselines.read_text())["results"]
+    regressions = find_regressions(results, baselines, args.tolerance)
+    for regression in regressions:
+        logger.error(regression)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
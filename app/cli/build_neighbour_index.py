@@ -0,0 +1,95 @@
+"""
+Offline build of the memory mapped neighbour index from the persistent star graph.
+
+Usage:
+    python -m app.cli.build_neighbour_index neighbours.idx --top-k 100 --min-stargazers 50
+"""
+
+import argparse
+import logging
+from collections import Counter, defaultdict
+from typing import DefaultDict, Iterable, Iterator, Sequence
+
+from app.db.engine import SessionLocal
+from app.repositories.star import StarRepository
+from app.services.neighbour_index import write_neighbour_index
+
+logger = logging.getLogger(__name__)
+
+
+def compute_neighbours(
+    stars: Iterable[tuple[int, int]], top_k: int, min_stargazers: int = 1
+) -> Iterator[tuple[int, list[tuple[int, int]]]]:
+    """
+    Counts the shared stargazers of every repository having at least min_stargazers,
+    yielding its top_k neighbours. As for the live endpoint, a repository is its own
+    first neighbour. A star given twice is counted once.
+    """
+    starred_by_user: DefaultDict[int, set[int]] = defaultdict(set)
+    stargazers_by_repo: DefaultDict[int, set[int]] = defaultdict(set)
+    for user_id, repo_id in stars:
+        starred_by_user[user_id].add(repo_id)
+        stargazers_by_repo[repo_id].add(user_id)
+
+    for repo_id, stargazers in stargazers_by_repo.items():
+        if len(stargazers) < min_stargazers:
+            continue
+        shared_counts: Counter[int] = Counter()
+        for user_id in stargazers:
+            shared_counts.update(starred_by_user[user_id])
+        yield repo_id, shared_counts.most_common(top_k)
+
+
+def build(path: str, top_k: int, min_stargazers: int) -> int:
+    with SessionLocal() as session:
+        star_repository = StarRepository(session)
+        names_by_id = star_repository.get_repository_names()
+        # Ids are remapped to the positions in the sorted names table. The index is
+        # looked up by name, so the repositories sharing a full name, as a deleted
+        # repository and the one created in its place, are merged.
+        names = sorted(set(names_by_id.values()))
+        position_by_name = {name: position for position, name in enumerate(names)}
+        position_by_id = {
+            repo_id: position_by_name[name] for repo_id, name in names_by_id.items()
+        }
+        neighbours = dict(
+            compute_neighbours(
+                (
+                    (user_id, position_by_id[repo_id])
+                    for user_id, repo_id in star_repository.iter_stars()
+                ),
+                top_k,
+                min_stargazers,
+            )
+        )
+
+    write_neighbour_index(path, names, neighbours.items(), top_k)
+    return len(neighbours)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the neighbour index from the star graph."
+    )
+    parser.add_argument("path", help="Index file to write")
+    parser.add_argument(
+        "--top-k", type=int, default=100, help="Neighbours kept per repository."
+    )
+    parser.add_argument(
+        "--min-stargazers",
+        type=int,
+        default=1,
+        help="Only index the repositories having at least this many known stargazers.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    nb_repos = build(args.path, args.top_k, args.min_stargazers)
+    logger.info("Index written to %s, %d repositories covered", args.path, nb_repos)
+
+
+if __name__ == "__main__":
+    main()
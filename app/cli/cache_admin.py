@@ -0,0 +1,70 @@
+"""
+Cache inspection and targeted invalidation, the command line twin of /admin/cache.
+
+Usage:
+    python -m app.cli.cache_admin stats
+    python -m app.cli.cache_admin invalidate --repo encode/uvicorn --user octocat
+
+The hit ratios are those of the serving workers, they are only reported by the API.
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Sequence
+
+from app.services.cache_admin import get_cache_admin
+
+logger = logging.getLogger(__name__)
+
+
+async def log_stats() -> None:
+    stats = await get_cache_admin().get_stats()
+    for namespace in stats.namespaces:
+        logger.info(
+            "%s: %d keys, %d bytes",
+            namespace.namespace,
+            namespace.keys,
+            namespace.bytes,
+        )
+    logger.info("total: %d keys, %d bytes", stats.keys, stats.bytes)
+
+
+async def invalidate(repos: list[str], users: list[str]) -> None:
+    cache_admin = get_cache_admin()
+    results = [await cache_admin.invalidate("repo", repo) for repo in repos] + [
+        await cache_admin.invalidate("user", user) for user in users
+    ]
+    for result in results:
+        logger.info(
+            "%s %s: %d keys deleted", result.kind, result.name, result.deleted_keys
+        )
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the cache.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Keys and bytes per namespace.")
+    invalidate_parser = subparsers.add_parser(
+        "invalidate", help="Delete the cached data of repositories and users."
+    )
+    invalidate_parser.add_argument(
+        "--repo", action="append", default=[], help="owner/repo, repeatable."
+    )
+    invalidate_parser.add_argument(
+        "--user", action="append", default=[], help="GitHub login, repeatable."
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    if args.command == "stats":
+        asyncio.run(log_stats())
+    else:
+        asyncio.run(invalidate(args.repo, args.user))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Snapshot of the GitHub cache namespaces, to warm up a Redis after a flush, a new
+region or a test environment without paying the cold crawl.
+
+Usage:
+    python -m app.cli.cache_snapshot export github-cache.jsonl.gz
+    python -m app.cli.cache_snapshot import github-cache.jsonl.gz
+
+The snapshot is a gzipped file of JSON lines: a header, then a chunk of
+[key, remaining ttl in ms, base64 DUMP payload] entries per SCAN batch, so neither
+side holds more than a chunk in memory. DUMP payloads can only be restored by a
+Redis version reading the RDB format of the exporting one.
+The snapshots exported before the key namespaces restore the former keys, which are
+read while CACHE_LEGACY_KEYS is on.
+"""
+
+import argparse
+import asyncio
+import base64
+import gzip
+import logging
+from time import time
+from typing import Any, Sequence
+
+import orjson
+import redis.asyncio as redis  # type: ignore[import-untyped]
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# The GitHub cache, with the indexes of its keys by repository and user
+SNAPSHOT_NAMESPACES = ("github", "index")
+CHUNK_SIZE = 1000
+
+
+def decode_key(key: str | bytes) -> str:
+    return key.decode() if isinstance(key, bytes) else key
+
+
+async def export_snapshot(
+    redis_client: Any,
+    path: str,
+    namespaces: Sequence[str] = SNAPSHOT_NAMESPACES,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    nb_keys = 0
+    with gzip.open(path, "wb") as snapshot:
+        snapshot.write(
+            orjson.dumps({"namespaces": namespaces, "exported_at": time()}) + b"\n"
+        )
+        for namespace in namespaces:
+            cursor = 0
+            while True:
+                cursor, keys = await redis_client.scan(
+                    cursor, match=f"{namespace}:*", count=chunk_size
+                )
+                if keys:
+                    async with redis_client.pipeline(transaction=False) as pipe:
+                        for key in keys:
+                            pipe.pttl(key)
+                            pipe.dump(key)
+                        results = await pipe.execute()
+                    # Keys expired since the scan are skipped
+                    chunk = [
+                        [decode_key(key), ttl, base64.b64encode(payload).decode()]
+                        for key, ttl, payload in zip(keys, results[::2], results[1::2])
+                        if payload is not None and ttl != -2
+                    ]
+                    if chunk:
+                        snapshot.write(orjson.dumps(chunk) + b"\n")
+                        nb_keys += len(chunk)
+                if not cursor:
+                    break
+    return nb_keys
+
+
+async def import_snapshot(redis_client: Any, path: str) -> int:
+    """
+    Restores the snapshot keys with pipelined RESTORE, one pipeline per chunk. The
+    TTLs are shortened by the time elapsed since the export, the keys which would
+    have expired meanwhile are skipped.
+    """
+    nb_keys = 0
+    with gzip.open(path, "rb") as snapshot:
+        header = orjson.loads(snapshot.readline())
+        elapsed = int((time() - header["exported_at"]) * 1000)
+        for line in snapshot:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key, ttl, payload in orjson.loads(line):
+                    if ttl >= 0:
+                        ttl -= elapsed
+                        if ttl <= 0:
+                            continue
+                    else:
+                        # No expiration
+                        ttl = 0
+                    pipe.restore(key, ttl, base64.b64decode(payload), replace=True)
+                    nb_keys += 1
+                await pipe.execute()
+    return nb_keys
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Export or import a snapshot of the GitHub cache."
+    )
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="Snapshot file (.jsonl.gz)")
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help="Keys scanned and written per chunk on export.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    # DUMP payloads are binary, the responses aren't decoded
+    redis_client = redis.from_url(str(settings.redis_url))
+    if args.command == "export":
+        nb_keys = asyncio.run(
+            export_snapshot(redis_client, args.path, chunk_size=args.chunk_size)
+        )
+        logger.info("%d keys exported to %s", nb_keys, args.path)
+    else:
+        nb_keys = asyncio.run(import_snapshot(redis_client, args.path))
+        logger.info("%d keys imported from %s", nb_keys, args.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Offline ingestion of the GH Archive hourly dumps (https://www.gharchive.org/) in the
+persistent star graph.
+
+Usage:
+    python -m app.cli.ingest_gharchive data/2024-01-01-*.json.gz --workers 8
+"""
+
+import argparse
+import gzip
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Iterator, Sequence
+
+import orjson
+
+from app.db.engine import SessionLocal, engine
+from app.repositories.star import StarRepository
+from app.schemas.star import StarEdge
+
+logger = logging.getLogger(__name__)
+
+WATCH_EVENT_MARKER = b'"WatchEvent"'
+
+
+def iter_watch_events(path: str) -> Iterator[StarEdge]:
+    """
+    Streams a GH Archive file line by line, only decoding the WatchEvent lines.
+    GitHub emits a WatchEvent when a repository is starred.
+    """
+    with gzip.open(path, "rb") as archive:
+        for line in archive:
+            # Cheap bytes lookup to skip the ~95% of events we don't care about
+            if WATCH_EVENT_MARKER not in line:
+                continue
+            try:
+                event = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                logger.warning("Skipping malformed line in %s", path)
+                continue
+            if event.get("type") != "WatchEvent":
+                continue
+            actor, repo = event["actor"], event["repo"]
+            yield StarEdge(
+                user_id=actor["id"],
+                user_login=actor["login"],
+                repo_id=repo["id"],
+                repo_full_name=repo["name"],
+                starred_at=datetime.fromisoformat(event["created_at"]),
+            )
+
+
+def ingest_file(path: str) -> tuple[str, int]:
+    filename = os.path.basename(path)
+    with SessionLocal() as session:
+        nb_stars = StarRepository(session).ingest_archive(
+            filename, iter_watch_events(path)
+        )
+    return filename, nb_stars
+
+
+def _init_worker() -> None:
+    # Connections inherited from the parent process must not be shared with it
+    engine.dispose(close=False)
+
+
+def ingest(paths: Sequence[str], workers: int) -> int:
+    with SessionLocal() as session:
+        ingested = StarRepository(session).get_ingested_archives()
+
+    pending = [path for path in paths if os.path.basename(path) not in ingested]
+    logger.info(
+        "%d files to ingest, %d already done", len(pending), len(paths) - len(pending)
+    )
+
+    total_stars = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(ingest_file, path): path for path in pending}
+        for future in as_completed(futures):
+            try:
+                filename, nb_stars = future.result()
+            except Exception as e:
+                # The file stays pending and will be retried by the next run
+                logger.error("Failed to ingest %s: %s", futures[future], e)
+                continue
+            total_stars += nb_stars
+            logger.info("Ingested %s: %d stars", filename, nb_stars)
+    return total_stars
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Load GH Archive WatchEvents in the star graph."
+    )
+    parser.add_argument("paths", nargs="+", help="GH Archive .json.gz files")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of files ingested in parallel.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    total_stars = ingest(sorted(args.paths), args.workers)
+    logger.info("Done, %d stars ingested", total_stars)
+
+
+if __name__ == "__main__":
+    main()
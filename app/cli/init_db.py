@@ -0,0 +1,33 @@
+"""
+Creates the missing tables, migrates the existing ones and records the schema
+version, once per deployment when the workers start with STARTUP_MODE=check.
+
+Usage:
+    python -m app.cli.init_db
+"""
+
+import argparse
+import logging
+from typing import Sequence
+
+from app.models import init_db
+from app.models.schema import SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    argparse.ArgumentParser(
+        description="Create or migrate the database tables and record the schema version."
+    ).parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    init_db()
+    logger.info("Database schema at version %d", SCHEMA_VERSION)
+
+
+if __name__ == "__main__":
+    main()
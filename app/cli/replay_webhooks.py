@@ -0,0 +1,98 @@
+"""
+Local replay of GitHub webhook deliveries, standing in for GitHub to test the
+webhook receiver.
+
+Usage:
+    python -m app.cli.replay_webhooks deliveries.jsonl --url http://localhost:8000/webhooks/github
+
+Each line of the file is a delivery, {"event": "star", "payload": {...}}, signed with
+GITHUB_WEBHOOK_SECRET unless --secret is given.
+"""
+
+import argparse
+import asyncio
+import logging
+import uuid
+from collections import Counter
+from typing import Any, Iterable, Iterator, Sequence
+
+import httpx
+import orjson
+
+from app.config import get_settings
+from app.services.webhooks import sign_payload
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def iter_deliveries(path: str) -> Iterator[tuple[str, dict[str, Any]]]:
+    with open(path, "rb") as deliveries:
+        for line in deliveries:
+            if line.strip():
+                delivery = orjson.loads(line)
+                yield delivery["event"], delivery["payload"]
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    url: str,
+    deliveries: Iterable[tuple[str, dict[str, Any]]],
+    secret: str,
+) -> Counter[int]:
+    """
+    Posts the deliveries in order, as GitHub does, returning the count of each
+    response status
+    """
+    statuses: Counter[int] = Counter()
+    for event, payload in deliveries:
+        body = orjson.dumps(payload)
+        response = await client.post(
+            url,
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-GitHub-Event": event,
+                "X-GitHub-Delivery": str(uuid.uuid4()),
+                "X-Hub-Signature-256": sign_payload(secret, body),
+            },
+        )
+        if response.is_error:
+            logger.warning("%s delivery refused: %s", event, response.text)
+        statuses[response.status_code] += 1
+    return statuses
+
+
+async def replay_file(path: str, url: str, secret: str) -> Counter[int]:
+    async with httpx.AsyncClient() as client:
+        return await replay(client, url, iter_deliveries(path), secret)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay GitHub webhook deliveries.")
+    parser.add_argument("path", help="Deliveries file, one JSON delivery per line")
+    parser.add_argument(
+        "--url",
+        default="http://localhost:8000/webhooks/github",
+        help="Webhook receiver url.",
+    )
+    parser.add_argument(
+        "--secret",
+        default=settings.github_webhook_secret,
+        help="Secret signing the deliveries.",
+    )
+    args = parser.parse_args(argv)
+    if not args.secret:
+        parser.error("a secret is needed, set GITHUB_WEBHOOK_SECRET or --secret")
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+    )
+    statuses = asyncio.run(replay_file(args.path, args.url, args.secret))
+    logger.info("Deliveries replayed, responses by status: %s", dict(statuses))
+
+
+if __name__ == "__main__":
+    main()
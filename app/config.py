@@ -1,6 +1,6 @@
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import PostgresDsn, RedisDsn, HttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -14,10 +14,61 @@ class Settings(BaseSettings):
     # GitHub
     github_api_base_url: HttpUrl = "https://api.github.com/"
     github_token: Optional[str] = None
+    # The GraphQL backend fetches the starred repos of many users per request
+    github_fetch_backend: Literal["rest", "graphql"] = "rest"
+    github_max_attempts: int = 3
+    github_retry_base_delay: float = 0.5
+    github_retry_max_delay: float = 10
+    # A second identical call is sent when GitHub didn't answer after this delay
+    github_hedge_delay: Optional[float] = 3
+    github_circuit_failure_threshold: int = 10
+    github_circuit_recovery_time: float = 30
+    # Secret of the GitHub webhooks, they are refused when it isn't set
+    github_webhook_secret: Optional[str] = None
+    # GitHub deliveries are applied once, a redelivery within this time is ignored
+    github_webhook_delivery_ttl: int = 86400
+
+    # Bearer token of the Prometheus scrapes, /metrics is refused when it isn't set
+    metrics_token: Optional[str] = None
+
+    # Admission control, per API key
+    quota_github_calls: int = 20000
+    quota_window: int = 3600
+    max_concurrent_requests_per_key: int = 4
+    # Requests are shed while this many GitHub calls are pending in the process
+    max_github_queue_depth: int = 5000
+    github_queue_retry_after: int = 5
+    # Unique stargazers whose starred repositories a batch request fetches
+    batch_max_stargazers: int = 5000
 
     # Redis
     redis_url: RedisDsn
     redis_default_expiration_time: int = 3600 * 24
+    # Missing users and repositories may be created or made public again
+    redis_negative_expiration_time: int = 3600
+    sketch_expiration_time: int = 3600 * 24 * 30
+    # The cached data missing from its namespaced key is looked up in the layouts
+    # preceding the namespaces, bare digests then github:<digest>, and moved to its
+    # key when found. Can be turned off once SKETCH_EXPIRATION_TIME has elapsed since
+    # the upgrade, the older keys having expired.
+    cache_legacy_keys: bool = True
+
+    # Seconds the hot keys preloaded at startup are served from the worker memory, and
+    # may be served stale after a write or an invalidation in another worker
+    local_cache_ttl: int = 60
+
+    # Worker startup: "migrate" creates the missing tables, "check" only verifies
+    # the schema version, leaving the DDL to app.cli.init_db
+    startup_mode: Literal["migrate", "check"] = "migrate"
+    # Connections opened before serving, the GitHub ones call the free rate_limit
+    startup_db_connections: int = 5
+    startup_redis_connections: int = 10
+    startup_github_connections: int = 4
+    # Hottest cached keys loaded in the worker memory at startup, 0 disables it
+    startup_preload_hot_keys: int = 0
+
+    # Precomputed neighbour index built by app.cli.build_neighbour_index
+    neighbour_index_path: Optional[str] = None
 
     model_config = SettingsConfigDict(env_file=ENV_FILE, env_file_encoding="utf-8")
 
@@ -3,15 +3,22 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from app.models import init_db
+from app.profiling import profiling_middleware
+from app.routers.admin import router as admin_router
 from app.routers.githubble import router as githubble_router
+from app.routers.health import router as health_router
+from app.routers.metrics import router as metrics_router
 from app.routers.user import router as user_router
+from app.routers.webhooks import router as webhooks_router
+from app.startup import shut_down, warm_up
+from app.timing import server_timing_middleware
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
-    init_db()
+async def lifespan(app: FastAPI):
+    await warm_up(app)
     yield
+    await shut_down(app)
 
 
 app = FastAPI(
@@ -28,3 +35,9 @@ logging.basicConfig(
 
 app.include_router(githubble_router)
 app.include_router(user_router)
+app.include_router(metrics_router)
+app.include_router(webhooks_router)
+app.include_router(admin_router)
+app.include_router(health_router)
+app.middleware("http")(server_timing_middleware)
+app.middleware("http")(profiling_middleware)
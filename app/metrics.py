@@ -0,0 +1,53 @@
+"""
+Process-wide metrics, exposed in the Prometheus text format by /metrics.
+
+Each worker process exposes its own values.
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+GITHUB_REQUEST_SECONDS = Histogram(
+    "githubble_github_request_seconds",
+    "GitHub responses served by GitHubAPI, by cache tier.",
+    ("cache",),
+    buckets=LATENCY_BUCKETS,
+)
+GITHUB_CALLS = Counter(
+    "githubble_github_calls",
+    "Calls sent to GitHub, by token and endpoint type.",
+    ("token", "endpoint"),
+)
+GITHUB_RATE_LIMIT_REMAINING = Gauge(
+    "githubble_github_rate_limit_remaining",
+    "Remaining GitHub rate limit, as of the last response.",
+    ("token",),
+)
+GITHUB_SEMAPHORE_WAIT_SECONDS = Histogram(
+    "githubble_github_semaphore_wait_seconds",
+    "Time waited for a GitHub call slot of the scheduler.",
+    buckets=LATENCY_BUCKETS,
+)
+FANOUT_WIDTH = Histogram(
+    "githubble_fanout_width",
+    "Users whose starred repositories are fetched by a fan-out.",
+    buckets=SIZE_BUCKETS,
+)
+NEIGHBOUR_SET_SIZE = Histogram(
+    "githubble_neighbour_set_size",
+    "Neighbour repositories ranked by a query.",
+    buckets=SIZE_BUCKETS,
+)
+SERIALIZATION_SECONDS = Histogram(
+    "githubble_serialization_seconds",
+    "Time spent building the neighbours response models.",
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "githubble_cache_lookups",
+    "Redis cache lookups, by key namespace and result.",
+    ("namespace", "result"),
+)
@@ -1,8 +1,57 @@
-from app.db.engine import Base, engine
+from sqlalchemy import func, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import Session
+
+from app.db.engine import Base, SessionLocal, engine
+from app.models.schema import MIGRATIONS, SCHEMA_VERSION, SchemaVersion
+from app.models.star import GitHubRepository, GitHubUser, IngestedArchive, Star
 from app.models.user import User
 
-__all__ = ["User"]
+__all__ = [
+    "GitHubRepository",
+    "GitHubUser",
+    "IngestedArchive",
+    "SchemaVersion",
+    "Star",
+    "User",
+]
+
+
+class SchemaVersionError(Exception):
+    pass
+
+
+def get_schema_version(session: Session) -> int | None:
+    return session.query(func.max(SchemaVersion.version)).scalar()
 
 
 def init_db():
+    """
+    Creates the missing tables, then applies the migrations of the versions above the
+    recorded one, in the same transaction as the new version
+    """
     Base.metadata.create_all(engine)
+    with SessionLocal() as session:
+        version = get_schema_version(session) or 0
+        for migration_version in sorted(MIGRATIONS):
+            if migration_version > version:
+                for statement in MIGRATIONS[migration_version]:
+                    session.execute(text(statement))
+        session.merge(SchemaVersion(version=SCHEMA_VERSION))
+        session.commit()
+
+
+def check_db_schema():
+    """
+    Raises SchemaVersionError unless the database schema is the one of the models
+    """
+    with SessionLocal() as session:
+        try:
+            version = get_schema_version(session)
+        except ProgrammingError:
+            version = None
+    if version != SCHEMA_VERSION:
+        raise SchemaVersionError(
+            f"Database schema version {version}, expected {SCHEMA_VERSION}: "
+            "run python -m app.cli.init_db"
+        )
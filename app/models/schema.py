@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer
+
+from app.db.engine import Base
+
+# To be incremented with every change of the models
+SCHEMA_VERSION = 3
+
+# DDL bringing a database from the previous version to each version, for the changes
+# create_all doesn't apply to the existing tables. The statements are idempotent, as
+# the databases created before the schema_version table don't record any version.
+MIGRATIONS: dict[int, list[str]] = {
+    2: [
+        'ALTER TABLE "user" ADD COLUMN IF NOT EXISTS is_admin BOOLEAN NOT NULL DEFAULT false'
+    ],
+    3: [
+        "ALTER TABLE github_user ADD COLUMN IF NOT EXISTS seen_at TIMESTAMPTZ",
+        "ALTER TABLE github_repository ADD COLUMN IF NOT EXISTS seen_at TIMESTAMPTZ",
+    ],
+}
+
+
+class SchemaVersion(Base):
+    """
+    Versions of the schema applied to the database, so the workers can check it
+    without issuing any DDL
+    """
+
+    __tablename__ = "schema_version"
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    applied_at = Column(DateTime, default=datetime.now)
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
+
+from app.db.engine import Base
+
+
+class GitHubUser(Base):
+    __tablename__ = "github_user"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    login = Column(String, index=True, nullable=False)
+    # Time of the most recent star the login was seen with, an older one can't
+    # overwrite it
+    seen_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class GitHubRepository(Base):
+    __tablename__ = "github_repository"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    full_name = Column(String, index=True, nullable=False)
+    seen_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class Star(Base):
+    """
+    Bipartite edge between a GitHub user and one of the repositories they starred
+    """
+
+    __tablename__ = "stars"
+    __table_args__ = (Index("ix_stars_repo_id_starred_at", "repo_id", "starred_at"),)
+
+    user_id = Column(BigInteger, ForeignKey("github_user.id"), primary_key=True)
+    repo_id = Column(BigInteger, ForeignKey("github_repository.id"), primary_key=True)
+    starred_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class IngestedArchive(Base):
+    """
+    GH Archive files already loaded in the star graph, allowing resumable ingestions
+    """
+
+    __tablename__ = "ingested_archive"
+
+    filename = Column(String, primary_key=True)
+    nb_stars = Column(Integer, nullable=False, default=0)
+    ingested_at = Column(DateTime, default=datetime.now)
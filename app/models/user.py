@@ -2,7 +2,8 @@ import secrets
 import uuid
 from datetime import datetime
 
-from sqlalchemy import UUID, Column, String, DateTime
+from sqlalchemy import UUID, Boolean, Column, String, DateTime, false
+from sqlalchemy.orm import deferred
 
 from app.db.engine import Base
 
@@ -22,5 +23,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
     api_key = Column(String, unique=True, index=True, default=generate_api_key)
+    # Admin users can profile their requests. Deferred and defaulted by the server, so
+    # the user queries and inserts still work on a database not migrated yet
+    is_admin = deferred(Column(Boolean, nullable=False, server_default=false()))
     created = Column(DateTime, default=datetime.now)
     modified = Column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,55 @@
+"""
+On-demand profiling of a live request, for the admin users: adding `profile=1` to
+the query string runs the request under the pyinstrument sampling profiler and
+returns its report instead of the response.
+"""
+
+from typing import Any, Callable
+
+from fastapi import Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse
+
+from app.db.engine import SessionLocal
+from app.repositories.user import UserRepository
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument is a dev dependency
+    Profiler = None  # type: ignore[assignment,misc]
+
+
+def is_admin_api_key(api_key: str) -> bool:
+    with SessionLocal() as session:
+        user_repository = UserRepository(session)
+        user = user_repository.check_api_key(api_key)
+        return user is not None and user_repository.is_admin(user)
+
+
+async def profiling_middleware(
+    request: Request, call_next: Callable[[Request], Any]
+) -> Response:
+    if request.query_params.get("profile") != "1":
+        return await call_next(request)
+
+    api_key = request.headers.get("X-API-Key")
+    if not api_key or not await run_in_threadpool(is_admin_api_key, api_key):
+        return JSONResponse(
+            {"detail": "Profiling is reserved to the admin users"},
+            status_code=status.HTTP_403_FORBIDDEN,
+        )
+    if Profiler is None:
+        return JSONResponse(
+            {"detail": "pyinstrument isn't installed"},
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        )
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        response = await call_next(request)
+        async for _ in response.body_iterator:  # type: ignore[attr-defined]
+            pass
+    finally:
+        profiler.stop()
+    return HTMLResponse(profiler.output_html())
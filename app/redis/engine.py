@@ -1,63 +1,424 @@
+import asyncio
 import hashlib
 import json
 import logging
-from typing import Any
+import random
+from time import monotonic
+from typing import Any, AsyncIterator, Callable
 from fastapi import Response
 import redis.asyncio as redis  # type: ignore[import-untyped]
-from redis import RedisError
+from redis import RedisError, WatchError
 
 from app.config import get_settings
+from app.metrics import CACHE_LOOKUPS
+from app.redis.keys import get_key_namespace, get_legacy_keys, parse_cache_key
 
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 
+class LocalCache:
+    def __init__(self, ttl: int):
+        """
+        In-process cache in front of Redis, holding serialized values for ttl
+        seconds. Filled with the hottest keys when a worker starts, so its first
+        requests don't wait on Redis. Only the writes of the process discard its
+        values: after a write or an invalidation in another worker, a preloaded value
+        is served stale for up to ttl seconds.
+        """
+        self.ttl = ttl
+        self.values: dict[str, tuple[float, str]] = {}
+
+    def get(self, key: str) -> str | None:
+        if (entry := self.values.get(key)) is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def set_many(self, values: dict[str, str]) -> None:
+        expires_at = monotonic() + self.ttl
+        self.values.update((key, (expires_at, value)) for key, value in values.items())
+
+    def discard(self, *keys: str) -> None:
+        if self.values:
+            for key in keys:
+                self.values.pop(key, None)
+
+
+local_cache = LocalCache(settings.local_cache_ttl)
+
+
 class RedisClient:
+    # Sorted set ranking the cached keys by sampled hits
+    HOT_KEYS_KEY = "hot:keys"
+    HOT_KEYS_SAMPLE_RATE = 0.01
+    MAX_HOT_KEYS = 10_000
+    # Only the cached data is preloaded, never the admission counters, and only its
+    # former keys are looked up
+    HOT_KEYS_NAMESPACES = ("github:", "sketch:")
+    # The entity records are patched in place by the webhooks of any worker, they're
+    # neither ranked nor served from the local cache
+    LOCAL_CACHE_EXCLUDED_KEYS = ("github_entity_",)
+
     def __init__(self):
         self.redis_client = redis.from_url(
             str(settings.redis_url), decode_responses=True
         )
         self.default_expiration_time = settings.redis_default_expiration_time
+        # An index outlives the keys it lists, whatever their expiration
+        self.index_expiration_time = max(
+            settings.redis_default_expiration_time, settings.sketch_expiration_time
+        )
 
     @staticmethod
     async def generate_cache_key(key: str) -> str:
-        return hashlib.sha256(key.encode()).hexdigest()
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        namespace = parse_cache_key(key).namespace
+        return f"{namespace}:{digest}" if namespace else digest
+
+    @staticmethod
+    def record_lookup(hashed_key: str, hit: bool) -> None:
+        CACHE_LOOKUPS.labels(
+            get_key_namespace(hashed_key), "hit" if hit else "miss"
+        ).inc()
+
+    @classmethod
+    def is_local(cls, cache_key: str) -> bool:
+        return not cache_key.startswith(cls.LOCAL_CACHE_EXCLUDED_KEYS)
+
+    async def get_raw_values(
+        self, hashed_keys: list[str], local: list[bool] | None = None
+    ) -> list[str | None]:
+        """
+        Serialized values of the keys, from the local cache when they were preloaded
+        and from Redis otherwise. The hits are sampled in the hot keys ranking, but
+        for the keys which aren't local.
+        """
+        if local is None:
+            local = [True] * len(hashed_keys)
+        values = [
+            local_cache.get(key) if is_local else None
+            for key, is_local in zip(hashed_keys, local)
+        ]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            fetched = await self.redis_client.mget([hashed_keys[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                values[i] = value
+
+        hot_keys = []
+        for hashed_key, value, is_local in zip(hashed_keys, values, local):
+            self.record_lookup(hashed_key, bool(value))
+            if (
+                value
+                and is_local
+                and hashed_key.startswith(self.HOT_KEYS_NAMESPACES)
+                and random.random() < self.HOT_KEYS_SAMPLE_RATE
+            ):
+                hot_keys.append(hashed_key)
+        if hot_keys:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for hashed_key in hot_keys:
+                    pipe.zincrby(
+                        self.HOT_KEYS_KEY, 1 / self.HOT_KEYS_SAMPLE_RATE, hashed_key
+                    )
+                pipe.expire(self.HOT_KEYS_KEY, self.default_expiration_time)
+                await pipe.execute()
+        return values
+
+    async def fill_legacy_values(
+        self, cache_keys: list[str], hashed_keys: list[str], values: list[str | None]
+    ) -> None:
+        """
+        Fills the missing values found under a former key of the cached data, and
+        moves them to their key, indexed, keeping their expiration
+        """
+        legacy_keys = [
+            (i, legacy_key)
+            for i, (hashed_key, value) in enumerate(zip(hashed_keys, values))
+            if value is None and hashed_key.startswith(self.HOT_KEYS_NAMESPACES)
+            for legacy_key in get_legacy_keys(hashed_key)
+        ]
+        if not legacy_keys:
+            return
+        found = {}
+        legacy_values = await self.redis_client.mget([key for _, key in legacy_keys])
+        for (i, legacy_key), value in zip(legacy_keys, legacy_values):
+            if value is not None and i not in found:
+                found[i] = legacy_key
+                values[i] = value
+        if not found:
+            return
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for i, legacy_key in found.items():
+                # The key may have been set meanwhile, the former one then expires
+                pipe.renamenx(legacy_key, hashed_keys[i])
+                if index_key := parse_cache_key(cache_keys[i]).index_key:
+                    pipe.sadd(index_key, hashed_keys[i])
+                    pipe.expire(index_key, self.index_expiration_time)
+            await pipe.execute(raise_on_error=False)
 
     async def get_cached_value_by_key(
         self, cache_key: str, response: Response | None = None
     ) -> Any:
-        cache_key = await self.generate_cache_key(cache_key)
+        hashed_key = await self.generate_cache_key(cache_key)
         try:
-            if cached_value := await self.redis_client.get(cache_key):
-                if response:
-                    response.headers["X-Cache-Status"] = "HIT"
-                return json.loads(cached_value)
-            elif response:
-                response.headers["X-Cache-Status"] = "MISS"
-                return None
+            cached_values = await self.get_raw_values(
+                [hashed_key], [self.is_local(cache_key)]
+            )
+            if settings.cache_legacy_keys:
+                await self.fill_legacy_values([cache_key], [hashed_key], cached_values)
+            [cached_value] = cached_values
         except RedisError as e:
             logger.warning("Redis error: %s", e)
             return None
+        if response:
+            response.headers["X-Cache-Status"] = "HIT" if cached_value else "MISS"
+        return json.loads(cached_value) if cached_value else None
 
     async def set_cache_value(
         self, cache_key: str, value: Any, ex: int | None = None
     ) -> None:
-        cache_key = await self.generate_cache_key(cache_key)
-        await self.redis_client.set(
-            cache_key,
-            json.dumps(value),
-            ex=ex or self.default_expiration_time,
+        await self.set_cache_values({cache_key: value}, ex)
+
+    async def get_cached_values_by_keys(self, cache_keys: list[str]) -> list[Any]:
+        if not cache_keys:
+            return []
+        hashed_keys = [await self.generate_cache_key(key) for key in cache_keys]
+        try:
+            cached_values = await self.get_raw_values(
+                hashed_keys, [self.is_local(key) for key in cache_keys]
+            )
+            if settings.cache_legacy_keys:
+                await self.fill_legacy_values(cache_keys, hashed_keys, cached_values)
+        except RedisError as e:
+            logger.warning("Redis error: %s", e)
+            return [None] * len(cache_keys)
+        return [json.loads(value) if value else None for value in cached_values]
+
+    async def set_cache_values(
+        self, values: dict[str, Any], ex: int | None = None
+    ) -> None:
+        """
+        The keys of a repository or a user are added to its index in the same
+        pipeline, so they can be invalidated together
+        """
+        ex = ex or self.default_expiration_time
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key, value in values.items():
+                hashed_key = await self.generate_cache_key(cache_key)
+                local_cache.discard(hashed_key)
+                pipe.set(hashed_key, json.dumps(value), ex=ex)
+                if index_key := parse_cache_key(cache_key).index_key:
+                    pipe.sadd(index_key, hashed_key)
+                    pipe.expire(index_key, max(ex, self.index_expiration_time))
+            await pipe.execute()
+
+    async def update_cache_value(
+        self,
+        cache_key: str,
+        update: Callable[[Any], Any | None],
+        ex: int | None = None,
+    ) -> bool:
+        """
+        Sets the value update(current value) returns, unless it is None, in an
+        optimistic transaction: the key is watched while read, and the update is
+        applied again to the new value when another writer changed it meanwhile.
+        Returns whether a value was set.
+        """
+        ex = ex or self.default_expiration_time
+        hashed_key = await self.generate_cache_key(cache_key)
+        index_key = parse_cache_key(cache_key).index_key
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(hashed_key)
+                    current = await pipe.get(hashed_key)
+                    value = update(json.loads(current) if current else None)
+                    if value is None:
+                        return False
+                    pipe.multi()
+                    pipe.set(hashed_key, json.dumps(value), ex=ex)
+                    if index_key:
+                        pipe.sadd(index_key, hashed_key)
+                        pipe.expire(index_key, max(ex, self.index_expiration_time))
+                    await pipe.execute()
+                except WatchError:
+                    continue
+                local_cache.discard(hashed_key)
+                return True
+
+    async def compare_and_set_cache_value(
+        self,
+        cache_key: str,
+        value: Any,
+        replaces: Callable[[Any], bool],
+        ex: int | None = None,
+    ) -> bool:
+        """
+        Sets the value unless replaces(current value) is False, compared again when
+        another writer changed it meanwhile. Returns whether the value was set.
+        """
+        return await self.update_cache_value(
+            cache_key, lambda current: value if replaces(current) else None, ex
         )
 
+    async def add_set_members(
+        self, members_by_key: dict[str, list[str]], ex: int | None = None
+    ) -> None:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key, members in members_by_key.items():
+                hashed_key = await self.generate_cache_key(cache_key)
+                pipe.sadd(hashed_key, *members)
+                pipe.expire(hashed_key, ex or self.default_expiration_time)
+            await pipe.execute()
+
+    async def remove_set_members(self, members_by_key: dict[str, list[str]]) -> None:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key, members in members_by_key.items():
+                pipe.srem(await self.generate_cache_key(cache_key), *members)
+            await pipe.execute()
+
+    async def get_random_set_members(
+        self, cache_keys: list[str], count: int
+    ) -> list[list[str]]:
+        """
+        Returns up to count members of each set, bounding the cost of huge sets. The
+        sets are only extended, their members under a former key are merged in.
+        """
+        hashed_keys = [await self.generate_cache_key(key) for key in cache_keys]
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for hashed_key in hashed_keys:
+                pipe.srandmember(hashed_key, count)
+            if not settings.cache_legacy_keys:
+                return await pipe.execute()
+            legacy_keys = [get_legacy_keys(hashed_key) for hashed_key in hashed_keys]
+            for keys in legacy_keys:
+                for legacy_key in keys:
+                    pipe.srandmember(legacy_key, count)
+            results = iter(await pipe.execute())
+        members = [next(results) for _ in hashed_keys]
+        for i, keys in enumerate(legacy_keys):
+            for _ in keys:
+                if legacy_members := next(results):
+                    members[i] = list(dict.fromkeys(members[i] + legacy_members))
+            members[i] = members[i][:count]
+        return members
+
+    async def increment_counter(
+        self, cache_key: str, amount: int, ex: int | None = None
+    ) -> int:
+        hashed_key = await self.generate_cache_key(cache_key)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.incrby(hashed_key, amount)
+            if ex:
+                pipe.expire(hashed_key, ex)
+            value, *_ = await pipe.execute()
+        return value
+
+    async def claim_key(self, cache_key: str, ex: int) -> bool:
+        """
+        Sets the key unless it exists, returning whether it was set
+        """
+        hashed_key = await self.generate_cache_key(cache_key)
+        return bool(await self.redis_client.set(hashed_key, 1, ex=ex, nx=True))
+
+    async def keys_exist(self, cache_keys: list[str]) -> list[bool]:
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for cache_key in cache_keys:
+                pipe.exists(await self.generate_cache_key(cache_key))
+            return [bool(exists) for exists in await pipe.execute()]
+
+    async def scan_key_sizes(
+        self, match: str = "*", count: int = 1000
+    ) -> AsyncIterator[list[tuple[str, int]]]:
+        """
+        Yields the stored keys with their memory usage in bytes, a SCAN batch at a
+        time, so the whole keyspace is never held in memory
+        """
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis_client.scan(
+                cursor, match=match, count=count
+            )
+            if keys:
+                async with self.redis_client.pipeline(transaction=False) as pipe:
+                    for key in keys:
+                        pipe.memory_usage(key)
+                    sizes = await pipe.execute()
+                # Keys expired since the scan have no size
+                yield [(key, size) for key, size in zip(keys, sizes) if size]
+            if not cursor:
+                return
+
+    async def unlink_index(self, index_key: str, batch_size: int = 500) -> int:
+        """
+        Unlinks the keys listed by an index, then the index, batch_size keys per
+        UNLINK so Redis is never blocked by a huge command
+        """
+        nb_unlinked = 0
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis_client.sscan(
+                index_key, cursor, count=batch_size
+            )
+            local_cache.discard(*keys)
+            for start in range(0, len(keys), batch_size):
+                nb_unlinked += await self.redis_client.unlink(
+                    *keys[start : start + batch_size]
+                )
+            if not cursor:
+                break
+        await self.redis_client.unlink(index_key)
+        return nb_unlinked
+
     async def key_exists(self, cache_key: str) -> bool:
         cache_key = await self.generate_cache_key(cache_key)
         return await self.redis_client.exists(cache_key)
 
     async def delete_key(self, cache_key: str):
         cache_key = await self.generate_cache_key(cache_key)
+        local_cache.discard(cache_key)
         return await self.redis_client.delete(cache_key)
 
+    async def preload_hot_keys(self, nb_keys: int) -> int:
+        """
+        Loads the nb_keys hottest keys in the local cache, and trims the ranking
+        """
+        hot_keys = await self.redis_client.zrevrange(self.HOT_KEYS_KEY, 0, nb_keys - 1)
+        if not hot_keys:
+            return 0
+        values = await self.redis_client.mget(hot_keys)
+        local_cache.set_many(
+            {key: value for key, value in zip(hot_keys, values) if value is not None}
+        )
+        await self.redis_client.zremrangebyrank(
+            self.HOT_KEYS_KEY, 0, -self.MAX_HOT_KEYS - 1
+        )
+        return sum(value is not None for value in values)
+
+    async def warm_up(self, nb_connections: int) -> None:
+        """
+        Opens nb_connections pooled connections with concurrent pings
+        """
+        await asyncio.gather(*[self.redis_client.ping() for _ in range(nb_connections)])
+
+    async def close(self) -> None:
+        await self.redis_client.aclose()
+
+
+_redis_client: RedisClient | None = None
+
 
-def get_redis_client():
-    return RedisClient()
+def get_redis_client() -> RedisClient:
+    """
+    The Redis connection pool is shared by the process
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = RedisClient()
+    return _redis_client
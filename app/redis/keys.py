@@ -0,0 +1,116 @@
+"""
+Layout of the cache keys.
+
+The logical keys used by the services are hashed, and stored as
+`<namespace>:<digest>` so the keys of a kind can be scanned and accounted together.
+The keys belonging to a repository or a user are also listed in an index set,
+`index:repo:<owner/repo>` or `index:user:<login>`, to invalidate them at once.
+
+The digests were first stored bare, then the GitHub ones as `github:<digest>`, before
+the namespaces of the kinds: get_legacy_keys gives the former keys of a stored key,
+read until they expire.
+"""
+
+import re
+from typing import NamedTuple
+
+INDEX_KEY = "index:{kind}:{name}"
+
+
+def get_index_key(kind: str, name: str) -> str:
+    # GitHub names are case insensitive
+    return INDEX_KEY.format(kind=kind, name=name.lower())
+
+
+class KeyRule(NamedTuple):
+    pattern: re.Pattern[str]
+    namespace: str
+    # Kind of the entity captured by the "name" group, if any
+    entity_kind: str | None = None
+
+
+# The first matching rule applies
+KEY_RULES = [
+    KeyRule(
+        re.compile(r"https?://[^?]*/repos/(?P<name>[^/?]+/[^/?]+)/stargazers"),
+        "github:stargazers",
+        "repo",
+    ),
+    KeyRule(
+        re.compile(r"https?://[^?]*/users/(?P<name>[^/?]+)/starred"),
+        "github:starred",
+        "user",
+    ),
+    KeyRule(
+        re.compile(r"https?://[^?]*/repos/(?P<name>[^/?]+/[^/?]+)"),
+        "github:repository",
+        "repo",
+    ),
+    KeyRule(re.compile(r"https?://"), "github:other"),
+    KeyRule(
+        re.compile(r"github_nb_pages_repos/(?P<name>[^/]+/[^/]+)/"),
+        "github:pages",
+        "repo",
+    ),
+    KeyRule(
+        re.compile(r"github_nb_pages_users/(?P<name>[^/]+)/"), "github:pages", "user"
+    ),
+    KeyRule(
+        re.compile(r"github_entity_stargazers_(?P<name>.+)"),
+        "github:stargazers",
+        "repo",
+    ),
+    KeyRule(
+        re.compile(r"github_entity_starred_(?P<name>.+)"), "github:starred", "user"
+    ),
+    KeyRule(re.compile(r"graphql_starred_(?P<name>.+)_\d+$"), "github:starred", "user"),
+    KeyRule(re.compile(r"minhash_signature_(?P<name>.+)"), "sketch:signature", "repo"),
+    KeyRule(re.compile(r"minhash_lsh_"), "sketch:lsh"),
+    KeyRule(re.compile(r"(quota|concurrency)_"), "admission"),
+    KeyRule(re.compile(r"github_request_"), "ratelimit"),
+    KeyRule(re.compile(r"webhook_delivery_"), "webhook"),
+]
+
+
+class KeyInfo(NamedTuple):
+    namespace: str | None
+    entity_kind: str | None = None
+    entity_name: str | None = None
+
+    @property
+    def index_key(self) -> str | None:
+        if self.entity_kind is None or self.entity_name is None:
+            return None
+        return get_index_key(self.entity_kind, self.entity_name)
+
+
+def parse_cache_key(key: str) -> KeyInfo:
+    for rule in KEY_RULES:
+        if match := rule.pattern.match(key):
+            if rule.entity_kind is None:
+                return KeyInfo(rule.namespace)
+            return KeyInfo(rule.namespace, rule.entity_kind, match["name"])
+    return KeyInfo(None)
+
+
+def get_key_namespace(stored_key: str) -> str:
+    """
+    Namespace of a stored key, the index sets included
+    """
+    if stored_key.startswith("index:"):
+        # GitHub names can't contain a colon
+        return ":".join(stored_key.split(":")[:2])
+    namespace, separator, _ = stored_key.rpartition(":")
+    return namespace if separator else "other"
+
+
+def get_legacy_keys(stored_key: str) -> list[str]:
+    """
+    Former keys of a stored key, the most recent layout first
+    """
+    namespace, separator, digest = stored_key.rpartition(":")
+    if not separator:
+        return []
+    if namespace.startswith("github:"):
+        return [f"github:{digest}", digest]
+    return [digest]
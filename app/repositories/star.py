@@ -0,0 +1,226 @@
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime
+from typing import Annotated, DefaultDict, Iterable, Iterator, Sequence
+
+from fastapi import Depends
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.engine import get_db
+from app.models.star import GitHubRepository, GitHubUser, IngestedArchive, Star
+from app.schemas.star import StarEdge
+
+
+def is_more_recent(starred_at: datetime | None, seen_at: datetime | None) -> bool:
+    return seen_at is None or (starred_at is not None and starred_at >= seen_at)
+
+
+class StarRepository:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def _copy_upsert(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence],
+        conflict_columns: Sequence[str],
+        update_expressions: dict[str, str] | None = None,
+        update_condition: str | None = None,
+    ) -> None:
+        """
+        Bulk upsert relying on COPY into a temporary table followed by a single
+        INSERT ... ON CONFLICT, which is orders of magnitude faster than ORM inserts.
+        The conflicting rows are updated with the excluded values, unless overridden
+        by update_expressions, when update_condition holds. The rows are inserted in
+        the order of the conflict columns, so concurrent upserts of overlapping rows
+        lock them in the same order and can't deadlock.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        column_list = ", ".join(columns)
+        conflict_list = ", ".join(conflict_columns)
+        expressions = {
+            column: f"EXCLUDED.{column}"
+            for column in columns
+            if column not in conflict_columns
+        } | (update_expressions or {})
+        updates = ", ".join(
+            f"{column} = {expression}" for column, expression in expressions.items()
+        )
+        condition = f" WHERE {update_condition}" if update_condition else ""
+        tmp_table = f"tmp_{table}"
+
+        cursor = self.session.connection().connection.cursor()
+        try:
+            cursor.execute(f"DROP TABLE IF EXISTS {tmp_table}")
+            cursor.execute(
+                f'CREATE TEMP TABLE {tmp_table} (LIKE "{table}" INCLUDING DEFAULTS) '
+                "ON COMMIT DROP"
+            )
+            cursor.copy_expert(
+                f"COPY {tmp_table} ({column_list}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+            cursor.execute(
+                f'INSERT INTO "{table}" ({column_list}) '
+                f"SELECT {column_list} FROM {tmp_table} ORDER BY {conflict_list} "
+                f"ON CONFLICT ({conflict_list}) DO UPDATE SET {updates}{condition}"
+            )
+        finally:
+            cursor.close()
+
+    def _upsert_names(
+        self,
+        table: str,
+        name_column: str,
+        names: dict[int, tuple[str, datetime | None]],
+    ) -> None:
+        """
+        Upserts the login or full name of users or repositories, unless a more
+        recent star already gave another one: archive files can be loaded in any order
+        """
+        self._copy_upsert(
+            table,
+            ("id", name_column, "seen_at"),
+            (
+                (id, name, seen_at.isoformat() if seen_at else None)
+                for id, (name, seen_at) in names.items()
+            ),
+            ("id",),
+            update_condition=(
+                f'"{table}".seen_at IS NULL OR EXCLUDED.seen_at >= "{table}".seen_at'
+            ),
+        )
+
+    def _upsert_stars(self, edges: Iterable[StarEdge]) -> int:
+        users: dict[int, tuple[str, datetime | None]] = {}
+        repos: dict[int, tuple[str, datetime | None]] = {}
+        stars: dict[tuple[int, int], datetime | None] = {}
+        for edge in edges:
+            # The most recent star of a batch gives the names and star time
+            if edge.user_id not in users or is_more_recent(
+                edge.starred_at, users[edge.user_id][1]
+            ):
+                users[edge.user_id] = (edge.user_login, edge.starred_at)
+            if edge.repo_id not in repos or is_more_recent(
+                edge.starred_at, repos[edge.repo_id][1]
+            ):
+                repos[edge.repo_id] = (edge.repo_full_name, edge.starred_at)
+            star = (edge.user_id, edge.repo_id)
+            if star not in stars or is_more_recent(edge.starred_at, stars[star]):
+                stars[star] = edge.starred_at
+
+        if not stars:
+            return 0
+
+        self._upsert_names(GitHubUser.__tablename__, "login", users)
+        self._upsert_names(GitHubRepository.__tablename__, "full_name", repos)
+        self._copy_upsert(
+            Star.__tablename__,
+            ("user_id", "repo_id", "starred_at"),
+            (
+                (user_id, repo_id, starred_at.isoformat() if starred_at else None)
+                for (user_id, repo_id), starred_at in stars.items()
+            ),
+            ("user_id", "repo_id"),
+            # A restarred repository keeps its most recent star
+            update_expressions={
+                "starred_at": f'GREATEST("{Star.__tablename__}".starred_at, '
+                "EXCLUDED.starred_at)"
+            },
+        )
+        return len(stars)
+
+    def upsert_stars(self, edges: Iterable[StarEdge]) -> int:
+        nb_stars = self._upsert_stars(edges)
+        if nb_stars:
+            self.session.commit()
+        return nb_stars
+
+    def delete_star(self, user_id: int, repo_id: int) -> int:
+        nb_stars = (
+            self.session.query(Star)
+            .filter(Star.user_id == user_id, Star.repo_id == repo_id)
+            .delete()
+        )
+        self.session.commit()
+        return nb_stars
+
+    def ingest_archive(self, filename: str, edges: Iterable[StarEdge]) -> int:
+        """
+        Loads the stars of an archive file and flags it as ingested in the same
+        transaction, so an interrupted ingestion can be resumed file by file.
+        """
+        nb_stars = self._upsert_stars(edges)
+        self.session.merge(IngestedArchive(filename=filename, nb_stars=nb_stars))
+        self.session.commit()
+        return nb_stars
+
+    def get_ingested_archives(self) -> set[str]:
+        return {
+            filename for (filename,) in self.session.query(IngestedArchive.filename)
+        }
+
+    def iter_stars(self) -> Iterator[tuple[int, int]]:
+        """
+        Streams the whole graph as (user_id, repo_id) edges, grouped by user
+        """
+        query = self.session.query(Star.user_id, Star.repo_id).order_by(Star.user_id)
+        for user_id, repo_id in query.yield_per(100_000):
+            yield user_id, repo_id
+
+    def get_repository_names(self) -> dict[int, str]:
+        return {
+            repo_id: full_name
+            for repo_id, full_name in self.session.query(
+                GitHubRepository.id, GitHubRepository.full_name
+            )
+        }
+
+    def get_star_neighbours(
+        self, full_name: str, max_stargazers: int
+    ) -> dict[str, set[str]]:
+        """
+        Computes the co-starred repositories from the stored graph, without any API call.
+        The oldest stargazers are used, like the GitHub crawl of the first pages would do.
+        """
+        stargazers = (
+            self.session.query(Star.user_id)
+            .join(GitHubRepository, GitHubRepository.id == Star.repo_id)
+            .filter(GitHubRepository.full_name == full_name)
+            .order_by(Star.starred_at.asc().nulls_last())
+            .limit(max_stargazers)
+            .subquery()
+        )
+        rows = (
+            self.session.query(GitHubRepository.full_name, GitHubUser.login)
+            .select_from(Star)
+            .join(GitHubRepository, GitHubRepository.id == Star.repo_id)
+            .join(GitHubUser, GitHubUser.id == Star.user_id)
+            .filter(Star.user_id.in_(select(stargazers.c.user_id)))
+        )
+        neighbours_repos: DefaultDict[str, set[str]] = defaultdict(set)
+        for repo_full_name, login in rows.yield_per(10_000):
+            neighbours_repos[repo_full_name].add(login)
+        return neighbours_repos
+
+    def get_repo_watermark(self, repo_id: int) -> datetime | None:
+        """
+        Most recent star known for a repository, used to stop the incremental refresh
+        """
+        return (
+            self.session.query(func.max(Star.starred_at))
+            .filter(Star.repo_id == repo_id)
+            .scalar()
+        )
+
+
+async def get_star_repository(
+    session: Annotated[Session, Depends(get_db)],
+) -> StarRepository:
+    return StarRepository(session)
@@ -1,8 +1,9 @@
+import logging
 from typing import Annotated
 
 import bcrypt
 from fastapi import Depends
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, ProgrammingError
 from sqlalchemy.orm import Session
 
 from app.db.engine import get_db
@@ -13,6 +14,8 @@ from app.repositories.exception import (
 )
 from app.schemas.user import UserCreate, UserRead, UserAuthenticate
 
+logger = logging.getLogger(__name__)
+
 
 class UserRepository:
     def __init__(self, session: Session):
@@ -43,9 +46,22 @@ class UserRepository:
 
         return UserRead.model_validate(found_user)
 
-    def check_api_key(self, api_key: str) -> UserRead | None:
+    def check_api_key(self, api_key: str) -> User | None:
         return self.session.query(User).filter(User.api_key == api_key).first()
 
+    def is_admin(self, user: User) -> bool:
+        """
+        No user is admin on a database the is_admin column wasn't added to yet
+        """
+        try:
+            return bool(
+                self.session.query(User.is_admin).filter(User.id == user.id).scalar()
+            )
+        except ProgrammingError:
+            self.session.rollback()
+            logger.warning("The user table has no is_admin column, run init_db")
+            return False
+
 
 async def get_user_repository(
     session: Annotated[Session, Depends(get_db)],
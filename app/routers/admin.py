@@ -0,0 +1,54 @@
+from typing import Annotated
+
+from fastapi import APIRouter
+from fastapi.params import Depends
+
+from app.routers.user import validate_admin_api_key
+from app.schemas.cache import CacheInvalidationResponse, CacheStatsResponse
+from app.services.cache_admin import CacheAdmin, get_cache_admin
+
+router = APIRouter(
+    prefix="/admin/cache",
+    tags=["admin"],
+    dependencies=[Depends(validate_admin_api_key)],
+)
+
+
+@router.get(
+    "/stats",
+    summary="Cache usage per key namespace.",
+    description=(
+        """
+        Scans the whole keyspace to count the keys and their memory usage per namespace
+        (`github:stargazers`, `github:starred`, `sketch:signature`...). The hit ratios
+        are the ones of the lookups served by the answering worker.
+        """
+    ),
+)
+async def get_cache_stats(
+    cache_admin: Annotated[CacheAdmin, Depends(get_cache_admin)],
+) -> CacheStatsResponse:
+    return await cache_admin.get_stats()
+
+
+@router.delete(
+    "/repos/{user}/{repo}",
+    summary="Invalidate the cached data of a repository.",
+)
+async def invalidate_repo_cache(
+    user: str,
+    repo: str,
+    cache_admin: Annotated[CacheAdmin, Depends(get_cache_admin)],
+) -> CacheInvalidationResponse:
+    return await cache_admin.invalidate("repo", f"{user}/{repo}")
+
+
+@router.delete(
+    "/users/{username}",
+    summary="Invalidate the cached data of a GitHub user.",
+)
+async def invalidate_user_cache(
+    username: str,
+    cache_admin: Annotated[CacheAdmin, Depends(get_cache_admin)],
+) -> CacheInvalidationResponse:
+    return await cache_admin.invalidate("user", username)
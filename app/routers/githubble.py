@@ -1,28 +1,78 @@
 import asyncio
+import heapq
 import logging
+import random
 from collections import defaultdict
-from typing import Annotated, DefaultDict, Any
+from itertools import zip_longest
+from time import perf_counter
+from typing import Annotated, DefaultDict, Any, Iterable
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.params import Query, Depends
 from httpx import HTTPStatusError
 
+from app.config import get_settings
+from app.metrics import FANOUT_WIDTH, NEIGHBOUR_SET_SIZE, SERIALIZATION_SECONDS
 from app.models import User
 from app.routers.user import validate_api_key
-from app.schemas.githubble import StarNeighboursResponse, StarNeighbours
+from app.repositories.star import StarRepository, get_star_repository
+from app.schemas.github import SamplingStrategy
+from app.schemas.githubble import (
+    BatchStarNeighboursRequest,
+    BatchStarNeighboursResponse,
+    ConstellationEdge,
+    ConstellationNode,
+    ConstellationResponse,
+    NeighbourSource,
+    RepoStarNeighbours,
+    StarNeighboursEstimate,
+    StarNeighboursResponse,
+    StarNeighbours,
+)
+from app.schemas.star import StarGraphRefreshResponse
+from app.services.admission import (
+    admission,
+    estimate_batch_star_neighbours_calls,
+    estimate_constellation_calls,
+    estimate_refresh_calls,
+    estimate_star_neighbours_calls,
+)
+from app.services.cost_estimate import estimate_star_neighbours
 from app.services.github.api import GitHubAPI, get_github_api
+from app.services.github.graphql import GitHubGraphQLAPI
+from app.services.github.scheduler import Priority, github_priority
+from app.services.neighbour_index import NeighbourIndex, get_neighbour_index
+from app.services.sketch import SketchIndex, get_sketch_index
+from app.services.star_graph import StarGraphService, get_star_graph_service
+from app.timing import TimedRoute, timed
 
-router = APIRouter(prefix="/githubble", tags=["githubble"])
+router = APIRouter(prefix="/githubble", tags=["githubble"], route_class=TimedRoute)
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ADAPTIVE_BATCH_SIZE = 50
+# Starred lists fetched concurrently by the constellation between two budget checks
+CONSTELLATION_WAVE_SIZE = 50
 
 
 @router.get(
     "/repos/{user}/{repo}/starneighbours",
+    dependencies=[Depends(admission(estimate_star_neighbours_calls))],
     summary="Retrieve the neighbour repositories based on the stargazers.",
     description=(
         """
         You can fetch the neighbour repositories of a given repository based on its stargazers. 
         The result will be ordered by common stargarzers amount.
+        Use `source=store` to compute them from the persisted star graph, without any GitHub call.
+        Repositories covered by the precomputed neighbour index are served from it, with the
+        shared stargazers count only.
+        With `approx=true`, the neighbours are estimated from the MinHash sketches built by the
+        previous queries, ordered by Jaccard similarity. This mode has a bounded cost whatever the
+        amount of stargazers of the repository.
+        `strategy` selects which stargazers are sampled when there are more than `max_stargazers`:
+        the first (oldest) ones, pages spread uniformly, the most recent ones, or an uniform sample
+        whose fan-out stops once the requested page of the ranking is stable.
         """
     ),
 )
@@ -30,17 +80,62 @@ async def get_repo_star_neighbours(
     user: str,
     repo: str,
     req: Request,
+    background_tasks: BackgroundTasks,
     github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+    star_repository: Annotated[StarRepository, Depends(get_star_repository)],
+    sketch_index: Annotated[SketchIndex, Depends(get_sketch_index)],
     auth_user: User = Depends(validate_api_key),
     max_stargazers: int = Query(20, ge=1, le=1000),
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=100),
+    source: Annotated[NeighbourSource, Query()] = NeighbourSource.GITHUB,
+    approx: Annotated[bool, Query()] = False,
+    strategy: Annotated[SamplingStrategy, Query()] = SamplingStrategy.FIRST,
+    neighbour_index: Annotated[
+        NeighbourIndex | None, Depends(get_neighbour_index)
+    ] = None,
 ) -> StarNeighboursResponse:
+    if approx:
+        return await get_approx_star_neighbours(
+            user, repo, req, github_api, sketch_index, max_stargazers, page, per_page
+        )
+
+    if (
+        neighbour_index
+        and (indexed_neighbours := neighbour_index.get_neighbours(f"{user}/{repo}"))
+        and index_covers(
+            indexed_neighbours, neighbour_index.top_k, max_stargazers, page * per_page
+        )
+    ):
+        # Listed like the GitHub crawl lists them, the base repository by its bare name
+        base_repo = f"{user}/{repo}".lower()
+        return paginate_star_neighbours(
+            [
+                StarNeighbours(
+                    repo=repo if repo_name.lower() == base_repo else repo_name,
+                    stargazers_count=shared_count,
+                )
+                for repo_name, shared_count in indexed_neighbours
+            ],
+            req,
+            page,
+            per_page,
+        )
+
+    if source == NeighbourSource.STORE:
+        # The query streams the whole neighbourhood, it mustn't block the event loop
+        stored_neighbours = await run_in_threadpool(
+            star_repository.get_star_neighbours, f"{user}/{repo}", max_stargazers
+        )
+        background_tasks.add_task(sketch_index.update, stored_neighbours)
+        return rank_star_neighbours(stored_neighbours, req, page, per_page)
+
     neighbours_repos: DefaultDict[str, set[str]] = defaultdict(set)
     try:
-        repo_stargazers = await github_api.get_stargazers_by_repo(
-            user, repo, max_stargazers
-        )
+        with timed("stargazers"):
+            repo_stargazers = await github_api.get_stargazers_by_repo(
+                user, repo, max_stargazers, strategy
+            )
     except HTTPStatusError as e:
         raise HTTPException(
             status_code=e.response.status_code,
@@ -54,30 +149,451 @@ async def get_repo_star_neighbours(
 
     neighbours_repos[repo] = base_repo_stargazers_set
 
-    starred_repos_results: Any = await asyncio.gather(
-        *[
-            github_api.get_starred_repos_by_username(username)
-            for username in base_repo_stargazers_set
-        ],
-        return_exceptions=True,
+    if strategy == SamplingStrategy.ADAPTIVE:
+        usernames = sorted(base_repo_stargazers_set)
+        # Each batch must be a uniform sample as well, the seed keeps it cache friendly
+        random.Random(f"{user}/{repo}").shuffle(usernames)
+        nb_failures = await fetch_starred_repos_adaptively(
+            github_api, usernames, neighbours_repos, top_k=page * per_page
+        )
+    else:
+        nb_failures = await fetch_starred_repos(
+            github_api, base_repo_stargazers_set, neighbours_repos
+        )
+
+    background_tasks.add_task(
+        sketch_index.update, get_sketched_stargazers(neighbours_repos, user, repo)
+    )
+    response = rank_star_neighbours(neighbours_repos, req, page, per_page)
+    # Degraded answer when GitHub failed for some of the stargazers
+    response.coverage = 1 - nb_failures / len(base_repo_stargazers_set)
+    return response
+
+
+@router.get(
+    "/repos/{user}/{repo}/starneighbours/estimate",
+    summary="Estimate the cost of a neighbour repositories query.",
+    description=(
+        """
+        Dry run of `/starneighbours` with GitHub as source: checks which stargazers and starred
+        lists pages are cached and estimates the GitHub calls, the duration from the observed
+        calls latencies, and the rate limit left afterwards. Nothing is fetched from GitHub.
+        """
+    ),
+)
+async def get_repo_star_neighbours_estimate(
+    user: str,
+    repo: str,
+    github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+    auth_user: User = Depends(validate_api_key),
+    max_stargazers: int = Query(20, ge=1, le=1000),
+    strategy: Annotated[SamplingStrategy, Query()] = SamplingStrategy.FIRST,
+) -> StarNeighboursEstimate:
+    return await estimate_star_neighbours(
+        github_api, user, repo, max_stargazers, strategy
     )
 
-    for result in starred_repos_results:
-        if isinstance(result, Exception):
-            logger.warning(f"Failed to fetch starred repos: {result}")
+
+@router.post(
+    "/starneighbours/batch",
+    dependencies=[Depends(admission(estimate_batch_star_neighbours_calls))],
+    summary="Retrieve the neighbour repositories of many repositories at once.",
+    description=(
+        """
+        Computes the neighbours of every repository from a single shared fan-out: the stargazers
+        are deduplicated across all the repositories and each starred list is fetched only once.
+        The first `per_page` neighbours of each repository are returned.
+        """
+    ),
+)
+async def get_batch_star_neighbours(
+    batch: BatchStarNeighboursRequest,
+    background_tasks: BackgroundTasks,
+    github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+    sketch_index: Annotated[SketchIndex, Depends(get_sketch_index)],
+    auth_user: User = Depends(validate_api_key),
+) -> BatchStarNeighboursResponse:
+    full_names = list(dict.fromkeys(batch.repos))
+    # Batches are bulk traffic, the single repository queries stay responsive. Below
+    # the bulk share of the rate limit, they're rejected rather than held until its
+    # reset, and the calls failing meanwhile are reported as errors.
+    github_api.scheduler.check_rate_budget(Priority.BULK)
+    with github_priority(Priority.BULK):
+        stargazers_results: Any = await asyncio.gather(
+            *[
+                get_repo_stargazers(github_api, full_name, batch)
+                for full_name in full_names
+            ],
+            return_exceptions=True,
+        )
+
+    stargazers_by_repo: dict[str, list[str]] = {}
+    errors: dict[str, str] = {}
+    for full_name, result in zip(full_names, stargazers_results):
+        if isinstance(result, HTTPStatusError):
+            errors[full_name] = f"API Error: {result.response.status_code}"
+        elif isinstance(result, HTTPException):
+            errors[full_name] = f"API Error: {result.status_code}"
+        elif isinstance(result, Exception):
+            logger.warning(f"Failed to fetch the stargazers of {full_name}: {result}")
+            errors[full_name] = "Failed to fetch the stargazers"
+        else:
+            stargazers_by_repo[full_name] = [stargazer["login"] for stargazer in result]
+
+    # Shared bipartite graph, each stargazer is fetched once whatever its repositories
+    fetched_stargazers = select_batch_stargazers(
+        stargazers_by_repo, settings.batch_max_stargazers
+    )
+    stargazers_by_starred_repo: DefaultDict[str, set[str]] = defaultdict(set)
+    with github_priority(Priority.BULK):
+        await fetch_starred_repos(
+            github_api, fetched_stargazers, stargazers_by_starred_repo
+        )
+    background_tasks.add_task(sketch_index.update, stargazers_by_starred_repo)
+
+    starred_repos_by_user: DefaultDict[str, list[str]] = defaultdict(list)
+    for starred_repo, stargazers in stargazers_by_starred_repo.items():
+        for username in stargazers:
+            starred_repos_by_user[username].append(starred_repo)
+
+    results = []
+    for full_name in full_names:
+        if full_name in errors:
+            results.append(
+                RepoStarNeighbours(
+                    repo=full_name, star_neighbours=[], error=errors[full_name]
+                )
+            )
+            continue
+        all_stargazers = stargazers_by_repo[full_name]
+        repo_stargazers = fetched_stargazers.intersection(all_stargazers)
+        neighbours_repos: DefaultDict[str, set[str]] = defaultdict(set)
+        if repo_stargazers:
+            neighbours_repos[full_name] = repo_stargazers
+        for username in repo_stargazers:
+            for starred_repo in starred_repos_by_user[username]:
+                neighbours_repos[starred_repo].add(username)
+        results.append(
+            RepoStarNeighbours(
+                repo=full_name,
+                star_neighbours=sort_star_neighbours(neighbours_repos)[
+                    : batch.per_page
+                ],
+                coverage=(
+                    len(repo_stargazers) / len(all_stargazers) if all_stargazers else 1
+                ),
+            )
+        )
+    return BatchStarNeighboursResponse(results=results)
+
+
+async def get_repo_stargazers(
+    github_api: GitHubAPI, full_name: str, batch: BatchStarNeighboursRequest
+) -> list[dict[str, Any]]:
+    owner, name = full_name.split("/", 1)
+    return await github_api.get_stargazers_by_repo(
+        owner, name, batch.max_stargazers, batch.strategy
+    )
+
+
+def select_batch_stargazers(
+    stargazers_by_repo: dict[str, list[str]], max_stargazers: int
+) -> set[str]:
+    """
+    Stargazers whose starred repositories are fetched for a batch, at most
+    max_stargazers of them. The repositories are visited in turn, so each one keeps
+    a fair share of them, the stargazers shared by several repositories counting once.
+    """
+    selected: dict[str, None] = {}
+    for stargazers in zip_longest(*stargazers_by_repo.values()):
+        for username in stargazers:
+            if len(selected) >= max_stargazers:
+                return set(selected)
+            if username is not None:
+                selected[username] = None
+    return set(selected)
+
+
+@router.get(
+    "/repos/{user}/{repo}/constellation",
+    dependencies=[Depends(admission(estimate_constellation_calls))],
+    summary="Explore the neighbours of the neighbours of a repository.",
+    description=(
+        """
+        Expands the star neighbours graph up to `depth`, best-first: the neighbours sharing the most
+        stargazers are expanded first. Each expanded repository keeps its `per_node` closest
+        neighbours. The exploration stops once `budget` GitHub calls were sent, cached pages from the
+        previous queries being free.
+        """
+    ),
+)
+async def get_repo_constellation(
+    user: str,
+    repo: str,
+    github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+    auth_user: User = Depends(validate_api_key),
+    depth: Annotated[int, Query(ge=1, le=4)] = 2,
+    budget: Annotated[int, Query(ge=1, le=5000)] = 500,
+    max_stargazers: Annotated[int, Query(ge=1, le=1000)] = 20,
+    per_node: Annotated[int, Query(ge=1, le=20)] = 5,
+) -> ConstellationResponse:
+    root = f"{user}/{repo}"
+    nodes = {root: ConstellationNode(repo=root, depth=0, weight=0)}
+    edges: list[ConstellationEdge] = []
+    # Max heap on the shared stargazers weight
+    frontier: list[tuple[int, int, str]] = [(0, 0, root)]
+    expanded: set[str] = set()
+    budget_exhausted = False
+
+    while frontier:
+        _, node_depth, full_name = heapq.heappop(frontier)
+        if full_name in expanded:
+            continue
+        # Each stargazer costs a starred list call, plus one call per stargazers page
+        remaining_budget = budget - github_api.request_count
+        nb_stargazers = min(max_stargazers, remaining_budget * 100 // 101)
+        if nb_stargazers < 1:
+            budget_exhausted = True
+            break
+        expanded.add(full_name)
+
+        owner, name = full_name.split("/", 1)
+        try:
+            repo_stargazers = await github_api.get_stargazers_by_repo(
+                owner, name, nb_stargazers
+            )
+        except HTTPStatusError as e:
+            if full_name == root:
+                raise HTTPException(
+                    status_code=e.response.status_code,
+                    detail={"error": "API Error", "response": e.response.json()},
+                )
+            logger.warning(f"Failed to fetch the stargazers of {full_name}: {e}")
             continue
-        username, starred_repos = result
-        for starred_repo in starred_repos:
-            neighbours_repos[starred_repo].add(username)
 
-    neighbours_repos_list = sorted(
+        usernames = list(dict.fromkeys(s["login"] for s in repo_stargazers))
+        neighbours_repos: DefaultDict[str, set[str]] = defaultdict(set)
+        position = 0
+        while position < len(usernames):
+            # Retried and hedged calls cost more than planned, so the budget is
+            # checked again before each wave
+            remaining_budget = budget - github_api.request_count
+            if remaining_budget < 1:
+                budget_exhausted = True
+                break
+            wave = usernames[
+                position : position + min(CONSTELLATION_WAVE_SIZE, remaining_budget)
+            ]
+            position += len(wave)
+            await fetch_starred_repos(github_api, wave, neighbours_repos)
+        neighbours_repos.pop(full_name, None)
+
+        for neighbour in sort_star_neighbours(neighbours_repos)[:per_node]:
+            edges.append(
+                ConstellationEdge(
+                    source=full_name,
+                    target=neighbour.repo,
+                    shared_stargazers=neighbour.stargazers_count,
+                )
+            )
+            if neighbour.repo not in nodes:
+                nodes[neighbour.repo] = ConstellationNode(
+                    repo=neighbour.repo,
+                    depth=node_depth + 1,
+                    weight=neighbour.stargazers_count,
+                )
+                if node_depth + 1 < depth:
+                    heapq.heappush(
+                        frontier,
+                        (-neighbour.stargazers_count, node_depth + 1, neighbour.repo),
+                    )
+        if budget_exhausted:
+            break
+
+    return ConstellationResponse(
+        nodes=list(nodes.values()),
+        edges=edges,
+        github_calls=github_api.request_count,
+        budget_exhausted=budget_exhausted,
+    )
+
+
+async def fetch_starred_repos(
+    github_api: GitHubAPI,
+    usernames: Iterable[str],
+    neighbours_repos: DefaultDict[str, set[str]],
+) -> int:
+    """
+    Fans out the starred repositories of the users, adding them to neighbours_repos.
+    Returns the number of users whose starred repositories couldn't be fetched.
+    """
+    usernames = list(usernames)
+    FANOUT_WIDTH.observe(len(usernames))
+    starred_repos_results: Any
+    with timed("fanout"):
+        if settings.github_fetch_backend == "graphql" and github_api.token:
+            # GraphQL needs an authenticated client
+            starred_repos_results = await GitHubGraphQLAPI(
+                github_api
+            ).get_starred_repos_by_usernames(usernames)
+        else:
+            starred_repos_results = await asyncio.gather(
+                *[
+                    github_api.get_starred_repos_by_username(username)
+                    for username in usernames
+                ],
+                return_exceptions=True,
+            )
+
+    nb_failures = 0
+    with timed("aggregation"):
+        for result in starred_repos_results:
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to fetch starred repos: {result}")
+                nb_failures += 1
+                continue
+            username, starred_repos = result
+            for starred_repo in starred_repos:
+                neighbours_repos[starred_repo].add(username)
+    return nb_failures
+
+
+async def fetch_starred_repos_adaptively(
+    github_api: GitHubAPI,
+    usernames: list[str],
+    neighbours_repos: DefaultDict[str, set[str]],
+    top_k: int,
+) -> int:
+    """
+    Fans out by batches and stops as soon as two consecutive batches give the same
+    top_k neighbours, the remaining stargazers wouldn't change the requested page.
+    Returns the number of users whose starred repositories couldn't be fetched.
+    """
+    nb_failures = 0
+    previous_top_neighbours = None
+    for start in range(0, len(usernames), ADAPTIVE_BATCH_SIZE):
+        nb_failures += await fetch_starred_repos(
+            github_api,
+            usernames[start : start + ADAPTIVE_BATCH_SIZE],
+            neighbours_repos,
+        )
+        top_neighbours = set(
+            heapq.nlargest(
+                top_k, neighbours_repos, key=lambda r: len(neighbours_repos[r])
+            )
+        )
+        if top_neighbours == previous_top_neighbours:
+            logger.info(
+                f"Ranking stable after {start + ADAPTIVE_BATCH_SIZE} of {len(usernames)} stargazers"
+            )
+            break
+        previous_top_neighbours = top_neighbours
+    return nb_failures
+
+
+async def get_approx_star_neighbours(
+    user: str,
+    repo: str,
+    req: Request,
+    github_api: GitHubAPI,
+    sketch_index: SketchIndex,
+    max_stargazers: int,
+    page: int,
+    per_page: int,
+) -> StarNeighboursResponse:
+    full_name = f"{user}/{repo}"
+    similar_repos = await sketch_index.get_similar_repos(full_name)
+    if similar_repos is None:
+        # No sketch yet, we seed it with a sample of the stargazers, without fan-out
+        try:
+            repo_stargazers = await github_api.get_stargazers_by_repo(
+                user, repo, max_stargazers
+            )
+        except HTTPStatusError as e:
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail={"error": "API Error", "response": e.response.json()},
+            )
+        await sketch_index.update(
+            {full_name: {stargazer["login"] for stargazer in repo_stargazers}}
+        )
+        similar_repos = await sketch_index.get_similar_repos(full_name) or []
+
+    return paginate_star_neighbours(
+        [
+            StarNeighbours(repo=repo_name, jaccard=jaccard, jaccard_error=error)
+            for repo_name, jaccard, error in similar_repos
+        ],
+        req,
+        page,
+        per_page,
+    )
+
+
+def rank_star_neighbours(
+    neighbours_repos: dict[str, set[str]], req: Request, page: int, per_page: int
+) -> StarNeighboursResponse:
+    NEIGHBOUR_SET_SIZE.observe(len(neighbours_repos))
+    start = perf_counter()
+    with timed("sort"):
+        sorted_neighbours = sort_star_neighbours(neighbours_repos)
+    response = paginate_star_neighbours(sorted_neighbours, req, page, per_page)
+    SERIALIZATION_SECONDS.observe(perf_counter() - start)
+    return response
+
+
+def sort_star_neighbours(neighbours_repos: dict[str, set[str]]) -> list[StarNeighbours]:
+    return sorted(
         [
-            StarNeighbours.model_validate({"repo": repo_name, "stargazers": stargazers})
+            StarNeighbours.model_validate(
+                {
+                    "repo": repo_name,
+                    "stargazers": stargazers,
+                    "stargazers_count": len(stargazers),
+                }
+            )
             for repo_name, stargazers in neighbours_repos.items()
         ],
-        key=lambda r: len(r.stargazers),
+        key=lambda r: r.stargazers_count,
         reverse=True,
     )
+
+
+def get_sketched_stargazers(
+    neighbours_repos: dict[str, set[str]], user: str, repo: str
+) -> dict[str, set[str]]:
+    """
+    The base repository is listed under its bare name in the response, its sketch is
+    stored under its full name like the ones of the starred repositories.
+    """
+    stargazers_by_repo = dict(neighbours_repos)
+    full_name = f"{user}/{repo}"
+    stargazers_by_repo[full_name] = stargazers_by_repo.pop(
+        repo
+    ) | stargazers_by_repo.get(full_name, set())
+    return stargazers_by_repo
+
+
+def index_covers(
+    indexed_neighbours: list[tuple[str, int]],
+    top_k: int,
+    max_stargazers: int,
+    nb_neighbours: int,
+) -> bool:
+    """
+    The index counts every stored stargazer, whatever the source: it answers the
+    queries taking all of them, the repository being its own first neighbour with its
+    stargazers count, and asking for no more neighbours than it kept.
+    """
+    _, nb_stargazers = indexed_neighbours[0]
+    return max_stargazers >= nb_stargazers and (
+        nb_neighbours <= len(indexed_neighbours) or len(indexed_neighbours) < top_k
+    )
+
+
+def paginate_star_neighbours(
+    neighbours_repos_list: list[StarNeighbours], req: Request, page: int, per_page: int
+) -> StarNeighboursResponse:
     pagination_start = (page - 1) * per_page
     pagination_end = pagination_start + per_page
     paginated_response = neighbours_repos_list[pagination_start:pagination_end]
@@ -87,3 +603,30 @@ async def get_repo_star_neighbours(
         next_url = str(req.url.include_query_params(page=page + 1, per_page=per_page))
 
     return StarNeighboursResponse(star_neighbours=paginated_response, next=next_url)
+
+
+@router.post(
+    "/repos/{user}/{repo}/refresh",
+    dependencies=[Depends(admission(estimate_refresh_calls))],
+    summary="Refresh the persisted stargazers of a repository.",
+    description=(
+        """
+        Incrementally synchronises the stored star graph of a repository with GitHub.
+        Only the stargazers pages containing new stars are fetched.
+        """
+    ),
+)
+async def refresh_repo_stars(
+    user: str,
+    repo: str,
+    star_graph_service: Annotated[StarGraphService, Depends(get_star_graph_service)],
+    auth_user: User = Depends(validate_api_key),
+) -> StarGraphRefreshResponse:
+    try:
+        new_stars = await star_graph_service.refresh_repo(user, repo)
+    except HTTPStatusError as e:
+        raise HTTPException(
+            status_code=e.response.status_code,
+            detail={"error": "API Error", "response": e.response.json()},
+        )
+    return StarGraphRefreshResponse(repo=f"{user}/{repo}", new_stars=new_stars)
@@ -0,0 +1,66 @@
+import asyncio
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from fastapi import APIRouter, Request, Response, status
+from sqlalchemy import text
+
+from app.db.engine import engine
+from app.redis.engine import get_redis_client
+from app.schemas.health import DependencyHealth, HealthResponse
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+# A dependency slower than this is reported as unavailable
+CHECK_TIMEOUT = 2
+
+
+def ping_db() -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def check_dependency(check: Callable[[], Awaitable[Any]]) -> DependencyHealth:
+    start = perf_counter()
+    try:
+        await asyncio.wait_for(check(), CHECK_TIMEOUT)
+    except Exception as e:
+        return DependencyHealth(ok=False, error=str(e) or type(e).__name__)
+    return DependencyHealth(
+        ok=True, latency_ms=round((perf_counter() - start) * 1000, 2)
+    )
+
+
+@router.get(
+    "/live",
+    summary="Liveness probe.",
+    description="The worker process answers, its dependencies aren't checked.",
+)
+async def get_liveness() -> HealthResponse:
+    return HealthResponse(status="alive")
+
+
+@router.get(
+    "/ready",
+    summary="Readiness probe.",
+    description=(
+        """
+        The worker is ready once its startup warm up is over and Postgres and Redis
+        answer, with their latency. Answers `503` otherwise.
+        """
+    ),
+)
+async def get_readiness(request: Request, response: Response) -> HealthResponse:
+    postgres, redis = await asyncio.gather(
+        check_dependency(lambda: asyncio.to_thread(ping_db)),
+        check_dependency(get_redis_client().redis_client.ping),
+    )
+    warm = getattr(request.app.state, "warm", False)
+    ready = warm and postgres.ok and redis.ok
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return HealthResponse(
+        status="ready" if ready else "unavailable",
+        warm=warm,
+        dependencies={"postgres": postgres, "redis": redis},
+    )
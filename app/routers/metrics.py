@@ -0,0 +1,42 @@
+from hmac import compare_digest
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Response, status
+from fastapi.params import Security
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.config import get_settings
+
+router = APIRouter(tags=["metrics"])
+
+settings = get_settings()
+
+metrics_bearer = HTTPBearer(auto_error=False)
+
+
+@router.get(
+    "/metrics",
+    summary="Metrics of the process, in the Prometheus text format.",
+    response_class=Response,
+    include_in_schema=False,
+)
+async def get_metrics(
+    credentials: Annotated[
+        HTTPAuthorizationCredentials | None, Security(metrics_bearer)
+    ],
+) -> Response:
+    # Scraped with the bearer token of the Prometheus job
+    if not settings.metrics_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The metrics aren't configured",
+        )
+    if credentials is None or not compare_digest(
+        credentials.credentials, settings.metrics_token
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing or invalid metrics token",
+        )
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
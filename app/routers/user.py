@@ -11,6 +11,7 @@ from app.repositories.exception import (
 )
 from app.repositories.user import UserRepository, get_user_repository
 from app.schemas.user import UserCreate, UserRead, UserAuthenticate
+from app.timing import timed
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -21,7 +22,8 @@ async def validate_api_key(
     api_key: str = Security(api_key_header),
     user_repository: UserRepository = Depends(get_user_repository),
 ) -> User:
-    user = user_repository.check_api_key(api_key)
+    with timed("auth"):
+        user = user_repository.check_api_key(api_key)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +32,18 @@ async def validate_api_key(
     return user
 
 
+async def validate_admin_api_key(
+    user: Annotated[User, Depends(validate_api_key)],
+    user_repository: Annotated[UserRepository, Depends(get_user_repository)],
+) -> User:
+    if not user_repository.is_admin(user):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Reserved to the admin users",
+        )
+    return user
+
+
 @router.post(
     "/create_user",
     summary="Create a new api user.",
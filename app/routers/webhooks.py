@@ -0,0 +1,50 @@
+from typing import Annotated
+
+import orjson
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.params import Depends
+
+from app.config import get_settings
+from app.schemas.star import StarEventResponse
+from app.services.webhooks import (
+    StarEventHandler,
+    get_star_event_handler,
+    verify_signature,
+)
+
+router = APIRouter(prefix="/webhooks", tags=["webhooks"])
+
+settings = get_settings()
+
+
+@router.post(
+    "/github",
+    summary="Receive the GitHub star events.",
+    description=(
+        """
+        Endpoint of a GitHub webhook subscribed to the `watch` and `star` events, signed
+        with `GITHUB_WEBHOOK_SECRET`. Each star patches the cached stargazers and starred
+        lists in place and extends their expiration, the other events are ignored, and so
+        are the redeliveries of an applied `X-GitHub-Delivery`.
+        """
+    ),
+)
+async def receive_github_webhook(
+    request: Request,
+    handler: Annotated[StarEventHandler, Depends(get_star_event_handler)],
+    x_github_event: Annotated[str, Header()],
+    x_hub_signature_256: Annotated[str | None, Header()] = None,
+    x_github_delivery: Annotated[str | None, Header()] = None,
+) -> StarEventResponse:
+    if not settings.github_webhook_secret:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="The GitHub webhooks aren't configured",
+        )
+    body = await request.body()
+    if not verify_signature(settings.github_webhook_secret, body, x_hub_signature_256):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature",
+        )
+    return await handler.handle(x_github_event, orjson.loads(body), x_github_delivery)
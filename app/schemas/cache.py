@@ -0,0 +1,28 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class NamespaceStats(BaseModel):
+    namespace: str = Field(examples=["github:stargazers"])
+    keys: int = Field(default=0, examples=[1200])
+    bytes: int = Field(default=0, examples=[52_428_800])
+    hits: int = Field(default=0, examples=[9000])
+    misses: int = Field(default=0, examples=[1000])
+    hit_ratio: Optional[float] = Field(
+        default=None,
+        description="Share of the lookups served by the cache, in this process",
+        examples=[0.9],
+    )
+
+
+class CacheStatsResponse(BaseModel):
+    namespaces: list[NamespaceStats]
+    keys: int = Field(examples=[5000])
+    bytes: int = Field(examples=[104_857_600])
+
+
+class CacheInvalidationResponse(BaseModel):
+    kind: Literal["repo", "user"] = Field(examples=["repo"])
+    name: str = Field(examples=["encode/uvicorn"])
+    deleted_keys: int = Field(examples=[12])
@@ -1,8 +1,20 @@
+from enum import Enum
 from typing import Any
 
 from pydantic import BaseModel
 
 
+class SamplingStrategy(str, Enum):
+    # The first stargazers in GitHub order, which are the oldest ones
+    FIRST = "first"
+    # Pages evenly spread over the whole stargazers list
+    UNIFORM = "uniform"
+    # The most recent stargazers first
+    RECENT = "recent"
+    # Uniform sample, with a fan-out stopped once the ranking is stable
+    ADAPTIVE = "adaptive"
+
+
 class GitHubAPIResponseSchema(BaseModel):
     content: str
     links: dict[str, Any]
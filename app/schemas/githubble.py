@@ -1,11 +1,30 @@
-from typing import Optional
+from enum import Enum
+from typing import Annotated, Optional
 
 from pydantic import BaseModel, Field
 
+from app.schemas.github import SamplingStrategy
+
+
+class NeighbourSource(str, Enum):
+    GITHUB = "github"
+    STORE = "store"
+
 
 class StarNeighbours(BaseModel):
     repo: str = Field(examples=["Mergify"])
-    stargazers: list[str] = Field(examples=[["Pierre", "Paul", "Jacques"]])
+    stargazers: list[str] = Field(default=[], examples=[["Pierre", "Paul", "Jacques"]])
+    stargazers_count: int = Field(default=0, examples=[3])
+    jaccard: Optional[float] = Field(
+        default=None,
+        examples=[0.42],
+        description="Estimated stargazers similarity, only set in approximate mode.",
+    )
+    jaccard_error: Optional[float] = Field(
+        default=None,
+        examples=[0.04],
+        description="Standard error of the estimated similarity.",
+    )
 
 
 class StarNeighboursResponse(BaseModel):
@@ -15,3 +34,60 @@ class StarNeighboursResponse(BaseModel):
             "/githubble/repos/myuser/myrepo/starneighbours?max_stargazers=100&page=2&per_page=10"
         ]
     )
+    # Share of the stargazers whose starred repositories could be fetched
+    coverage: float = 1.0
+
+
+class StarNeighboursEstimate(BaseModel):
+    repo: str
+    # Known when the stargazers pages are cached, max_stargazers otherwise
+    stargazers: int
+    cached_requests: int
+    github_calls: int
+    expected_latency: float = Field(description="Expected duration, in seconds.")
+    rate_limit_remaining: Optional[int] = None
+    rate_limit_remaining_after: Optional[int] = None
+
+
+class BatchStarNeighboursRequest(BaseModel):
+    repos: list[Annotated[str, Field(pattern=r"^[\w.-]+/[\w.-]+$")]] = Field(
+        min_length=1, max_length=50, examples=[["encode/uvicorn", "encode/starlette"]]
+    )
+    max_stargazers: int = Field(default=20, ge=1, le=1000)
+    per_page: int = Field(default=10, ge=1, le=100)
+    strategy: SamplingStrategy = SamplingStrategy.FIRST
+
+
+class RepoStarNeighbours(BaseModel):
+    repo: str = Field(examples=["encode/uvicorn"])
+    star_neighbours: list[StarNeighbours]
+    error: Optional[str] = Field(default=None, examples=["API Error: 404"])
+    # Share of the stargazers whose starred repositories were fetched, the batch
+    # fetches a bounded number of them
+    coverage: float = 1.0
+
+
+class BatchStarNeighboursResponse(BaseModel):
+    results: list[RepoStarNeighbours]
+
+
+class ConstellationNode(BaseModel):
+    repo: str = Field(examples=["encode/starlette"])
+    depth: int = Field(examples=[1])
+    weight: int = Field(
+        examples=[12],
+        description="Shared stargazers with the repository it was reached from.",
+    )
+
+
+class ConstellationEdge(BaseModel):
+    source: str = Field(examples=["encode/uvicorn"])
+    target: str = Field(examples=["encode/starlette"])
+    shared_stargazers: int = Field(examples=[12])
+
+
+class ConstellationResponse(BaseModel):
+    nodes: list[ConstellationNode]
+    edges: list[ConstellationEdge]
+    github_calls: int = Field(examples=[180])
+    budget_exhausted: bool
@@ -0,0 +1,17 @@
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class DependencyHealth(BaseModel):
+    ok: bool
+    latency_ms: Optional[float] = Field(default=None, examples=[0.8])
+    error: Optional[str] = None
+
+
+class HealthResponse(BaseModel):
+    status: Literal["alive", "ready", "unavailable"]
+    warm: bool = Field(
+        default=False, description="The startup warm up of the worker is over"
+    )
+    dependencies: dict[str, DependencyHealth] = Field(default_factory=dict)
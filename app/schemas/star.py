@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from pydantic import BaseModel, Field
+
+
+class StarEdge(NamedTuple):
+    """
+    Lightweight row used for the bulk loads of the star graph
+    """
+
+    user_id: int
+    user_login: str
+    repo_id: int
+    repo_full_name: str
+    starred_at: Optional[datetime] = None
+
+
+class StarGraphRefreshResponse(BaseModel):
+    repo: str = Field(examples=["encode/uvicorn"])
+    new_stars: int = Field(examples=[42])
+
+
+class StarEventResponse(BaseModel):
+    event: str = Field(examples=["star"])
+    # starred, unstarred, ignored or duplicate
+    action: str = Field(examples=["starred"])
+    patched_entities: int = Field(
+        default=0,
+        description="Cached stargazers and starred lists updated in place",
+        examples=[2],
+    )
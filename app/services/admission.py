@@ -0,0 +1,187 @@
+import logging
+import math
+from contextlib import asynccontextmanager
+from time import time
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable
+
+from fastapi import Depends, HTTPException, Request, status
+
+from app.config import get_settings
+from app.models import User
+from app.redis.engine import RedisClient, get_redis_client
+from app.routers.user import validate_api_key
+from app.services.github.api import GitHubAPI, get_github_api
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+class AdmissionController:
+    QUOTA_KEY = "quota_{user_id}_{window}"
+    CONCURRENCY_KEY = "concurrency_{user_id}"
+    # Safety net for the slots of a killed worker
+    CONCURRENCY_EXPIRATION_TIME = 300
+
+    def __init__(self, redis_client: RedisClient):
+        """
+        Admission control per API key, in front of the GitHub calls: a sliding window
+        quota counted in GitHub calls, a cap on the concurrent requests, and load
+        shedding while the process GitHub queue is too deep. Rejections are fast 429s
+        with a Retry-After header.
+        """
+        self.redis_client = redis_client
+        self.quota = settings.quota_github_calls
+        self.window = settings.quota_window
+        self.max_concurrent_requests = settings.max_concurrent_requests_per_key
+
+    @staticmethod
+    def reject(detail: str, retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"error": detail},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def check_github_queue(self) -> None:
+        if GitHubAPI.pending_calls >= settings.max_github_queue_depth:
+            raise self.reject(
+                "The service is overloaded, please retry later.",
+                settings.github_queue_retry_after,
+            )
+
+    def get_quota_keys(self, user: User, now: float) -> tuple[str, str, float]:
+        """
+        Sliding window counter: the previous fixed window is weighted by its share
+        still covered by the sliding window
+        """
+        window = int(now // self.window)
+        elapsed = now / self.window - window
+        return (
+            self.QUOTA_KEY.format(user_id=user.id, window=window),
+            self.QUOTA_KEY.format(user_id=user.id, window=window - 1),
+            elapsed,
+        )
+
+    async def consume_quota(self, user: User, cost: int) -> str:
+        now = time()
+        key, previous_key, elapsed = self.get_quota_keys(user, now)
+        current = await self.redis_client.increment_counter(key, cost, self.window * 2)
+        (previous,) = await self.redis_client.get_cached_values_by_keys([previous_key])
+        previous = previous or 0
+        if previous * (1 - elapsed) + current <= self.quota:
+            return key
+
+        await self.redis_client.increment_counter(key, -cost)
+        available = self.quota - (current - cost)
+        if previous and available >= 0:
+            # The previous window share decays until the cost fits
+            retry_after = (1 - available / previous - elapsed) * self.window
+        else:
+            retry_after = (1 - elapsed) * self.window
+        raise self.reject("GitHub calls quota exceeded.", retry_after)
+
+    async def acquire_concurrency_slot(self, user: User) -> str:
+        key = self.CONCURRENCY_KEY.format(user_id=user.id)
+        nb_requests = await self.redis_client.increment_counter(
+            key, 1, self.CONCURRENCY_EXPIRATION_TIME
+        )
+        if nb_requests > self.max_concurrent_requests:
+            await self.redis_client.increment_counter(key, -1)
+            raise self.reject("Too many concurrent requests.", 1)
+        return key
+
+    @asynccontextmanager
+    async def admit(
+        self, user: User, estimated_calls: int, github_api: GitHubAPI | None = None
+    ) -> AsyncIterator[None]:
+        """
+        The quota is charged with the estimated calls, then corrected with the calls
+        actually sent, so the cached answers are cheap
+        """
+        self.check_github_queue()
+        concurrency_key = await self.acquire_concurrency_slot(user)
+        try:
+            # A request bigger than the whole quota is allowed when it's unused
+            cost = min(estimated_calls, self.quota)
+            quota_key = await self.consume_quota(user, cost)
+            try:
+                yield
+            finally:
+                if github_api is not None:
+                    await self.redis_client.increment_counter(
+                        quota_key, github_api.request_count - cost
+                    )
+        finally:
+            await self.redis_client.increment_counter(concurrency_key, -1)
+
+
+def get_admission_controller() -> AdmissionController:
+    return AdmissionController(get_redis_client())
+
+
+def get_int_param(request: Request, name: str, default: int) -> int:
+    try:
+        return int(request.query_params.get(name, default))
+    except ValueError:
+        return default
+
+
+def estimate_fan_out_calls(max_stargazers: int) -> int:
+    """
+    The stargazers pages, then a starred list page per stargazer
+    """
+    return math.ceil(max_stargazers / GitHubAPI.GITHUB_PER_PAGE) + max_stargazers
+
+
+async def estimate_star_neighbours_calls(request: Request) -> int:
+    max_stargazers = get_int_param(request, "max_stargazers", 20)
+    if request.query_params.get("source") == "store":
+        return 0
+    if request.query_params.get("approx") in ("1", "true", "True"):
+        return math.ceil(max_stargazers / GitHubAPI.GITHUB_PER_PAGE)
+    return estimate_fan_out_calls(max_stargazers)
+
+
+async def estimate_batch_star_neighbours_calls(request: Request) -> int:
+    try:
+        batch: dict[str, Any] = await request.json()
+        max_stargazers = int(batch.get("max_stargazers", 20))
+        # The stargazers pages, then the starred lists of the capped stargazers
+        return len(batch["repos"]) * math.ceil(
+            max_stargazers / GitHubAPI.GITHUB_PER_PAGE
+        ) + min(len(batch["repos"]) * max_stargazers, settings.batch_max_stargazers)
+    except (ValueError, KeyError, TypeError):
+        # Invalid bodies are rejected by the endpoint validation
+        return 0
+
+
+async def estimate_constellation_calls(request: Request) -> int:
+    return get_int_param(request, "budget", 500)
+
+
+async def estimate_refresh_calls(request: Request) -> int:
+    # The incremental crawl usually stops on the last page
+    return 1
+
+
+def admission(
+    estimate_calls: Callable[[Request], Awaitable[int]],
+) -> Callable[..., AsyncIterator[None]]:
+    """
+    Route dependency admitting the request with its estimated GitHub calls
+    """
+
+    async def admit_request(
+        request: Request,
+        auth_user: Annotated[User, Depends(validate_api_key)],
+        github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+        admission_controller: Annotated[
+            AdmissionController, Depends(get_admission_controller)
+        ],
+    ) -> AsyncIterator[None]:
+        estimated_calls = await estimate_calls(request)
+        async with admission_controller.admit(auth_user, estimated_calls, github_api):
+            yield
+
+    return admit_request
@@ -0,0 +1,71 @@
+from typing import Literal
+
+from app.metrics import CACHE_LOOKUPS
+from app.redis.engine import RedisClient, get_redis_client
+from app.redis.keys import get_index_key, get_key_namespace
+from app.schemas.cache import (
+    CacheInvalidationResponse,
+    CacheStatsResponse,
+    NamespaceStats,
+)
+
+
+class CacheAdmin:
+    def __init__(self, redis_client: RedisClient):
+        """
+        Inspection and targeted invalidation of the cache, to size Redis and to fix
+        bad entries without flushing it
+        """
+        self.redis_client = redis_client
+
+    async def get_stats(self) -> CacheStatsResponse:
+        """
+        Key counts and memory usage per namespace, scanning the whole keyspace, with
+        the hit ratios of the lookups of this process
+        """
+        namespaces: dict[str, NamespaceStats] = {}
+
+        def get_namespace_stats(namespace: str) -> NamespaceStats:
+            if namespace not in namespaces:
+                namespaces[namespace] = NamespaceStats(namespace=namespace)
+            return namespaces[namespace]
+
+        async for keys in self.redis_client.scan_key_sizes():
+            for key, size in keys:
+                stats = get_namespace_stats(get_key_namespace(key))
+                stats.keys += 1
+                stats.bytes += size
+
+        for metric in CACHE_LOOKUPS.collect():
+            for sample in metric.samples:
+                if not sample.name.endswith("_total"):
+                    continue
+                stats = get_namespace_stats(sample.labels["namespace"])
+                if sample.labels["result"] == "hit":
+                    stats.hits = int(sample.value)
+                else:
+                    stats.misses = int(sample.value)
+        for stats in namespaces.values():
+            if stats.hits + stats.misses:
+                stats.hit_ratio = round(stats.hits / (stats.hits + stats.misses), 4)
+
+        return CacheStatsResponse(
+            namespaces=sorted(namespaces.values(), key=lambda stats: -stats.bytes),
+            keys=sum(stats.keys for stats in namespaces.values()),
+            bytes=sum(stats.bytes for stats in namespaces.values()),
+        )
+
+    async def invalidate(
+        self, kind: Literal["repo", "user"], name: str
+    ) -> CacheInvalidationResponse:
+        """
+        Unlinks every cached key of a repository or a user, listed by its index
+        """
+        deleted_keys = await self.redis_client.unlink_index(get_index_key(kind, name))
+        return CacheInvalidationResponse(
+            kind=kind, name=name, deleted_keys=deleted_keys
+        )
+
+
+def get_cache_admin() -> CacheAdmin:
+    return CacheAdmin(get_redis_client())
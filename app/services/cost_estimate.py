@@ -0,0 +1,128 @@
+import math
+
+from prometheus_client import REGISTRY
+
+from app.schemas.github import GitHubAPIResponseSchema, SamplingStrategy
+from app.schemas.githubble import StarNeighboursEstimate
+from app.services.github.api import GitHubAPI
+from app.services.github.formaters import StargazersFormater
+
+# Used until the process observed its own GitHub calls
+DEFAULT_MISS_LATENCY = 0.3
+DEFAULT_HIT_LATENCY = 0.002
+
+
+def get_mean_latency(cache: str, default: float) -> float:
+    count = REGISTRY.get_sample_value(
+        "githubble_github_request_seconds_count", {"cache": cache}
+    )
+    if not count:
+        return default
+    total = REGISTRY.get_sample_value(
+        "githubble_github_request_seconds_sum", {"cache": cache}
+    )
+    return (total or 0) / count
+
+
+async def get_cached_stargazers(
+    github_api: GitHubAPI,
+    owner: str,
+    repo: str,
+    max_stargazers: int,
+    strategy: SamplingStrategy,
+) -> tuple[list[str], int, int]:
+    """
+    Returns the cached stargazers, the number of cached requests and the number of
+    stargazers pages to fetch. The stargazers are only known when nothing is fetched.
+    """
+    usernames: dict[str, None] = {}
+    first_page = 1
+    if strategy == SamplingStrategy.FIRST:
+        entity = await github_api.redis_client.get_cached_value_by_key(
+            github_api.STARGAZERS_ENTITY_KEY.format(owner=owner, repo=repo)
+        )
+        if github_api.entity_covers(entity, max_stargazers):
+            return (
+                [stargazer["login"] for stargazer in entity["records"]][
+                    :max_stargazers
+                ],
+                1,
+                0,
+            )
+        if entity is not None:
+            # The crawl resumes after the pages of the entity
+            first_page = entity["watermark"] + 1
+            usernames = dict.fromkeys(
+                stargazer["login"] for stargazer in entity["records"]
+            )
+
+    formatter = StargazersFormater()
+    cached_pages = await github_api.get_cached_pages(
+        f"repos/{owner}/{repo}/stargazers",
+        formatter,
+        max_stargazers,
+        strategy,
+        first_page,
+    )
+    cached_requests = len(cached_pages) + (first_page > 1)
+    stargazer_calls = sum(page is None for page in cached_pages.values())
+    if stargazer_calls:
+        return [], cached_requests - stargazer_calls, stargazer_calls
+
+    for page in cached_pages.values():
+        if "status_code" in page:
+            continue
+        for stargazer in await formatter(GitHubAPIResponseSchema.model_validate(page)):
+            usernames[stargazer["login"]] = None
+    return list(usernames)[:max_stargazers], cached_requests, 0
+
+
+async def estimate_star_neighbours(
+    github_api: GitHubAPI,
+    owner: str,
+    repo: str,
+    max_stargazers: int,
+    strategy: SamplingStrategy = SamplingStrategy.FIRST,
+) -> StarNeighboursEstimate:
+    """
+    Estimates the cost of a /starneighbours query from the cache content only,
+    nothing is fetched from GitHub. The starred lists of the stargazers are only
+    known to be cached once the stargazers pages are, the others count as calls.
+    The adaptive strategy is estimated as its worst case, the uniform one.
+    """
+    cached_stargazers, cached_requests, stargazer_calls = await get_cached_stargazers(
+        github_api, owner, repo, max_stargazers, strategy
+    )
+    if stargazer_calls:
+        nb_stargazers = max_stargazers
+        cached_starred_lists = 0
+    else:
+        nb_stargazers = len(cached_stargazers)
+        cached_starred_lists = len(
+            await github_api.get_cached_starred_repos_usernames(cached_stargazers)
+        )
+    starred_calls = nb_stargazers - cached_starred_lists
+
+    # Each phase sends its calls in concurrent waves of the scheduler size
+    nb_waves = math.ceil(stargazer_calls / github_api.scheduler.limit) + math.ceil(
+        starred_calls / github_api.scheduler.limit
+    )
+    github_calls = stargazer_calls + starred_calls
+    rate_limit_remaining = github_api.scheduler.rate_limit_remaining
+    return StarNeighboursEstimate(
+        repo=f"{owner}/{repo}",
+        stargazers=nb_stargazers,
+        cached_requests=cached_requests + cached_starred_lists,
+        github_calls=github_calls,
+        expected_latency=round(
+            nb_waves * get_mean_latency("miss", DEFAULT_MISS_LATENCY)
+            + 2 * get_mean_latency("hit", DEFAULT_HIT_LATENCY),
+            3,
+        ),
+        rate_limit_remaining=rate_limit_remaining,
+        rate_limit_remaining_after=(
+            None
+            if rate_limit_remaining is None
+            else rate_limit_remaining - github_calls
+        ),
+    )
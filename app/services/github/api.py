@@ -1,51 +1,109 @@
 import asyncio
+import hashlib
 import logging
+import math
 from datetime import datetime
-from time import time
+from time import perf_counter, time
 from typing import Any, Optional, Tuple
 
 from fastapi import HTTPException
 import httpx
+import orjson
 
 from app.config import get_settings
+from app.metrics import (
+    GITHUB_CALLS,
+    GITHUB_RATE_LIMIT_REMAINING,
+    GITHUB_REQUEST_SECONDS,
+    GITHUB_SEMAPHORE_WAIT_SECONDS,
+)
 from app.redis.engine import RedisClient, get_redis_client
-from app.schemas.github import GitHubAPIResponseSchema
+from app.schemas.github import GitHubAPIResponseSchema, SamplingStrategy
 from app.services.github.formaters import (
     GithubResponseFormatter,
+    RepositoryFormater,
     StargazersFormater,
     StarredRepositoryFormater,
+    TimestampedStargazersFormater,
 )
+from app.services.github.resilience import RetryPolicy, get_circuit_breaker, hedged
+from app.services.github.scheduler import get_scheduler
 
 logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
 
+def get_endpoint_type(url: str) -> str:
+    path = httpx.URL(url).path
+    if path.endswith("/stargazers"):
+        return "stargazers"
+    if path.endswith("/starred"):
+        return "starred"
+    if path.startswith("/repos/"):
+        return "repository"
+    if path.endswith("/graphql"):
+        return "graphql"
+    return "other"
+
+
 class GitHubAPI:
     GITHUB_PER_PAGE = 100
     AIO_SEMAPHORE_LIMIT = 200
     MAX_REPO_PER_STARGAZERS = 100
+    STAR_MEDIA_TYPE = "application/vnd.github.star+json"
+    # Definitive errors, cached so known-bad lookups don't reach GitHub again
+    NEGATIVE_CACHE_STATUSES = {404, 410, 451}
+    # The fan-out waits for its slowest starred list, the other calls aren't worth
+    # the scheduler slot of a duplicate
+    HEDGED_ENDPOINTS = {"starred"}
+    STARGAZERS_ENTITY_KEY = "github_entity_stargazers_{owner}/{repo}"
+    STARRED_ENTITY_KEY = "github_entity_starred_{username}"
+    # GitHub calls waiting or in flight in the process, all instances included
+    pending_calls = 0
 
     def __init__(
-        self, base_url: str, redis_client: RedisClient, token: Optional[str] = None
+        self,
+        base_url: str,
+        redis_client: RedisClient,
+        token: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        client: Optional[httpx.AsyncClient] = None,
     ):
         """
-        This class encapsulates the GitHub api calls
+        This class encapsulates the GitHub api calls, transport allows to target
+        another server than GitHub, as the benchmarks stub. A shared client keeps its
+        connections pooled across the instances.
         """
         self.base_url = base_url
         self.token = token
-        self.semaphore = asyncio.Semaphore(self.AIO_SEMAPHORE_LIMIT)
-        self.client = httpx.AsyncClient(headers=self.get_headers())
+        self.scheduler = get_scheduler(self.AIO_SEMAPHORE_LIMIT)
+        self.owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            headers=self.get_headers(token), transport=transport
+        )
         self.redis_client = redis_client
+        # Calls actually sent to GitHub, cache hits excluded
+        self.request_count = 0
+        # Tokens are never exposed, metrics are labelled with a short digest
+        self.token_label = (
+            hashlib.sha256(token.encode()).hexdigest()[:8] if token else "anonymous"
+        )
         self.reset_lock_key = f"github_request_lock_{self.token or 'null'}"
         self.reset_time_key = "github_request_time"
+        self.retry_policy = RetryPolicy(
+            settings.github_max_attempts,
+            settings.github_retry_base_delay,
+            settings.github_retry_max_delay,
+        )
 
-    def get_headers(self) -> dict[str, Any]:
+    @staticmethod
+    def get_headers(token: Optional[str]) -> dict[str, Any]:
         headers = {
             "Accept": "application/vnd.github.v3+json",
         }
-        if self.token:
-            headers["Authorization"] = f"token {self.token}"
+        if token:
+            headers["Authorization"] = f"token {token}"
         else:
             logger.warning("No GitHub token set, requests will be limited.")
         return headers
@@ -57,6 +115,15 @@ class GitHubAPI:
         """
         We Handle the github rate limit by addding a flag to our redis cache and avoid useless requests
         """
+        if "X-RateLimit-Remaining" in response.headers:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            GITHUB_RATE_LIMIT_REMAINING.labels(self.token_label).set(remaining)
+            if "X-RateLimit-Limit" in response.headers:
+                self.scheduler.update_rate_limit(
+                    remaining,
+                    int(response.headers["X-RateLimit-Limit"]),
+                    int(response.headers.get("X-RateLimit-Reset", 0)),
+                )
         if int(response.headers.get("X-RateLimit-remaining", 1)) < 1:
             reset_timestamp = int(response.headers["X-RateLimit-Reset"])
             lock_duration = reset_timestamp - int(time())
@@ -73,12 +140,7 @@ class GitHubAPI:
     async def rate_limit_reached(self) -> bool:
         return await self.redis_client.key_exists(self.reset_lock_key)
 
-    async def make_request(self, url: str) -> GitHubAPIResponseSchema:
-        cached_response = await self.redis_client.get_cached_value_by_key(url)
-
-        if cached_response:
-            return GitHubAPIResponseSchema.model_validate(cached_response)
-
+    async def check_rate_limit(self) -> None:
         if await self.rate_limit_reached():
             reset_time = await self.redis_client.get_cached_value_by_key(
                 self.reset_time_key
@@ -89,84 +151,578 @@ class GitHubAPI:
                     "error": f"GitHub rate limit reached. The limit will be restored at {reset_time or 'unknown'}"
                 },
             )
-        async with self.semaphore:
-            response = await self.client.get(url)
-            await self.handle_rate_limit(response)
+
+    async def fetch(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        content: bytes | None = None,
+        hedge_delay: float | None = None,
+    ) -> tuple[httpx.Response, bytes]:
+        """
+        A single attempt, a POST of the content when there is one, as the GraphQL
+        queries, a GET otherwise. The body is returned as bytes, left to the caller
+        to decode. With a hedge_delay, the exchange is hedged once it got its
+        scheduler slot, the duplicate waiting for a slot of its own.
+        """
+        method = "GET" if content is None else "POST"
+
+        async def exchange() -> tuple[httpx.Response, bytes]:
+            self.request_count += 1
+            GITHUB_CALLS.labels(self.token_label, get_endpoint_type(url)).inc()
+            async with self.client.stream(
+                method, url, headers=headers, content=content
+            ) as response:
+                return response, await response.aread()
+
+        async def hedge_exchange() -> tuple[httpx.Response, bytes]:
+            async with self.scheduler.slot():
+                return await exchange()
+
+        GitHubAPI.pending_calls += 1
+        wait_start = perf_counter()
+        try:
+            async with self.scheduler.slot():
+                GITHUB_SEMAPHORE_WAIT_SECONDS.observe(perf_counter() - wait_start)
+                response, body = await hedged(exchange, hedge_delay, hedge_exchange)
+        finally:
+            GitHubAPI.pending_calls -= 1
+        await self.handle_rate_limit(response)
+        return response, body
+
+    async def send_request(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        content: bytes | None = None,
+    ) -> tuple[httpx.Response, bytes]:
+        """
+        fetch with jittered exponential backoff on transient errors, hedged when GitHub
+        is slow to answer a fan-out call, and failing fast while the circuit breaker
+        is open.
+        Error responses are raised as HTTPStatusError once the retries are exhausted,
+        an unreachable GitHub as a 503 HTTPException.
+        """
+        circuit_breaker = get_circuit_breaker(
+            httpx.URL(url).host,
+            settings.github_circuit_failure_threshold,
+            settings.github_circuit_recovery_time,
+        )
+        hedge_delay = None
+        if get_endpoint_type(url) in self.HEDGED_ENDPOINTS:
+            hedge_delay = settings.github_hedge_delay
+        last_attempt = self.retry_policy.max_attempts - 1
+        for attempt in range(self.retry_policy.max_attempts):
+            if not circuit_breaker.allow_request():
+                raise HTTPException(
+                    status_code=503,
+                    detail={"error": "GitHub is unavailable, please retry later."},
+                    headers={
+                        "Retry-After": str(math.ceil(circuit_breaker.retry_after))
+                    },
+                )
+            try:
+                response, body = await self.fetch(url, headers, content, hedge_delay)
+            except httpx.TransportError as e:
+                circuit_breaker.record_failure()
+                if attempt == last_attempt:
+                    raise HTTPException(
+                        status_code=503,
+                        detail={"error": "GitHub is unreachable, please retry later."},
+                    ) from e
+                logger.warning(f"GitHub call to {url} failed, retrying: {e!r}")
+                await asyncio.sleep(self.retry_policy.get_delay(attempt))
+                continue
+            except BaseException:
+                # Throttled by the scheduler, rate limit flag unreadable or cancelled:
+                # GitHub didn't answer, the trial mustn't keep the circuit open
+                circuit_breaker.cancel_trial()
+                raise
+
+            if not self.retry_policy.is_retryable(response):
+                circuit_breaker.record_success()
+                break
+            if response.status_code >= 500:
+                circuit_breaker.record_failure()
+            else:
+                # Throttled, GitHub itself is healthy
+                circuit_breaker.record_success()
+            delay = self.retry_policy.get_delay(attempt, response)
+            if attempt == last_attempt or delay > self.retry_policy.max_delay:
+                break
+            logger.warning(
+                f"GitHub answered {response.status_code} to {url}, retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+        response.raise_for_status()
+        return response, body
+
+    async def cache_negative_response(
+        self, cache_key: str, error: httpx.HTTPStatusError
+    ) -> None:
+        if error.response.status_code in self.NEGATIVE_CACHE_STATUSES:
+            await self.redis_client.set_cache_value(
+                cache_key,
+                {
+                    "status_code": error.response.status_code,
+                    "content": error.response.text,
+                },
+                ex=settings.redis_negative_expiration_time,
+            )
+
+    @staticmethod
+    def observe_cached_request(cached_response: dict[str, Any], start: float) -> None:
+        cache = "negative_hit" if "status_code" in cached_response else "hit"
+        GITHUB_REQUEST_SECONDS.labels(cache).observe(perf_counter() - start)
+
+    @staticmethod
+    def raise_for_cached_status(url: str, cached_response: dict[str, Any]) -> None:
+        """
+        Negative results share the key of the responses, so a known-bad lookup costs
+        a single cache read, and raise the same error as the original call.
+        """
+        if "status_code" in cached_response:
+            request = httpx.Request("GET", url)
+            response = httpx.Response(
+                cached_response["status_code"],
+                content=cached_response["content"],
+                request=request,
+            )
             response.raise_for_status()
-            response = {"links": response.links, "content": response.text}
-            await self.redis_client.set_cache_value(url, response)
-            return GitHubAPIResponseSchema.model_validate(response)
 
-    async def get_nb_pages(self, response: GitHubAPIResponseSchema) -> int:
+    async def make_request(
+        self, url: str, accept: str | None = None, use_cache: bool = True
+    ) -> GitHubAPIResponseSchema:
+        # The media type changes the payload, so it has to be part of the cache key
+        cache_key = f"{url}|{accept}" if accept else url
+        start = perf_counter()
+        if use_cache:
+            cached_response = await self.redis_client.get_cached_value_by_key(cache_key)
+            if cached_response:
+                self.observe_cached_request(cached_response, start)
+                self.raise_for_cached_status(url, cached_response)
+                return GitHubAPIResponseSchema.model_validate(cached_response)
+
+        await self.check_rate_limit()
+        headers = {"Accept": accept} if accept else None
+        try:
+            response, body = await self.send_request(url, headers)
+        except httpx.HTTPStatusError as e:
+            await self.cache_negative_response(cache_key, e)
+            raise
+        finally:
+            GITHUB_REQUEST_SECONDS.labels("miss").observe(perf_counter() - start)
+        cached_response = {"links": response.links, "content": body.decode("utf-8")}
+        if use_cache:
+            await self.redis_client.set_cache_value(cache_key, cached_response)
+        return GitHubAPIResponseSchema.model_validate(cached_response)
+
+    @staticmethod
+    def get_page_cache_key(url: str, formatter: GithubResponseFormatter) -> str:
+        """
+        A pruned page only holds the fields of its formatter, it is cached apart from
+        the whole responses cached by make_request under the url
+        """
+        if not formatter.fields:
+            return url
+        return f"{url}|fields={','.join(formatter.fields)}"
+
+    async def get_formatted_page(
+        self, url: str, formatter: GithubResponseFormatter, cache_page: bool = True
+    ) -> tuple[dict[str, Any], list[Any]]:
+        """
+        Returns the links and the formatted records of a page. When the formatter
+        declares the fields it needs, the body is parsed from its raw bytes instead of
+        being decoded as text and pruned to those fields: only the pruned page is
+        cached, and nothing but the formatted records outlives the call, whatever the
+        number of pages fetched concurrently. Without cache_page,
+        for the pages whose records are cached by the caller, only the errors are.
         """
-        Extracting the last page from the links header, formatted like so :
+        if not formatter.fields:
+            response = await self.make_request(url, use_cache=cache_page)
+            return response.links, await formatter(response)
+
+        cache_key = self.get_page_cache_key(url, formatter)
+        start = perf_counter()
+        cached_response = await self.redis_client.get_cached_value_by_key(cache_key)
+        if cached_response:
+            self.observe_cached_request(cached_response, start)
+            self.raise_for_cached_status(url, cached_response)
+            response = GitHubAPIResponseSchema.model_validate(cached_response)
+            return response.links, await formatter(response)
+
+        await self.check_rate_limit()
+        try:
+            http_response, body = await self.send_request(url)
+        except httpx.HTTPStatusError as e:
+            await self.cache_negative_response(cache_key, e)
+            raise
+        finally:
+            GITHUB_REQUEST_SECONDS.labels("miss").observe(perf_counter() - start)
+        records = formatter.prune(orjson.loads(body))
+        # httpx types the rel of the links as optional, they always have one
+        links: dict[str, Any] = http_response.links  # type: ignore[assignment]
+        if cache_page:
+            await self.redis_client.set_cache_value(
+                cache_key,
+                {
+                    "links": links,
+                    "content": orjson.dumps(records).decode("utf-8"),
+                },
+            )
+        return links, await formatter.format_records(records)
+
+    async def get_nb_pages(self, links: dict[str, Any], page: int = 1) -> int:
+        """
+        Extracting the last page from the links header of a page, formatted like so :
         <https://api.github.com/repositories/160919119/stargazers?per_page=100&page=2>; rel="next",
         <https://api.github.com/repositories/160919119/stargazers?per_page=100&page=400>; rel="last"
+        The last page has no last link.
         """
-        if "last" not in response.links:
-            return 1
-        last_link = response.links["last"]["url"]
+        if "last" not in links:
+            return page
+        last_link = links["last"]["url"]
         return int(last_link.split("&page=")[-1])
 
+    @staticmethod
+    def get_page_url(url: str, page: int) -> str:
+        # The first page keeps the url without page parameter, like the pages links
+        return url if page == 1 else f"{url}&page={page}"
+
+    @classmethod
+    def plan_pages(
+        cls, nb_pages: int, limit: int | None, strategy: SamplingStrategy
+    ) -> list[int]:
+        """
+        Pages needed to get limit records, in the order of their records. The most
+        recent records start on the last page, which is usually partial, so one more
+        page is planned backward.
+        """
+        needed_pages = nb_pages
+        if limit is not None:
+            needed_pages = min(math.ceil(limit / cls.GITHUB_PER_PAGE), nb_pages)
+
+        if strategy == SamplingStrategy.RECENT:
+            needed_pages = min(needed_pages + 1, nb_pages)
+            return list(range(nb_pages, nb_pages - needed_pages, -1))
+        if strategy != SamplingStrategy.FIRST and 1 < needed_pages < nb_pages:
+            return sorted(
+                {
+                    1 + round(i * (nb_pages - 1) / (needed_pages - 1))
+                    for i in range(needed_pages)
+                }
+            )
+        return list(range(1, needed_pages + 1))
+
     async def get_paginated_data(
         self,
         endpoint: str,
         formatter: GithubResponseFormatter,
         limit: int | None = None,
+        strategy: SamplingStrategy = SamplingStrategy.FIRST,
     ) -> list[Any]:
-        if limit and limit < self.GITHUB_PER_PAGE:
-            per_page = limit
-        else:
-            per_page = self.GITHUB_PER_PAGE
-        url = self.get_endpoint_url(endpoint, per_page=per_page)
+        """
+        Fetches limit records with the pages chosen by the sampling strategy.
+        Pages are always requested with per_page=100 so their cache is shared whatever
+        the limit, and the records are trimmed afterwards.
+        """
+        data, _ = await self.crawl_pages(endpoint, formatter, limit, strategy)
+        if limit is None or len(data) <= limit:
+            return data
+        if strategy in (SamplingStrategy.FIRST, SamplingStrategy.RECENT):
+            return data[:limit]
+        # Evenly spaced records, so the sample spreads inside the pages as well
+        step = len(data) / limit
+        return [data[int(i * step)] for i in range(limit)]
 
-        data = []
-        try:
-            # Fetch the first page
-            first_page_response = await self.make_request(url)
-            data.extend(await formatter(first_page_response))
-            # Determine number of pages
-            nb_pages = await self.get_nb_pages(first_page_response)
-            if limit is None:
-                limit = nb_pages * per_page
-            # Fetch remaining pages concurrently
-            if nb_pages > 1 and limit > self.GITHUB_PER_PAGE:
-                # We are computing the remaining pages based on the limit
-                needed_pages = limit // self.GITHUB_PER_PAGE
-
-                responses = await asyncio.gather(
+    async def crawl_pages(
+        self,
+        endpoint: str,
+        formatter: GithubResponseFormatter,
+        limit: int | None = None,
+        strategy: SamplingStrategy = SamplingStrategy.FIRST,
+        first_page: int = 1,
+        cache_pages: bool = True,
+    ) -> tuple[list[Any], int]:
+        """
+        Returns the records of the pages needed to get limit records, untrimmed, and
+        the number of pages of the endpoint. The error of a failed page is raised.
+        When the number of pages of the endpoint is known from a previous call, every
+        page is requested in a single concurrent wave along with the first one.
+        The pages before first_page, whose records the caller already has, are
+        skipped, and without cache_pages the pages aren't cached.
+        """
+        url = self.get_endpoint_url(endpoint)
+        nb_pages_key = f"github_nb_pages_{endpoint}"
+        single_page = (
+            strategy == SamplingStrategy.FIRST
+            and first_page == 1
+            and limit is not None
+            and limit <= self.GITHUB_PER_PAGE
+        )
+
+        known_nb_pages = None
+        if not single_page:
+            known_nb_pages = await self.redis_client.get_cached_value_by_key(
+                nb_pages_key
+            )
+        # The first page is always needed, its last link gives the number of pages
+        wave = [first_page]
+        if known_nb_pages:
+            wave += [
+                page
+                for page in self.plan_pages(known_nb_pages, limit, strategy)
+                if page > first_page
+            ]
+        results = dict(
+            zip(
+                wave,
+                await asyncio.gather(
                     *[
-                        self.make_request(f"{url}&page={i}")
-                        for i in range(2, needed_pages + 1)
+                        self.get_formatted_page(
+                            self.get_page_url(url, page), formatter, cache_pages
+                        )
+                        for page in wave
                     ],
                     return_exceptions=True,
+                ),
+            )
+        )
+
+        first_result = results[first_page]
+        if isinstance(first_result, BaseException):
+            logger.error(f"Failed to fetch data from {url}: {first_result}")
+            raise first_result
+
+        nb_pages = await self.get_nb_pages(first_result[0], first_page)
+        if not single_page and nb_pages != known_nb_pages:
+            await self.redis_client.set_cache_value(nb_pages_key, nb_pages)
+
+        pages = [
+            page
+            for page in self.plan_pages(nb_pages, limit, strategy)
+            if page >= first_page
+        ]
+        # Pages planned from an outdated number of pages may be missing
+        missing_pages = [page for page in pages if page not in results]
+        if missing_pages:
+            results.update(
+                zip(
+                    missing_pages,
+                    await asyncio.gather(
+                        *[
+                            self.get_formatted_page(
+                                self.get_page_url(url, page), formatter, cache_pages
+                            )
+                            for page in missing_pages
+                        ],
+                        return_exceptions=True,
+                    ),
                 )
+            )
 
-                # If there is remaining records, we add an extra page with those
-                remaining_records = limit % self.GITHUB_PER_PAGE
-                if remaining_records != 0:
-                    url = self.get_endpoint_url(endpoint, per_page=remaining_records)
-                    responses.append(
-                        await self.make_request(f"{url}&page={needed_pages + 1}")
-                    )
+        data = []
+        for page in pages:
+            result = results[page]
+            # A missing page would silently leave its records out, the callers count
+            # the whole list as failed instead. The fetched pages stay cached.
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to fetch page {page} of {url}: {result}")
+                raise result
+            page_data = result[1]
+            if strategy == SamplingStrategy.RECENT:
+                page_data.reverse()
+            data.extend(page_data)
+        return data, nb_pages
 
-                for response in responses:
-                    if not isinstance(response, GitHubAPIResponseSchema):
-                        continue
-                    data.extend(await formatter(response))
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Failed to fetch data from {url}: {e}")
-        return data
+    @staticmethod
+    def entity_covers(entity: dict[str, Any] | None, limit: int | None) -> bool:
+        return entity is not None and (
+            entity["total"] is not None
+            or (limit is not None and limit <= len(entity["records"]))
+        )
+
+    async def get_entity_data(
+        self,
+        entity_key: str,
+        endpoint: str,
+        formatter: GithubResponseFormatter,
+        limit: int | None = None,
+    ) -> list[Any]:
+        """
+        First limit records of an entity list, as the stargazers of a repository or
+        the starred repositories of a user. Whatever the limits of the previous calls,
+        the list crawled so far is kept in a single record with its total count, once
+        the whole list is crawled, and its crawl watermark, the last page crawled from
+        the start: a call with a smaller or equal limit is served from this one key,
+        and a larger limit only crawls the pages after the watermark. The pages
+        themselves aren't cached apart.
+        """
+        entity = await self.redis_client.get_cached_value_by_key(entity_key)
+        if self.entity_covers(entity, limit):
+            return entity["records"][:limit]
+
+        first_page = entity["watermark"] + 1 if entity is not None else 1
+        records, nb_pages = await self.crawl_pages(
+            endpoint, formatter, limit, first_page=first_page, cache_pages=False
+        )
+        if entity is not None:
+            # The records added since the previous crawl shift the end of its last page
+            # to the next one
+            crawled = {
+                orjson.dumps(record)
+                for record in entity["records"][-self.GITHUB_PER_PAGE :]
+            }
+            records = entity["records"] + [
+                record for record in records if orjson.dumps(record) not in crawled
+            ]
+
+        watermark = nb_pages
+        if limit is not None:
+            watermark = min(math.ceil(limit / self.GITHUB_PER_PAGE), nb_pages)
+        # Concurrent crawls of the entity only keep the deepest one
+        await self.redis_client.compare_and_set_cache_value(
+            entity_key,
+            {
+                "records": records,
+                "total": len(records) if watermark >= nb_pages else None,
+                "watermark": watermark,
+            },
+            lambda current: current is None or watermark > current["watermark"],
+        )
+        return records[:limit]
+
+    async def patch_entity_data(
+        self, entity_key: str, record: Any, added: bool, newest_first: bool
+    ) -> bool:
+        """
+        Adds or removes a record of a cached entity list in place, refreshing its
+        expiration. Returns whether the entity is cached. The crawled list stays a
+        prefix of the GitHub list: a new record at the end of the list, for the lists
+        sorted from the oldest, is only known once the whole list was crawled. The
+        patch is applied again on the entity written meanwhile by a concurrent event
+        or crawl.
+        """
+
+        def patch(entity: dict[str, Any] | None) -> dict[str, Any] | None:
+            if not entity:
+                return None
+            records = entity["records"]
+            if added and record not in records:
+                if newest_first:
+                    records.insert(0, record)
+                elif entity["total"] is not None:
+                    records.append(record)
+                if entity["total"] is not None:
+                    entity["total"] += 1
+            elif not added and record in records:
+                records.remove(record)
+                if entity["total"] is not None:
+                    entity["total"] -= 1
+            return entity
+
+        return await self.redis_client.update_cache_value(entity_key, patch)
+
+    async def patch_star(
+        self, stargazer: dict[str, Any], repo_full_name: str, starred: bool
+    ) -> int:
+        """
+        Applies a star, or its removal, to the cached stargazers of the repository and
+        starred repositories of the user, returning the number of entities patched
+        """
+        owner, repo = repo_full_name.split("/", 1)
+        return sum(
+            [
+                # GitHub lists the stargazers from the oldest
+                await self.patch_entity_data(
+                    self.STARGAZERS_ENTITY_KEY.format(owner=owner, repo=repo),
+                    stargazer,
+                    starred,
+                    newest_first=False,
+                ),
+                # and the starred repositories from the most recent
+                await self.patch_entity_data(
+                    self.STARRED_ENTITY_KEY.format(username=stargazer["login"]),
+                    repo_full_name,
+                    starred,
+                    newest_first=True,
+                ),
+            ]
+        )
+
+    async def get_cached_pages(
+        self,
+        endpoint: str,
+        formatter: GithubResponseFormatter,
+        limit: int | None = None,
+        strategy: SamplingStrategy = SamplingStrategy.FIRST,
+        first_page: int = 1,
+    ) -> dict[str, Any]:
+        """
+        Dry run of crawl_pages: the urls of the pages it would request, with their
+        cached response or None for the pages to fetch from GitHub.
+        """
+        url = self.get_endpoint_url(endpoint)
+        nb_pages = None
+        if not (
+            strategy == SamplingStrategy.FIRST
+            and first_page == 1
+            and limit is not None
+            and limit <= self.GITHUB_PER_PAGE
+        ):
+            nb_pages = await self.redis_client.get_cached_value_by_key(
+                f"github_nb_pages_{endpoint}"
+            )
+        if nb_pages:
+            pages = self.plan_pages(nb_pages, limit, strategy)
+        else:
+            # Unknown size, the first pages are planned
+            pages = list(range(1, math.ceil((limit or 1) / self.GITHUB_PER_PAGE) + 1))
+        if first_page > 1:
+            pages = [first_page, *(page for page in pages if page > first_page)]
+        urls = [self.get_page_url(url, page) for page in pages]
+        cached_pages = await self.redis_client.get_cached_values_by_keys(
+            [self.get_page_cache_key(url, formatter) for url in urls]
+        )
+        return dict(zip(urls, cached_pages))
+
+    async def get_cached_starred_repos_usernames(
+        self, usernames: list[str]
+    ) -> set[str]:
+        """
+        Users whose starred repositories would be served from the cache
+        """
+        entity_keys = [
+            self.STARRED_ENTITY_KEY.format(username=username) for username in usernames
+        ]
+        return {
+            username
+            for username, exists in zip(
+                usernames, await self.redis_client.keys_exist(entity_keys)
+            )
+            if exists
+        }
 
     async def get_stargazers_by_repo(
-        self, owner: str, repo: str, max_stargazers: int
+        self,
+        owner: str,
+        repo: str,
+        max_stargazers: int,
+        strategy: SamplingStrategy = SamplingStrategy.FIRST,
     ) -> list[dict[str, Any]]:
         endpoint = f"repos/{owner}/{repo}/stargazers"
         formatter = StargazersFormater()
+        if strategy == SamplingStrategy.FIRST:
+            return await self.get_entity_data(
+                self.STARGAZERS_ENTITY_KEY.format(owner=owner, repo=repo),
+                endpoint,
+                formatter,
+                limit=max_stargazers,
+            )
+        # The sampled pages aren't a prefix of the list, they stay in the pages cache
         stargazers = await self.get_paginated_data(
-            endpoint, formatter, limit=max_stargazers
+            endpoint, formatter, limit=max_stargazers, strategy=strategy
         )
         return stargazers
 
@@ -175,11 +731,113 @@ class GitHubAPI:
     ) -> Tuple[str, list[str]]:
         endpoint = f"users/{username}/starred"
         formatter = StarredRepositoryFormater()
-        starred_repos = await self.get_paginated_data(endpoint, formatter, max_repo)
+        try:
+            starred_repos = await self.get_entity_data(
+                self.STARRED_ENTITY_KEY.format(username=username),
+                endpoint,
+                formatter,
+                limit=max_repo,
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in self.NEGATIVE_CACHE_STATUSES:
+                raise
+            # Deleted and suspended users still show up in the stargazers lists
+            starred_repos = []
         return username, starred_repos
 
+    async def get_repository(self, owner: str, repo: str) -> dict[str, Any]:
+        response = await self.make_request(f"{self.base_url}repos/{owner}/{repo}")
+        return await RepositoryFormater()(response)
+
+    async def get_stargazers_since(
+        self, owner: str, repo: str, since: datetime | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Incremental crawl of the stargazers with their starred_at date.
+        GitHub lists the stargazers from the oldest to the most recent one, so we walk
+        the pages backward and stop as soon as we reach a star older than since. The
+        stars given at since itself are kept, another one may share its timestamp, and
+        upserting the known ones again is harmless.
+        """
+        url = self.get_endpoint_url(f"repos/{owner}/{repo}/stargazers")
+        formatter = TimestampedStargazersFormater()
+
+        first_page_response = await self.make_request(
+            url, accept=self.STAR_MEDIA_TYPE, use_cache=False
+        )
+        nb_pages = await self.get_nb_pages(first_page_response.links)
+
+        if since is None:
+            # Nothing is known yet, every page is needed so we fetch them concurrently
+            responses = await asyncio.gather(
+                *[
+                    self.make_request(
+                        f"{url}&page={i}", accept=self.STAR_MEDIA_TYPE, use_cache=False
+                    )
+                    for i in range(2, nb_pages + 1)
+                ]
+            )
+            stargazers = await formatter(first_page_response)
+            for response in responses:
+                stargazers.extend(await formatter(response))
+            return stargazers
+
+        stargazers = []
+        for page in range(nb_pages, 0, -1):
+            if page == 1:
+                response = first_page_response
+            else:
+                response = await self.make_request(
+                    f"{url}&page={page}", accept=self.STAR_MEDIA_TYPE, use_cache=False
+                )
+            page_stargazers = await formatter(response)
+            new_stargazers = [s for s in page_stargazers if s["starred_at"] >= since]
+            stargazers.extend(new_stargazers)
+            if len(new_stargazers) < len(page_stargazers):
+                break
+        return stargazers
+
+    async def warm_up(self, nb_connections: int) -> None:
+        """
+        Opens nb_connections pooled connections to GitHub with concurrent calls to
+        the rate limit endpoint, which doesn't count against the rate limit, and
+        learns the remaining rate limit on the way
+        """
+        responses = await asyncio.gather(
+            *[
+                self.client.get(f"{self.base_url}rate_limit")
+                for _ in range(nb_connections)
+            ]
+        )
+        await self.handle_rate_limit(responses[-1])
+
     async def close(self):
-        await self.client.aclose()
+        if self.owns_client:
+            await self.client.aclose()
+
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    The connections to GitHub are pooled by the process, for the configured token
+    """
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers=GitHubAPI.get_headers(settings.github_token),
+            limits=httpx.Limits(
+                max_connections=GitHubAPI.AIO_SEMAPHORE_LIMIT,
+                max_keepalive_connections=GitHubAPI.AIO_SEMAPHORE_LIMIT // 2,
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    if _http_client is not None:
+        await _http_client.aclose()
 
 
 def get_github_api():
@@ -187,4 +845,5 @@ def get_github_api():
         base_url=str(settings.github_api_base_url),
         redis_client=get_redis_client(),
         token=settings.github_token,
+        client=get_http_client(),
     )
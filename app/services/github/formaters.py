@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from datetime import datetime
 from typing import Any
 
 import orjson
@@ -11,17 +12,29 @@ class GithubResponseFormatter(ABC):
     Base formatter handling the github api response transformation
     """
 
+    # Top level fields of the records used by the formatter. When set, the pages can be
+    # pruned to those fields before being cached.
+    fields: tuple[str, ...] = ()
+
     async def __call__(self, response: GitHubAPIResponseSchema) -> Any:
         return await self._format_json_resonse(
             orjson.loads(response.content.encode("utf-8"))
         )
 
+    def prune(self, response_json: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        return [{field: r[field] for field in self.fields} for r in response_json]
+
+    async def format_records(self, records: list[dict[str, Any]]) -> Any:
+        return await self._format_json_resonse(records)
+
     @abstractmethod
     async def _format_json_resonse(self, response_json: list[dict[str, Any]]) -> Any:
         raise NotImplementedError()
 
 
 class StargazersFormater(GithubResponseFormatter):
+    fields = ("login", "html_url")
+
     async def _format_json_resonse(
         self, response_json: list[dict[str, Any]]
     ) -> list[Any]:
@@ -29,7 +42,57 @@ class StargazersFormater(GithubResponseFormatter):
 
 
 class StarredRepositoryFormater(GithubResponseFormatter):
+    fields = ("full_name",)
+
     async def _format_json_resonse(
         self, response_json: list[dict[str, Any]]
     ) -> list[str]:
         return [r["full_name"] for r in response_json]
+
+
+class TimestampedStargazersFormater(GithubResponseFormatter):
+    """
+    Stargazers fetched with the application/vnd.github.star+json media type
+    """
+
+    async def _format_json_resonse(
+        self, response_json: list[dict[str, Any]]
+    ) -> list[Any]:
+        return [
+            {
+                "id": r["user"]["id"],
+                "login": r["user"]["login"],
+                "starred_at": datetime.fromisoformat(r["starred_at"]),
+            }
+            for r in response_json
+        ]
+
+
+class RepositoryFormater(GithubResponseFormatter):
+    async def _format_json_resonse(self, response_json: dict[str, Any]) -> Any:  # type: ignore[override]
+        return {"id": response_json["id"], "full_name": response_json["full_name"]}
+
+
+class StarredRepositoriesBatchFormater(GithubResponseFormatter):
+    def __init__(self, aliases: dict[str, str]):
+        """
+        Formats an aliased GraphQL query into the starred repositories of each user,
+        the aliases mapping the query aliases to the usernames.
+        """
+        self.aliases = aliases
+
+    async def _format_json_resonse(self, response_json: dict[str, Any]) -> Any:  # type: ignore[override]
+        data = response_json.get("data")
+        if data is None:
+            # The whole query failed, as on a timeout, GitHub still answers a 200
+            raise ValueError(f"GraphQL query failed: {response_json.get('errors')}")
+        starred_repos = {
+            username: [
+                node["nameWithOwner"]
+                for node in data[alias]["starredRepositories"]["nodes"]
+            ]
+            for alias, username in self.aliases.items()
+            # Unknown or suspended users are null
+            if data.get(alias)
+        }
+        return starred_repos, data.get("rateLimit")
@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import math
+from collections import Counter
+from typing import Any
+
+from fastapi import HTTPException
+import orjson
+
+from app.schemas.github import GitHubAPIResponseSchema
+from app.services.github.api import GitHubAPI
+from app.services.github.formaters import StarredRepositoriesBatchFormater
+
+logger = logging.getLogger(__name__)
+
+STARRED_REPOSITORIES_FRAGMENT = """
+    {alias}: user(login: {login}) {{
+        starredRepositories(first: {first}, orderBy: {{field: STARRED_AT, direction: DESC}}) {{
+            nodes {{ nameWithOwner }}
+        }}
+    }}"""
+
+RATE_LIMIT_FRAGMENT = """
+    rateLimit { cost remaining resetAt }"""
+
+
+class GitHubGraphQLAPI:
+    INITIAL_BATCH_SIZE = 25
+    MIN_BATCH_SIZE = 5
+    MAX_BATCH_SIZE = 100
+    PARALLEL_BATCHES = 4
+    # Failed batches a user is retried in before being given up
+    MAX_ATTEMPTS = 3
+    # Adapted to the query costs of the process, all instances included
+    batch_size = INITIAL_BATCH_SIZE
+    remaining: int | None = None
+
+    def __init__(self, github_api: GitHubAPI):
+        """
+        Fetches the starred repositories of many users per request through the GraphQL
+        API, sharing the client, token, rate limit, retries and circuit breaker of the
+        REST api, and its cached starred repositories records.
+        """
+        self.github_api = github_api
+        self.url = f"{github_api.base_url}graphql"
+
+    @staticmethod
+    def build_query(usernames: list[str], first: int) -> tuple[str, dict[str, str]]:
+        aliases = {f"u{i}": username for i, username in enumerate(usernames)}
+        fragments = [
+            STARRED_REPOSITORIES_FRAGMENT.format(
+                alias=alias, login=orjson.dumps(username).decode(), first=first
+            )
+            for alias, username in aliases.items()
+        ]
+        return "query {" + "".join(fragments) + RATE_LIMIT_FRAGMENT + "\n}", aliases
+
+    async def make_request(self, query: str) -> GitHubAPIResponseSchema:
+        await self.github_api.check_rate_limit()
+        _, body = await self.github_api.send_request(
+            self.url, content=orjson.dumps({"query": query})
+        )
+        return GitHubAPIResponseSchema(links={}, content=body.decode())
+
+    @classmethod
+    def adjust_batch_size(
+        cls, rate_limit: dict[str, Any] | None, nb_users: int
+    ) -> None:
+        """
+        Grows the batches while the queries stay cheap, and shrinks them so a wave of
+        batches never spends more than the remaining points.
+        """
+        if not rate_limit:
+            return
+        remaining = GitHubGraphQLAPI.remaining = rate_limit["remaining"]
+        cost_per_user = rate_limit["cost"] / nb_users
+        affordable = int(remaining / cls.PARALLEL_BATCHES / max(cost_per_user, 0.01))
+        GitHubGraphQLAPI.batch_size = max(
+            cls.MIN_BATCH_SIZE,
+            min(cls.batch_size * 2, cls.MAX_BATCH_SIZE, affordable),
+        )
+
+    async def fetch_batch(
+        self, usernames: list[str], first: int
+    ) -> dict[str, list[str]] | Exception:
+        """
+        Starred repositories of a batch of users, or the error which failed the batch
+        """
+        query, aliases = self.build_query(usernames, first)
+        try:
+            response = await self.make_request(query)
+            starred_repos, rate_limit = await StarredRepositoriesBatchFormater(aliases)(
+                response
+            )
+        except Exception as e:
+            logger.warning(f"GraphQL batch of {len(usernames)} users failed: {e}")
+            return e
+        self.adjust_batch_size(rate_limit, len(usernames))
+        return starred_repos
+
+    async def cache_starred_repos(
+        self, username: str, starred_repos: list[str], first: int
+    ) -> None:
+        """
+        Stores the first starred repositories of a user in the entity record of the
+        REST api, so both backends and the star webhooks share it. Only the full pages
+        count in the watermark, the REST crawls resume from the first partial one.
+        """
+        complete = len(starred_repos) < first
+        watermark = len(starred_repos) // GitHubAPI.GITHUB_PER_PAGE
+        if complete:
+            watermark = math.ceil(len(starred_repos) / GitHubAPI.GITHUB_PER_PAGE)
+        await self.github_api.redis_client.compare_and_set_cache_value(
+            GitHubAPI.STARRED_ENTITY_KEY.format(username=username),
+            {
+                "records": starred_repos,
+                "total": len(starred_repos) if complete else None,
+                "watermark": watermark,
+            },
+            # A deeper list, crawled or patched meanwhile, is kept
+            lambda current: (
+                current is None
+                or (complete and current["total"] is None)
+                or len(starred_repos) > len(current["records"])
+            ),
+        )
+
+    async def get_starred_repos_by_usernames(
+        self, usernames: list[str], max_repo: int = GitHubAPI.MAX_REPO_PER_STARGAZERS
+    ) -> list[tuple[str, list[str]] | Exception]:
+        """
+        Same results as GitHubAPI.get_starred_repos_by_username for each user. Like
+        asyncio.gather with return_exceptions, a user which couldn't be fetched gets
+        the error of its last batch instead, unknown users are left out.
+        """
+        entity_keys = [
+            GitHubAPI.STARRED_ENTITY_KEY.format(username=username)
+            for username in usernames
+        ]
+        entities = await self.github_api.redis_client.get_cached_values_by_keys(
+            entity_keys
+        )
+        results: list[tuple[str, list[str]] | Exception] = [
+            (username, entity["records"][:max_repo])
+            for username, entity in zip(usernames, entities)
+            if GitHubAPI.entity_covers(entity, max_repo)
+        ]
+        pending = [
+            username
+            for username, entity in zip(usernames, entities)
+            if not GitHubAPI.entity_covers(entity, max_repo)
+        ]
+
+        attempts: Counter[str] = Counter()
+        while pending:
+            batch_size = self.batch_size
+            batches = [
+                pending[i * batch_size : (i + 1) * batch_size]
+                for i in range(self.PARALLEL_BATCHES)
+            ]
+            batches = [batch for batch in batches if batch]
+            pending = pending[sum(len(batch) for batch in batches) :]
+
+            fetched: dict[str, list[str]] = {}
+            for batch, batch_result in zip(
+                batches,
+                await asyncio.gather(*[self.fetch_batch(b, max_repo) for b in batches]),
+            ):
+                if not isinstance(batch_result, Exception):
+                    fetched.update(batch_result)
+                    continue
+                # Probably a timeout on a too big query, we retry with smaller batches
+                GitHubGraphQLAPI.batch_size = max(
+                    self.MIN_BATCH_SIZE, min(self.batch_size, len(batch) // 2)
+                )
+                for username in batch:
+                    attempts[username] += 1
+                    # The token is throttled, retrying would only fail again
+                    if (
+                        isinstance(batch_result, HTTPException)
+                        or attempts[username] >= self.MAX_ATTEMPTS
+                    ):
+                        results.append(batch_result)
+                    else:
+                        pending.append(username)
+
+            if fetched:
+                await asyncio.gather(
+                    *[
+                        self.cache_starred_repos(username, repos, max_repo)
+                        for username, repos in fetched.items()
+                    ]
+                )
+                results.extend(fetched.items())
+        return results
@@ -0,0 +1,131 @@
+import asyncio
+import random
+from time import monotonic
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+
+class RetryPolicy:
+    # Transient statuses, 403 and 429 are only retried when GitHub sends a Retry-After
+    RETRYABLE_STATUSES = {500, 502, 503, 504}
+    THROTTLING_STATUSES = {403, 429}
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        """
+        Exponential backoff with full jitter, honouring the Retry-After header
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def is_retryable(self, response: httpx.Response) -> bool:
+        if response.status_code in self.RETRYABLE_STATUSES:
+            return True
+        return (
+            response.status_code in self.THROTTLING_STATUSES
+            and "Retry-After" in response.headers
+        )
+
+    def get_delay(self, attempt: int, response: httpx.Response | None = None) -> float:
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, recovery_time: float):
+        """
+        Opens after failure_threshold consecutive failures, so calls fail fast during
+        GitHub incidents. Once recovery_time is elapsed, a single trial call is let
+        through and closes the circuit if it succeeds.
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_progress = False
+
+    @property
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0
+        return max(0.0, self.opened_at + self.recovery_time - monotonic())
+
+    def allow_request(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.retry_after > 0 or self.trial_in_progress:
+            return False
+        self.trial_in_progress = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    def cancel_trial(self) -> None:
+        """
+        Hands back the trial of a call which ended without an answer of GitHub, as a
+        throttled or cancelled call, so the next call can be the trial
+        """
+        self.trial_in_progress = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.trial_in_progress or self.failures >= self.failure_threshold:
+            self.opened_at = monotonic()
+        self.trial_in_progress = False
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(
+    host: str, failure_threshold: int, recovery_time: float
+) -> CircuitBreaker:
+    """
+    Circuit breakers are shared by every GitHubAPI instance of the process
+    """
+    if host not in _circuit_breakers:
+        _circuit_breakers[host] = CircuitBreaker(failure_threshold, recovery_time)
+    return _circuit_breakers[host]
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    delay: float | None,
+    hedge: Callable[[], Awaitable[T]] | None = None,
+) -> T:
+    """
+    Sends a second call, hedge or else an identical one, when the first one didn't
+    answer after delay seconds, and returns the first successful answer.
+    """
+    first = asyncio.ensure_future(call())
+    if delay is None:
+        return await first
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    pending = {first, asyncio.ensure_future((hedge or call)())}
+    try:
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not pending:
+                # Both calls failed, the last error is raised
+                return done.pop().result()
+    finally:
+        for task in pending:
+            task.cancel()
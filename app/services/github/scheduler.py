@@ -0,0 +1,219 @@
+import asyncio
+import math
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from enum import IntEnum
+from time import time
+from typing import AsyncIterator, Iterator
+
+from fastapi import HTTPException, status
+
+
+class Priority(IntEnum):
+    """
+    Lanes of the GitHub traffic, the lower the more urgent
+    """
+
+    INTERACTIVE = 0
+    REFRESH = 1
+    BULK = 2
+
+
+# Share of the slots kept for each lane while it has waiting calls
+RESERVED_SHARES = {
+    Priority.INTERACTIVE: 0.5,
+    Priority.REFRESH: 0.1,
+    Priority.BULK: 0.05,
+}
+# Lanes stop below this share of the GitHub rate limit, until its reset, so the
+# interactive lane has the last of it
+RATE_LIMIT_FLOORS = {
+    Priority.INTERACTIVE: 0,
+    Priority.REFRESH: 0.2,
+    Priority.BULK: 0.5,
+}
+# Lanes of the calls holding an HTTP request, rejected below their floor instead of
+# pausing, so the request, its admission slot and its pending calls aren't held until
+# the reset. All of them are so far, a lane of background jobs would pause instead.
+REJECTED_LANES = frozenset(Priority)
+
+_priority: ContextVar[Priority] = ContextVar(
+    "github_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def github_priority(priority: Priority) -> Iterator[None]:
+    """
+    The GitHub calls sent in this block, tasks spawned included, use the priority lane
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class PriorityScheduler:
+    def __init__(
+        self,
+        limit: int,
+        reserved_shares: dict[Priority, float] = RESERVED_SHARES,
+        rate_limit_floors: dict[Priority, float] = RATE_LIMIT_FLOORS,
+        rejected_lanes: frozenset[Priority] = REJECTED_LANES,
+    ):
+        """
+        Hands out the limit concurrent GitHub call slots by priority: a free slot goes
+        to the most urgent waiting call, so queued background calls are overtaken by
+        interactive ones, while each waiting lane keeps its reserved slots.
+        """
+        self.limit = limit
+        self.reserved = {
+            lane: int(share * limit) for lane, share in reserved_shares.items()
+        }
+        self.rate_limit_floors = rate_limit_floors
+        self.rejected_lanes = rejected_lanes
+        self.in_use = {lane: 0 for lane in Priority}
+        self.waiters: dict[Priority, deque[asyncio.Future]] = {
+            lane: deque() for lane in Priority
+        }
+        self.rate_limit_remaining: int | None = None
+        self.rate_limit: int | None = None
+        self.rate_limit_reset = 0.0
+        self.reset_timer: asyncio.TimerHandle | None = None
+
+    def update_rate_limit(self, remaining: int, limit: int, reset: float) -> None:
+        self.rate_limit_remaining = remaining
+        self.rate_limit = limit
+        self.rate_limit_reset = reset
+        self.dispatch()
+
+    def within_rate_budget(self, lane: Priority) -> bool:
+        if (
+            self.rate_limit_remaining is None
+            or not self.rate_limit
+            or time() >= self.rate_limit_reset
+        ):
+            return True
+        return (
+            self.rate_limit_remaining > self.rate_limit_floors[lane] * self.rate_limit
+        )
+
+    def rate_budget_error(self) -> HTTPException:
+        """
+        A 429 while the rest of the rate limit is kept for the more urgent lanes, the
+        403 of GitHubAPI.check_rate_limit once it is spent
+        """
+        headers = {
+            "Retry-After": str(max(1, math.ceil(self.rate_limit_reset - time())))
+        }
+        if not self.rate_limit_remaining:
+            reset_time = datetime.fromtimestamp(self.rate_limit_reset)
+            return HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail={
+                    "error": "GitHub rate limit reached. The limit will be restored at "
+                    f"{reset_time.strftime('%Y-%m-%d %H:%M:%S')}"
+                },
+                headers=headers,
+            )
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"error": "GitHub rate limit reserved, please retry later."},
+            headers=headers,
+        )
+
+    def check_rate_budget(self, lane: Priority) -> None:
+        """
+        Raises the rate_budget_error when the calls of a rejected lane wouldn't run
+        until the rate limit reset
+        """
+        if lane in self.rejected_lanes and not self.within_rate_budget(lane):
+            raise self.rate_budget_error()
+
+    def can_run(self, lane: Priority) -> bool:
+        if not self.within_rate_budget(lane):
+            return False
+        free_slots = self.limit - sum(self.in_use.values())
+        kept_slots = sum(
+            max(0, self.reserved[other] - self.in_use[other])
+            for other in Priority
+            if other != lane and self.waiters[other]
+        )
+        return free_slots > kept_slots
+
+    def dispatch(self) -> None:
+        for lane in Priority:
+            waiters = self.waiters[lane]
+            while waiters and self.can_run(lane):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self.in_use[lane] += 1
+                    waiter.set_result(None)
+            if waiters and not self.within_rate_budget(lane):
+                if lane in self.rejected_lanes:
+                    while waiters:
+                        waiter = waiters.popleft()
+                        if not waiter.done():
+                            waiter.set_exception(self.rate_budget_error())
+                else:
+                    self.schedule_reset_dispatch()
+
+    def schedule_reset_dispatch(self) -> None:
+        if self.reset_timer is None or self.reset_timer.cancelled():
+            loop = asyncio.get_running_loop()
+            self.reset_timer = loop.call_later(
+                max(0.0, self.rate_limit_reset - time()), self.on_rate_limit_reset
+            )
+
+    def on_rate_limit_reset(self) -> None:
+        self.reset_timer = None
+        self.dispatch()
+
+    async def acquire(self, lane: Priority) -> None:
+        self.check_rate_budget(lane)
+        queued_ahead = any(self.waiters[other] for other in Priority if other <= lane)
+        if not queued_ahead and self.can_run(lane):
+            self.in_use[lane] += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[lane].append(waiter)
+        self.dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over right before the cancellation
+                self.release(lane)
+            elif waiter in self.waiters[lane]:
+                self.waiters[lane].remove(waiter)
+            raise
+
+    def release(self, lane: Priority) -> None:
+        self.in_use[lane] -= 1
+        self.dispatch()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        lane = _priority.get()
+        await self.acquire(lane)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+
+_scheduler: PriorityScheduler | None = None
+
+
+def get_scheduler(limit: int) -> PriorityScheduler:
+    """
+    The scheduler is shared by every GitHubAPI instance of the process
+    """
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = PriorityScheduler(limit)
+    return _scheduler
@@ -0,0 +1,177 @@
+"""
+Memory mapped, CSR-style index of the precomputed star neighbours.
+
+Binary layout of the file, every integer is an unsigned 32 bits in native
+byte order:
+
+    header            magic, version, nb_repos, top_k, names_size
+    name_offsets      nb_repos + 1 offsets in the names blob
+    names             utf-8 repository full names sorted alphabetically, padded to 4 bytes
+    row_offsets       nb_repos + 1 offsets in the neighbours arrays (CSR row pointers)
+    neighbour_ids     neighbour repository ids, sorted by shared stargazers
+    shared_counts     shared stargazers count of each neighbour
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from typing import Final, Iterable, Sequence
+
+from app.config import get_settings
+
+settings = get_settings()
+
+MAGIC = b"GHNI"
+VERSION = 1
+HEADER = struct.Struct("=4sIIII")
+UINT32: Final = "I"
+
+
+def write_neighbour_index(
+    path: str,
+    names: Sequence[str],
+    rows: Iterable[tuple[int, Sequence[tuple[int, int]]]],
+    top_k: int,
+) -> None:
+    """
+    Writes the index for the given sorted repository names. Rows are
+    (repo_id, [(neighbour_id, shared_count), ...]) with ids being positions in names.
+    The file is written next to the target and atomically renamed, so the running
+    workers keep reading the previous version until they reopen it.
+    """
+    encoded_names = [name.encode("utf-8") for name in names]
+    name_offsets = array(UINT32, [0])
+    for name in encoded_names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    names_blob = b"".join(encoded_names)
+    names_blob += b"\0" * (-len(names_blob) % 4)
+
+    neighbours_by_repo = dict(rows)
+    row_offsets = array(UINT32, [0])
+    neighbour_ids = array(UINT32)
+    shared_counts = array(UINT32)
+    for repo_id in range(len(names)):
+        for neighbour_id, shared_count in neighbours_by_repo.get(repo_id, ())[:top_k]:
+            neighbour_ids.append(neighbour_id)
+            shared_counts.append(shared_count)
+        row_offsets.append(len(neighbour_ids))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(names), top_k, len(names_blob)))
+        name_offsets.tofile(f)
+        f.write(names_blob)
+        row_offsets.tofile(f)
+        neighbour_ids.tofile(f)
+        shared_counts.tofile(f)
+    os.replace(tmp_path, path)
+
+
+class NeighbourIndex:
+    def __init__(self, path: str):
+        """
+        Read-only view over a neighbour index file. The file is memory mapped, so the
+        lookups only slice the mapping and several workers share the same pages.
+        """
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = buffer = memoryview(self._mmap)
+
+        magic, version, self.nb_repos, self.top_k, names_size = HEADER.unpack_from(
+            buffer
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a neighbour index v{VERSION}")
+
+        offset = HEADER.size
+        self._name_offsets = self._uint32_view(buffer, offset, self.nb_repos + 1)
+        offset += (self.nb_repos + 1) * 4
+        self._names = buffer[offset : offset + names_size]
+        offset += names_size
+        self._row_offsets = self._uint32_view(buffer, offset, self.nb_repos + 1)
+        offset += (self.nb_repos + 1) * 4
+        nb_neighbours = self._row_offsets[self.nb_repos]
+        self._neighbour_ids = self._uint32_view(buffer, offset, nb_neighbours)
+        offset += nb_neighbours * 4
+        self._shared_counts = self._uint32_view(buffer, offset, nb_neighbours)
+
+    @staticmethod
+    def _uint32_view(buffer: memoryview, offset: int, length: int) -> memoryview:
+        return buffer[offset : offset + length * 4].cast(UINT32)
+
+    def get_name(self, repo_id: int) -> str:
+        start, end = self._name_offsets[repo_id], self._name_offsets[repo_id + 1]
+        return str(self._names[start:end], "utf-8")
+
+    def get_id(self, full_name: str) -> int | None:
+        """
+        Binary search in the sorted names table
+        """
+        target = full_name.encode("utf-8")
+        low, high = 0, self.nb_repos
+        while low < high:
+            middle = (low + high) // 2
+            start, end = self._name_offsets[middle], self._name_offsets[middle + 1]
+            name = self._names[start:end].tobytes()
+            if name == target:
+                return middle
+            if name < target:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def get_neighbours(self, full_name: str) -> list[tuple[str, int]] | None:
+        """
+        Returns the neighbours sorted by shared stargazers, or None when the repository
+        isn't covered by the index.
+        """
+        repo_id = self.get_id(full_name)
+        if repo_id is None:
+            return None
+        start, end = self._row_offsets[repo_id], self._row_offsets[repo_id + 1]
+        if start == end:
+            return None
+        return [
+            (self.get_name(neighbour_id), shared_count)
+            for neighbour_id, shared_count in zip(
+                self._neighbour_ids[start:end], self._shared_counts[start:end]
+            )
+        ]
+
+    def close(self) -> None:
+        for view in (
+            self._name_offsets,
+            self._names,
+            self._row_offsets,
+            self._neighbour_ids,
+            self._shared_counts,
+            self._buffer,
+        ):
+            view.release()
+        self._mmap.close()
+
+
+_neighbour_index: tuple[int, NeighbourIndex] | None = None
+
+
+def get_neighbour_index() -> NeighbourIndex | None:
+    """
+    Opens the configured index once per worker, and reopens it when the file has
+    been rebuilt. The previous version is unmapped right away, so the callers must
+    read the index without awaiting anything after getting it.
+    """
+    global _neighbour_index
+    if not settings.neighbour_index_path:
+        return None
+    try:
+        mtime = os.stat(settings.neighbour_index_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if _neighbour_index is None or _neighbour_index[0] != mtime:
+        previous_index = _neighbour_index
+        _neighbour_index = (mtime, NeighbourIndex(settings.neighbour_index_path))
+        if previous_index is not None:
+            previous_index[1].close()
+    return _neighbour_index[1]
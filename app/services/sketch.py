@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import math
+import random
+import struct
+
+from app.config import get_settings
+from app.redis.engine import RedisClient, get_redis_client
+
+settings = get_settings()
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        """
+        Fixed size MinHash signatures, estimating the Jaccard similarity of the
+        stargazers sets of two repositories.
+        """
+        self.num_perm = num_perm
+        generator = random.Random(seed)
+        self.permutations = [
+            (
+                generator.randint(1, MERSENNE_PRIME - 1),
+                generator.randint(0, MERSENNE_PRIME - 1),
+            )
+            for _ in range(num_perm)
+        ]
+
+    @staticmethod
+    def hash_member(member: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(member.encode(), digest_size=4).digest(), "big"
+        )
+
+    def hash_vector(self, member: str) -> list[int]:
+        h = self.hash_member(member)
+        return [((a * h + b) % MERSENNE_PRIME) & MAX_HASH for a, b in self.permutations]
+
+    def signatures(self, members_by_set: dict[str, set[str]]) -> dict[str, list[int]]:
+        """
+        Computes the signatures of many sets at once. A stargazer usually belongs to
+        many sets, so its hash vector is only computed once.
+        """
+        vectors: dict[str, list[int]] = {}
+        signatures = {}
+        for name, members in members_by_set.items():
+            member_vectors = []
+            for member in members:
+                if member not in vectors:
+                    vectors[member] = self.hash_vector(member)
+                member_vectors.append(vectors[member])
+            signatures[name] = (
+                list(map(min, zip(*member_vectors)))
+                if member_vectors
+                else [MAX_HASH] * self.num_perm
+            )
+        return signatures
+
+    @staticmethod
+    def merge(signature: list[int], other: list[int]) -> list[int]:
+        """
+        The signature of the union of two sets, so signatures can be built incrementally
+        """
+        return [min(a, b) for a, b in zip(signature, other)]
+
+    def jaccard(self, signature: list[int], other: list[int]) -> tuple[float, float]:
+        """
+        Returns the estimated similarity with its standard error
+        """
+        similarity = sum(a == b for a, b in zip(signature, other)) / self.num_perm
+        return similarity, math.sqrt(similarity * (1 - similarity) / self.num_perm)
+
+
+class SketchIndex:
+    SIGNATURE_KEY = "minhash_signature_{repo}"
+    BUCKET_KEY = "minhash_lsh_{band}_{band_hash}"
+    BANDS = 32
+    MAX_BUCKET_CANDIDATES = 200
+    # Repositories starred by a single crawled stargazer carry almost no signal
+    MIN_STARGAZERS = 2
+
+    def __init__(self, redis_client: RedisClient, minhasher: MinHasher | None = None):
+        """
+        MinHash signatures of the repositories stored in redis along with a LSH index,
+        serving approximate neighbours in bounded time whatever the repository size.
+        """
+        self.redis_client = redis_client
+        self.minhasher = minhasher or MinHasher()
+        self.rows = self.minhasher.num_perm // self.BANDS
+        self.expiration_time = settings.sketch_expiration_time
+
+    def get_bucket_keys(self, signature: list[int]) -> list[str]:
+        keys = []
+        for band in range(self.BANDS):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            band_hash = hashlib.blake2b(
+                struct.pack(f">{self.rows}I", *rows), digest_size=8
+            ).hexdigest()
+            keys.append(self.BUCKET_KEY.format(band=band, band_hash=band_hash))
+        return keys
+
+    async def get_signatures(self, repos: list[str]) -> list[list[int] | None]:
+        return await self.redis_client.get_cached_values_by_keys(
+            [self.SIGNATURE_KEY.format(repo=repo) for repo in repos]
+        )
+
+    async def update(self, stargazers_by_repo: dict[str, set[str]]) -> None:
+        """
+        Merges newly crawled stargazers into the signatures and moves the repositories
+        whose signature changed to their new LSH buckets. A new signature needs a few
+        stargazers, a known one is extended by any of them.
+        """
+        known_signatures = dict(
+            zip(
+                stargazers_by_repo,
+                await self.get_signatures(list(stargazers_by_repo)),
+            )
+        )
+        stargazers_by_repo = {
+            repo: stargazers
+            for repo, stargazers in stargazers_by_repo.items()
+            if known_signatures[repo] or len(stargazers) >= self.MIN_STARGAZERS
+        }
+        repos = list(stargazers_by_repo)
+        previous_signatures = [known_signatures[repo] for repo in repos]
+        # Hashing is CPU bound, we keep it out of the event loop
+        new_signatures = await asyncio.to_thread(
+            self.minhasher.signatures, stargazers_by_repo
+        )
+
+        signatures: dict[str, list[int]] = {}
+        added: dict[str, list[str]] = {}
+        removed: dict[str, list[str]] = {}
+        for repo, previous_signature in zip(repos, previous_signatures):
+            signature = new_signatures[repo]
+            if previous_signature:
+                signature = self.minhasher.merge(previous_signature, signature)
+                if signature == previous_signature:
+                    continue
+                for key in self.get_bucket_keys(previous_signature):
+                    removed.setdefault(key, []).append(repo)
+            signatures[self.SIGNATURE_KEY.format(repo=repo)] = signature
+            for key in self.get_bucket_keys(signature):
+                added.setdefault(key, []).append(repo)
+
+        if removed:
+            await self.redis_client.remove_set_members(removed)
+        if signatures:
+            await self.redis_client.set_cache_values(
+                signatures, ex=self.expiration_time
+            )
+            await self.redis_client.add_set_members(added, ex=self.expiration_time)
+
+    async def get_similar_repos(
+        self, repo: str
+    ) -> list[tuple[str, float, float]] | None:
+        """
+        Returns the (repo, similarity, error) of the candidates sharing at least one LSH
+        bucket with the repository, or None when there is no signature for it.
+        """
+        [signature] = await self.get_signatures([repo])
+        if not signature:
+            return None
+
+        candidates = set()
+        for members in await self.redis_client.get_random_set_members(
+            self.get_bucket_keys(signature), self.MAX_BUCKET_CANDIDATES
+        ):
+            candidates.update(members)
+        candidates.discard(repo)
+
+        candidates_list = list(candidates)
+        similar_repos = []
+        for candidate, candidate_signature in zip(
+            candidates_list, await self.get_signatures(candidates_list)
+        ):
+            if not candidate_signature:
+                continue
+            similarity, error = self.minhasher.jaccard(signature, candidate_signature)
+            similar_repos.append((candidate, similarity, error))
+        return sorted(similar_repos, key=lambda r: r[1], reverse=True)
+
+
+def get_sketch_index():
+    return SketchIndex(get_redis_client())
@@ -0,0 +1,51 @@
+from typing import Annotated
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+
+from app.repositories.star import StarRepository, get_star_repository
+from app.schemas.star import StarEdge
+from app.services.github.api import GitHubAPI, get_github_api
+from app.services.github.scheduler import Priority, github_priority
+
+
+class StarGraphService:
+    def __init__(self, github_api: GitHubAPI, star_repository: StarRepository):
+        """
+        Keeps the persistent star graph in sync with GitHub
+        """
+        self.github_api = github_api
+        self.star_repository = star_repository
+
+    async def refresh_repo(self, owner: str, repo: str) -> int:
+        """
+        Fetches the stars added since the last refresh and upserts them, returning
+        the number of new stars. The store is queried off the event loop, the first
+        refresh copying every stargazer of the repository.
+        """
+        with github_priority(Priority.REFRESH):
+            repository = await self.github_api.get_repository(owner, repo)
+            since = await run_in_threadpool(
+                self.star_repository.get_repo_watermark, repository["id"]
+            )
+            stargazers = await self.github_api.get_stargazers_since(owner, repo, since)
+        return await run_in_threadpool(
+            self.star_repository.upsert_stars,
+            [
+                StarEdge(
+                    user_id=stargazer["id"],
+                    user_login=stargazer["login"],
+                    repo_id=repository["id"],
+                    repo_full_name=repository["full_name"],
+                    starred_at=stargazer["starred_at"],
+                )
+                for stargazer in stargazers
+            ],
+        )
+
+
+async def get_star_graph_service(
+    github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+    star_repository: Annotated[StarRepository, Depends(get_star_repository)],
+) -> StarGraphService:
+    return StarGraphService(github_api, star_repository)
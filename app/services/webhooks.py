@@ -0,0 +1,129 @@
+import hashlib
+import hmac
+from datetime import datetime, timezone
+from typing import Annotated, Any
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.repositories.star import StarRepository, get_star_repository
+from app.schemas.star import StarEdge, StarEventResponse
+from app.services.github.api import GitHubAPI, get_github_api
+from app.services.sketch import SketchIndex, get_sketch_index
+
+settings = get_settings()
+
+DELIVERY_KEY = "webhook_delivery_{delivery_id}"
+# (event, action) of the GitHub webhooks, GitHub sends both events for each star
+STAR_ACTIONS = {
+    ("watch", "started"): True,
+    ("star", "created"): True,
+    ("star", "deleted"): False,
+}
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    """
+    Checks the X-Hub-Signature-256 header, in constant time
+    """
+    if signature is None:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+class StarEventHandler:
+    def __init__(
+        self,
+        github_api: GitHubAPI,
+        sketch_index: SketchIndex,
+        star_repository: StarRepository,
+    ):
+        """
+        Applies the stars pushed by the GitHub webhooks to the cached stargazers and
+        starred lists, the MinHash signatures and the persistent star graph, so
+        the watched repositories stay fresh without being crawled again.
+        """
+        self.github_api = github_api
+        self.sketch_index = sketch_index
+        self.star_repository = star_repository
+
+    async def handle(
+        self, event: str, payload: dict[str, Any], delivery_id: str | None = None
+    ) -> StarEventResponse:
+        """
+        Applies a delivery, once per X-GitHub-Delivery id: GitHub redelivers the
+        deliveries it considers failed, and they can be redelivered by hand
+        """
+        action = payload.get("action")
+        if not isinstance(action, str) or (event, action) not in STAR_ACTIONS:
+            return StarEventResponse(event=event, action="ignored")
+        starred = STAR_ACTIONS[(event, action)]
+
+        if delivery_id is None:
+            return await self.apply(event, payload, starred)
+        delivery_key = DELIVERY_KEY.format(delivery_id=delivery_id)
+        redis_client = self.github_api.redis_client
+        if not await redis_client.claim_key(
+            delivery_key, settings.github_webhook_delivery_ttl
+        ):
+            return StarEventResponse(event=event, action="duplicate")
+        try:
+            return await self.apply(event, payload, starred)
+        except BaseException:
+            # A failed delivery is applied again when GitHub redelivers it
+            await redis_client.delete_key(delivery_key)
+            raise
+
+    async def apply(
+        self, event: str, payload: dict[str, Any], starred: bool
+    ) -> StarEventResponse:
+        repository = payload["repository"]
+        sender = payload["sender"]
+        patched_entities = await self.github_api.patch_star(
+            {"login": sender["login"], "html_url": sender["html_url"]},
+            repository["full_name"],
+            starred,
+        )
+        if starred:
+            # The signatures can't forget a stargazer, they are only extended
+            await self.sketch_index.update({repository["full_name"]: {sender["login"]}})
+            starred_at = payload.get("starred_at")
+            await run_in_threadpool(
+                self.star_repository.upsert_stars,
+                [
+                    StarEdge(
+                        user_id=sender["id"],
+                        user_login=sender["login"],
+                        repo_id=repository["id"],
+                        repo_full_name=repository["full_name"],
+                        starred_at=(
+                            datetime.fromisoformat(starred_at)
+                            if starred_at
+                            else datetime.now(timezone.utc)
+                        ),
+                    )
+                ],
+            )
+        else:
+            await run_in_threadpool(
+                self.star_repository.delete_star, sender["id"], repository["id"]
+            )
+        return StarEventResponse(
+            event=event,
+            action="starred" if starred else "unstarred",
+            patched_entities=patched_entities,
+        )
+
+
+async def get_star_event_handler(
+    github_api: Annotated[GitHubAPI, Depends(get_github_api)],
+    sketch_index: Annotated[SketchIndex, Depends(get_sketch_index)],
+    star_repository: Annotated[StarRepository, Depends(get_star_repository)],
+) -> StarEventHandler:
+    return StarEventHandler(github_api, sketch_index, star_repository)
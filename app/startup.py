@@ -0,0 +1,66 @@
+"""
+Worker startup: the schema is checked or created, then the connection pools are
+opened before the first request, so a new worker only takes traffic once warm.
+"""
+
+import asyncio
+import logging
+from time import perf_counter
+
+from fastapi import FastAPI
+
+from app.config import get_settings
+from app.db.engine import engine
+from app.models import check_db_schema, init_db
+from app.redis.engine import get_redis_client
+from app.services.github.api import close_http_client, get_github_api
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def warm_up_db_pool(nb_connections: int) -> None:
+    # Held together, so each checkout opens a new connection kept by the pool
+    connections = [engine.connect() for _ in range(nb_connections)]
+    for connection in connections:
+        connection.close()
+
+
+async def warm_up(app: FastAPI) -> None:
+    start = perf_counter()
+    if settings.startup_mode == "check":
+        await asyncio.to_thread(check_db_schema)
+    else:
+        await asyncio.to_thread(init_db)
+
+    redis_client = get_redis_client()
+    github_api = get_github_api()
+    results = await asyncio.gather(
+        asyncio.to_thread(warm_up_db_pool, settings.startup_db_connections),
+        redis_client.warm_up(settings.startup_redis_connections),
+        github_api.warm_up(settings.startup_github_connections),
+        return_exceptions=True,
+    )
+    for dependency, result in zip(("postgres", "redis", "github"), results):
+        if isinstance(result, BaseException):
+            # The readiness probe reports the unavailable dependencies
+            logger.warning("Failed to warm up %s: %s", dependency, result)
+
+    if settings.startup_preload_hot_keys:
+        try:
+            nb_keys = await redis_client.preload_hot_keys(
+                settings.startup_preload_hot_keys
+            )
+            logger.info("%d hot keys preloaded", nb_keys)
+        except Exception as e:
+            logger.warning("Failed to preload the hot keys: %s", e)
+
+    app.state.warm = True
+    logger.info("Worker warm in %.2fs", perf_counter() - start)
+
+
+async def shut_down(app: FastAPI) -> None:
+    app.state.warm = False
+    await close_http_client()
+    await get_redis_client().close()
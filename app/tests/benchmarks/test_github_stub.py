@@ -0,0 +1,81 @@
+import pytest
+from app.benchmarks.github_stub import SyntheticStarGraph, create_github_stub
+from app.benchmarks.memory_redis import get_memory_redis_client
+from app.benchmarks.run import find_regressions
+from app.services.github.api import GitHubAPI
+import httpx
+
+
+class TestGitHubStub:
+    @pytest.fixture
+    def graph(self):
+        return SyntheticStarGraph(nb_users=500, nb_repos=100, seed=1)
+
+    @pytest.mark.asyncio
+    async def test_stub_serves_github_api(self, graph):
+        stub = create_github_stub(graph)
+        github_api = GitHubAPI(
+            base_url="http://github.stub/",
+            redis_client=get_memory_redis_client(),
+            transport=httpx.ASGITransport(app=stub),
+        )
+
+        stargazers = await github_api.get_stargazers_by_repo("bench", "repo0", 250)
+        _, starred_repos = await github_api.get_starred_repos_by_username(
+            stargazers[0]["login"]
+        )
+
+        assert len(stargazers) == 250
+        assert "bench/repo0" in starred_repos
+        assert stub.state.request_count == github_api.request_count
+        # The second lookup is served by the in-memory cache
+        await github_api.get_stargazers_by_repo("bench", "repo0", 250)
+        assert stub.state.request_count == github_api.request_count
+
+    @pytest.mark.asyncio
+    async def test_pagination_and_rate_limit_headers(self, graph):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=create_github_stub(graph, rate_limit=10)),
+            base_url="http://github.stub",
+        ) as client:
+            response = await client.get("/repos/bench/repo0/stargazers?per_page=100")
+
+        assert response.links["next"]["url"].endswith("page=2")
+        assert response.headers["X-RateLimit-Remaining"] == "9"
+        assert len(response.json()) == 100
+
+
+def test_find_regressions():
+    baselines = {
+        "cold-20": {"p50_ms": 100, "p99_ms": 200, "github_calls": 21, "peak_rss_mb": 80}
+    }
+
+    assert not find_regressions(
+        {
+            "cold-20": {
+                "p50_ms": 120,
+                "p99_ms": 200,
+                "github_calls": 21,
+                "peak_rss_mb": 80,
+            }
+        },
+        baselines,
+        0.5,
+    )
+    assert (
+        len(
+            find_regressions(
+                {
+                    "cold-20": {
+                        "p50_ms": 200,
+                        "p99_ms": 200,
+                        "github_calls": 22,
+                        "peak_rss_mb": 80,
+                    }
+                },
+                baselines,
+                0.5,
+            )
+        )
+        == 2
+    )
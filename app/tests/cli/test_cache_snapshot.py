@@ -0,0 +1,66 @@
+import base64
+import gzip
+import pickle
+from time import time
+
+import orjson
+import pytest
+
+from app.benchmarks.memory_redis import MemoryRedis, get_memory_redis_client
+from app.cli.cache_snapshot import export_snapshot, import_snapshot
+
+
+class TestCacheSnapshot:
+    @pytest.mark.asyncio
+    async def test_round_trip_keeps_ttls(self, tmp_path):
+        source = MemoryRedis()
+        redis_client = get_memory_redis_client(source)
+        for page in range(5):
+            await redis_client.set_cache_value(
+                f"https://api.github.com/users/user{page}/starred?per_page=100",
+                {"links": {}, "content": "[]"},
+                ex=600,
+            )
+        await redis_client.set_cache_value("github_entity_starred_user0", [], ex=60)
+        # Outside of the GitHub namespace
+        await redis_client.increment_counter("quota_1_0", 5)
+        path = str(tmp_path / "github-cache.jsonl.gz")
+
+        # The cached keys and the index of each user
+        assert await export_snapshot(source, path, chunk_size=2) == 11
+        with gzip.open(path, "rb") as snapshot:
+            # The header, then a chunk per scan batch
+            assert len(snapshot.readlines()) == 7
+
+        target = MemoryRedis()
+        assert await import_snapshot(target, path) == 11
+        restored_client = get_memory_redis_client(target)
+        assert await restored_client.get_cached_value_by_key(
+            "https://api.github.com/users/user3/starred?per_page=100"
+        ) == {"links": {}, "content": "[]"}
+        assert not await restored_client.key_exists("quota_1_0")
+        entity_key = await restored_client.generate_cache_key(
+            "github_entity_starred_user0"
+        )
+        assert 0 < await target.pttl(entity_key) <= 60_000
+
+    @pytest.mark.asyncio
+    async def test_expired_keys_are_skipped(self, tmp_path):
+        payload = base64.b64encode(pickle.dumps("value")).decode()
+        path = str(tmp_path / "github-cache.jsonl.gz")
+        with gzip.open(path, "wb") as snapshot:
+            # Exported 10 seconds ago
+            header = {"namespace": "github", "exported_at": time() - 10}
+            snapshot.write(orjson.dumps(header) + b"\n")
+            chunk = [
+                ["github:expired", 5000, payload],
+                ["github:expiring", 60_000, payload],
+                ["github:persistent", -1, payload],
+            ]
+            snapshot.write(orjson.dumps(chunk) + b"\n")
+        target = MemoryRedis()
+
+        assert await import_snapshot(target, path) == 2
+        assert await target.get("github:expired") is None
+        assert 0 < await target.pttl("github:expiring") <= 50_000
+        assert await target.pttl("github:persistent") == -1
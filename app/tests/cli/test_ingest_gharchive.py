@@ -0,0 +1,59 @@
+import gzip
+from datetime import datetime, timezone
+
+import orjson
+
+from app.cli.ingest_gharchive import iter_watch_events
+from app.schemas.star import StarEdge
+
+EVENTS = [
+    {
+        "type": "WatchEvent",
+        "actor": {"id": 1, "login": "user1"},
+        "repo": {"id": 10, "name": "owner/repo"},
+        "payload": {"action": "started"},
+        "created_at": "2024-01-01T15:00:00Z",
+    },
+    {
+        "type": "PushEvent",
+        "actor": {"id": 2, "login": "user2"},
+        "repo": {"id": 10, "name": "owner/repo"},
+        "payload": {"ref": "WatchEvent"},
+        "created_at": "2024-01-01T15:01:00Z",
+    },
+    {
+        "type": "WatchEvent",
+        "actor": {"id": 3, "login": "user3"},
+        "repo": {"id": 11, "name": "owner/other"},
+        "payload": {"action": "started"},
+        "created_at": "2024-01-01T15:02:00Z",
+    },
+]
+
+
+class TestIterWatchEvents:
+    def test_extracts_watch_events_only(self, tmp_path):
+        path = tmp_path / "2024-01-01-15.json.gz"
+        with gzip.open(path, "wb") as archive:
+            for event in EVENTS:
+                archive.write(orjson.dumps(event) + b"\n")
+            archive.write(b'{"type": "WatchEvent", broken\n')
+
+        edges = list(iter_watch_events(str(path)))
+
+        assert edges == [
+            StarEdge(
+                1,
+                "user1",
+                10,
+                "owner/repo",
+                datetime(2024, 1, 1, 15, 0, tzinfo=timezone.utc),
+            ),
+            StarEdge(
+                3,
+                "user3",
+                11,
+                "owner/other",
+                datetime(2024, 1, 1, 15, 2, tzinfo=timezone.utc),
+            ),
+        ]
@@ -0,0 +1,109 @@
+import pytest
+
+from app.benchmarks.memory_redis import MemoryRedis, get_memory_redis_client
+
+ENTITY_KEY = "github_entity_starred_user1"
+
+
+class TestCompareAndSetCacheValue:
+    @pytest.mark.asyncio
+    async def test_set_unless_rejected(self):
+        redis_client = get_memory_redis_client()
+
+        assert await redis_client.compare_and_set_cache_value(
+            ENTITY_KEY, {"watermark": 2}, lambda current: current is None
+        )
+        assert not await redis_client.compare_and_set_cache_value(
+            ENTITY_KEY, {"watermark": 1}, lambda current: current is None
+        )
+        assert await redis_client.get_cached_value_by_key(ENTITY_KEY) == {
+            "watermark": 2
+        }
+        # Indexed like the other writes
+        assert await redis_client.redis_client.sscan("index:user:user1")
+
+    @pytest.mark.asyncio
+    async def test_concurrent_write_is_compared_again(self):
+        redis = MemoryRedis()
+        redis_client = get_memory_redis_client(redis)
+        compared = []
+
+        def replaces(current):
+            compared.append(current)
+            if current is None:
+                # Another writer sets a deeper crawl meanwhile
+                redis.values[hashed_key] = '{"watermark": 3}'
+                return True
+            return 2 > current["watermark"]
+
+        hashed_key = await redis_client.generate_cache_key(ENTITY_KEY)
+
+        assert not await redis_client.compare_and_set_cache_value(
+            ENTITY_KEY, {"watermark": 2}, replaces
+        )
+        assert compared == [None, {"watermark": 3}]
+        assert await redis_client.get_cached_value_by_key(ENTITY_KEY) == {
+            "watermark": 3
+        }
+
+
+class TestUpdateCacheValue:
+    @pytest.mark.asyncio
+    async def test_concurrent_write_is_updated_again(self):
+        redis = MemoryRedis()
+        redis_client = get_memory_redis_client(redis)
+        await redis_client.set_cache_value(ENTITY_KEY, {"records": ["o/r1"]})
+        hashed_key = await redis_client.generate_cache_key(ENTITY_KEY)
+        updated = []
+
+        def add_record(entity):
+            updated.append(list(entity["records"]))
+            if len(updated) == 1:
+                # A concurrent event adds another record meanwhile
+                redis.values[hashed_key] = '{"records": ["o/r2", "o/r1"]}'
+            entity["records"].insert(0, "o/r3")
+            return entity
+
+        assert await redis_client.update_cache_value(ENTITY_KEY, add_record)
+        assert updated == [["o/r1"], ["o/r2", "o/r1"]]
+        assert await redis_client.get_cached_value_by_key(ENTITY_KEY) == {
+            "records": ["o/r3", "o/r2", "o/r1"]
+        }
+
+    @pytest.mark.asyncio
+    async def test_no_value_no_write(self):
+        redis_client = get_memory_redis_client()
+
+        assert not await redis_client.update_cache_value(ENTITY_KEY, lambda _: None)
+        assert await redis_client.get_cached_value_by_key(ENTITY_KEY) is None
+
+
+class TestLegacyKeys:
+    @pytest.mark.asyncio
+    async def test_former_keys_are_moved(self):
+        redis = MemoryRedis()
+        redis_client = get_memory_redis_client(redis)
+        hashed_key = await redis_client.generate_cache_key(ENTITY_KEY)
+        digest = hashed_key.rsplit(":", 1)[-1]
+        await redis.set(f"github:{digest}", '{"watermark": 1}', ex=600)
+
+        assert await redis_client.get_cached_values_by_keys([ENTITY_KEY]) == [
+            {"watermark": 1}
+        ]
+        assert await redis.get(f"github:{digest}") is None
+        assert 0 < await redis.pttl(hashed_key) <= 600_000
+        _, indexed_keys = await redis.sscan("index:user:user1")
+        assert hashed_key in indexed_keys
+
+    @pytest.mark.asyncio
+    async def test_former_set_members_are_merged(self):
+        redis = MemoryRedis()
+        redis_client = get_memory_redis_client(redis)
+        bucket_key = "minhash_lsh_0_42"
+        hashed_key = await redis_client.generate_cache_key(bucket_key)
+        await redis.sadd(hashed_key.rsplit(":", 1)[-1], "o/old")
+        await redis_client.add_set_members({bucket_key: ["o/new"]})
+
+        [members] = await redis_client.get_random_set_members([bucket_key], 10)
+
+        assert sorted(members) == ["o/new", "o/old"]
@@ -0,0 +1,118 @@
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.repositories.star import StarRepository
+from app.schemas.star import StarEdge
+
+STARRED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def mocked_session():
+    return MagicMock()
+
+
+@pytest.fixture
+def mocked_cursor(mocked_session):
+    return mocked_session.connection.return_value.connection.cursor.return_value
+
+
+@pytest.fixture
+def repository(mocked_session):
+    return StarRepository(mocked_session)
+
+
+class TestStarRepository:
+    def test_upsert_stars_copies_each_table(
+        self, repository, mocked_session, mocked_cursor
+    ):
+        copied = []
+        mocked_cursor.copy_expert.side_effect = lambda sql, buffer: copied.append(
+            (sql, buffer.read())
+        )
+        edges = [
+            StarEdge(1, "user1", 10, "owner/repo", STARRED_AT),
+            StarEdge(2, "user2", 10, "owner/repo", None),
+            StarEdge(1, "user1", 10, "owner/repo", STARRED_AT),
+        ]
+
+        result = repository.upsert_stars(edges)
+
+        assert result == 2
+        assert [sql.split(" ")[1] for sql, _ in copied] == [
+            "tmp_github_user",
+            "tmp_github_repository",
+            "tmp_stars",
+        ]
+        assert copied[0][1].splitlines() == [
+            f"1,user1,{STARRED_AT.isoformat()}",
+            "2,user2,",
+        ]
+        assert copied[1][1].splitlines() == [f"10,owner/repo,{STARRED_AT.isoformat()}"]
+        assert copied[2][1].splitlines() == [
+            f"1,10,{STARRED_AT.isoformat()}",
+            "2,10,",
+        ]
+        mocked_session.commit.assert_called_once()
+
+    def test_upsert_stars_updates_on_conflict(self, repository, mocked_cursor):
+        repository.upsert_stars([StarEdge(1, "user1", 10, "owner/repo", STARRED_AT)])
+
+        executed = [call.args[0] for call in mocked_cursor.execute.call_args_list]
+        star_insert = executed[-1]
+        assert star_insert.startswith('INSERT INTO "stars"')
+        assert "ORDER BY user_id, repo_id ON CONFLICT (user_id, repo_id)" in star_insert
+        assert (
+            'starred_at = GREATEST("stars".starred_at, EXCLUDED.starred_at)'
+            in star_insert
+        )
+        user_insert = executed[2]
+        assert user_insert.startswith('INSERT INTO "github_user"')
+        assert user_insert.endswith(
+            'WHERE "github_user".seen_at IS NULL '
+            'OR EXCLUDED.seen_at >= "github_user".seen_at'
+        )
+
+    def test_most_recent_names_are_kept(self, repository, mocked_cursor):
+        copied = []
+        mocked_cursor.copy_expert.side_effect = lambda sql, buffer: copied.append(
+            buffer.read()
+        )
+        older = datetime(2023, 1, 1, tzinfo=timezone.utc)
+
+        repository.upsert_stars(
+            [
+                StarEdge(1, "user1", 10, "owner/repo", STARRED_AT),
+                StarEdge(1, "old-login", 11, "owner/other", older),
+            ]
+        )
+
+        assert copied[0].splitlines() == [f"1,user1,{STARRED_AT.isoformat()}"]
+
+    def test_upsert_without_stars(self, repository, mocked_session, mocked_cursor):
+        assert repository.upsert_stars([]) == 0
+        mocked_cursor.copy_expert.assert_not_called()
+        mocked_session.commit.assert_not_called()
+
+    def test_get_repo_watermark(self, repository, mocked_session):
+        mocked_session.query.return_value.filter.return_value.scalar.return_value = (
+            STARRED_AT
+        )
+
+        assert repository.get_repo_watermark(10) == STARRED_AT
+
+    def test_ingest_archive_flags_file_in_same_transaction(
+        self, repository, mocked_session
+    ):
+        result = repository.ingest_archive(
+            "2024-01-01-15.json.gz",
+            [StarEdge(1, "user1", 10, "owner/repo", STARRED_AT)],
+        )
+
+        assert result == 1
+        archive = mocked_session.merge.call_args.args[0]
+        assert archive.filename == "2024-01-01-15.json.gz"
+        assert archive.nb_stars == 1
+        mocked_session.commit.assert_called_once()
@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import MagicMock, patch
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.exc import IntegrityError, ProgrammingError
 import uuid
 from app.models.user import User
 from app.repositories.exception import (
@@ -115,3 +115,18 @@ class TestUserRepository:
 
         mocked_session.query.assert_called_once()
         assert result is None
+
+    def test_is_admin(self, repository, mocked_session):
+        user = User(id=uuid.uuid4(), email="user@example.com")
+        mocked_session.query.return_value.filter.return_value.scalar.return_value = True
+
+        assert repository.is_admin(user)
+
+    def test_no_admin_before_the_migration(self, repository, mocked_session):
+        user = User(id=uuid.uuid4(), email="user@example.com")
+        mocked_session.query.return_value.filter.return_value.scalar.side_effect = (
+            ProgrammingError("column user.is_admin does not exist", {}, None)
+        )
+
+        assert not repository.is_admin(user)
+        mocked_session.rollback.assert_called_once()
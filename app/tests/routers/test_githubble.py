@@ -1,9 +1,19 @@
 import pytest
+from time import time
 from unittest.mock import Mock, AsyncMock
-from fastapi import HTTPException
+from fastapi import BackgroundTasks, HTTPException
 from httpx import HTTPStatusError, Response
-from app.schemas.githubble import StarNeighboursResponse, StarNeighbours
+from app.repositories.star import StarRepository
+from app.schemas.github import SamplingStrategy
+from app.schemas.githubble import (
+    BatchStarNeighboursRequest,
+    NeighbourSource,
+    StarNeighboursResponse,
+    StarNeighbours,
+)
 from app.services.github.api import GitHubAPI
+from app.services.github.scheduler import PriorityScheduler
+from app.services.sketch import SketchIndex
 
 MOCK_USER = "testuser"
 MOCK_REPO = "testrepo"
@@ -43,7 +53,10 @@ class TestGetRepoStarNeighbours:
             user=MOCK_USER,
             repo=MOCK_REPO,
             req=req_mock,
+            background_tasks=BackgroundTasks(),
             github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
             max_stargazers=20,
             page=1,
             per_page=10,
@@ -78,7 +91,10 @@ class TestGetRepoStarNeighbours:
             user=MOCK_USER,
             repo=MOCK_REPO,
             req=req_mock,
+            background_tasks=BackgroundTasks(),
             github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
             max_stargazers=20,
             page=1,
             per_page=10,
@@ -108,7 +124,10 @@ class TestGetRepoStarNeighbours:
                 user=MOCK_USER,
                 repo=MOCK_REPO,
                 req=req_mock,
+                background_tasks=BackgroundTasks(),
                 github_api=mock_github_api,
+                star_repository=Mock(spec=StarRepository),
+                sketch_index=Mock(spec=SketchIndex),
                 max_stargazers=20,
                 page=1,
                 per_page=10,
@@ -140,7 +159,10 @@ class TestGetRepoStarNeighbours:
             user=MOCK_USER,
             repo=MOCK_REPO,
             req=req_mock,
+            background_tasks=BackgroundTasks(),
             github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
             max_stargazers=20,
             page=1,
             per_page=2,
@@ -150,7 +172,10 @@ class TestGetRepoStarNeighbours:
             user=MOCK_USER,
             repo=MOCK_REPO,
             req=req_mock,
+            background_tasks=BackgroundTasks(),
             github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
             max_stargazers=20,
             page=2,
             per_page=2,
@@ -189,7 +214,10 @@ class TestGetRepoStarNeighbours:
             user=MOCK_USER,
             repo=MOCK_REPO,
             req=req_mock,
+            background_tasks=BackgroundTasks(),
             github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
             max_stargazers=20,
             page=1,
             per_page=10,
@@ -199,3 +227,422 @@ class TestGetRepoStarNeighbours:
         repos = {item.repo for item in result.star_neighbours}
         assert MOCK_REPO in repos
         assert "repo1" in repos
+        # Degraded answer, one of the three stargazers is missing
+        assert result.coverage == pytest.approx(2 / 3)
+
+    @pytest.mark.asyncio
+    async def test_base_repo_sketched_under_full_name(self, mock_github_api):
+        mock_github_api.get_stargazers_by_repo.return_value = MOCK_STARGAZERS
+
+        async def mock_fetch_starred_repos(username):
+            return username, MOCK_STARRED_REPOS[username]
+
+        mock_github_api.get_starred_repos_by_username.side_effect = (
+            mock_fetch_starred_repos
+        )
+        sketch_index = Mock(spec=SketchIndex)
+        background_tasks = BackgroundTasks()
+
+        from app.routers.githubble import get_repo_star_neighbours
+
+        await get_repo_star_neighbours(
+            user=MOCK_USER,
+            repo=MOCK_REPO,
+            req=Mock(),
+            background_tasks=background_tasks,
+            github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=sketch_index,
+            max_stargazers=20,
+            page=1,
+            per_page=10,
+        )
+        await background_tasks()
+
+        (stargazers_by_repo,), _ = sketch_index.update.call_args
+        assert MOCK_REPO not in stargazers_by_repo
+        assert stargazers_by_repo[f"{MOCK_USER}/{MOCK_REPO}"] == {
+            stargazer["login"] for stargazer in MOCK_STARGAZERS
+        }
+
+    @pytest.mark.asyncio
+    async def test_store_source(self, mock_github_api):
+        star_repository = Mock(spec=StarRepository)
+        star_repository.get_star_neighbours.return_value = {
+            f"{MOCK_USER}/{MOCK_REPO}": {"user1", "user2", "user3"},
+            "repo2": {"user1", "user2"},
+        }
+
+        req_mock = Mock()
+        req_mock.url.include_query_params.return_value = None
+
+        from app.routers.githubble import get_repo_star_neighbours
+
+        result = await get_repo_star_neighbours(
+            user=MOCK_USER,
+            repo=MOCK_REPO,
+            req=req_mock,
+            background_tasks=BackgroundTasks(),
+            github_api=mock_github_api,
+            star_repository=star_repository,
+            sketch_index=Mock(spec=SketchIndex),
+            max_stargazers=20,
+            page=1,
+            per_page=10,
+            source=NeighbourSource.STORE,
+        )
+
+        star_repository.get_star_neighbours.assert_called_once_with(
+            f"{MOCK_USER}/{MOCK_REPO}", 20
+        )
+        mock_github_api.get_stargazers_by_repo.assert_not_called()
+        assert [item.repo for item in result.star_neighbours] == [
+            f"{MOCK_USER}/{MOCK_REPO}",
+            "repo2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_neighbour_index_hit(self, mock_github_api):
+        neighbour_index = Mock(top_k=100)
+        neighbour_index.get_neighbours.return_value = [
+            (f"{MOCK_USER}/{MOCK_REPO}", 3),
+            ("repo2", 2),
+        ]
+
+        req_mock = Mock()
+        req_mock.url.include_query_params.return_value = None
+
+        from app.routers.githubble import get_repo_star_neighbours
+
+        result = await get_repo_star_neighbours(
+            user=MOCK_USER,
+            repo=MOCK_REPO,
+            req=req_mock,
+            background_tasks=BackgroundTasks(),
+            github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
+            max_stargazers=20,
+            page=1,
+            per_page=10,
+            neighbour_index=neighbour_index,
+        )
+
+        mock_github_api.get_stargazers_by_repo.assert_not_called()
+        # The base repository is listed by its bare name, like the GitHub crawl does
+        assert [
+            (item.repo, item.stargazers_count) for item in result.star_neighbours
+        ] == [
+            (MOCK_REPO, 3),
+            ("repo2", 2),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_neighbour_index_doesnt_cover_sample(self, mock_github_api):
+        neighbour_index = Mock(top_k=100)
+        neighbour_index.get_neighbours.return_value = [
+            (f"{MOCK_USER}/{MOCK_REPO}", 30),
+            ("repo2", 2),
+        ]
+        mock_github_api.get_stargazers_by_repo.return_value = []
+
+        from app.routers.githubble import get_repo_star_neighbours
+
+        # The index counts 30 stargazers, the query only takes 20 of them
+        await get_repo_star_neighbours(
+            user=MOCK_USER,
+            repo=MOCK_REPO,
+            req=Mock(),
+            background_tasks=BackgroundTasks(),
+            github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
+            max_stargazers=20,
+            page=1,
+            per_page=10,
+            neighbour_index=neighbour_index,
+        )
+
+        mock_github_api.get_stargazers_by_repo.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_adaptive_strategy_stops_fan_out(self, mock_github_api):
+        mock_github_api.get_stargazers_by_repo.return_value = [
+            {"login": f"user{i}"} for i in range(500)
+        ]
+
+        async def mock_fetch_starred_repos(username):
+            return username, ["repo1", "repo2"]
+
+        mock_github_api.get_starred_repos_by_username.side_effect = (
+            mock_fetch_starred_repos
+        )
+
+        req_mock = Mock()
+        req_mock.url.include_query_params.return_value = None
+
+        from app.routers.githubble import (
+            ADAPTIVE_BATCH_SIZE,
+            get_repo_star_neighbours,
+        )
+
+        result = await get_repo_star_neighbours(
+            user=MOCK_USER,
+            repo=MOCK_REPO,
+            req=req_mock,
+            background_tasks=BackgroundTasks(),
+            github_api=mock_github_api,
+            star_repository=Mock(spec=StarRepository),
+            sketch_index=Mock(spec=SketchIndex),
+            max_stargazers=500,
+            page=1,
+            per_page=3,
+            strategy=SamplingStrategy.ADAPTIVE,
+        )
+
+        mock_github_api.get_stargazers_by_repo.assert_called_once_with(
+            MOCK_USER, MOCK_REPO, 500, SamplingStrategy.ADAPTIVE
+        )
+        # The ranking is the same after the second batch
+        assert (
+            mock_github_api.get_starred_repos_by_username.call_count
+            == 2 * ADAPTIVE_BATCH_SIZE
+        )
+        assert [item.repo for item in result.star_neighbours] == [
+            MOCK_REPO,
+            "repo1",
+            "repo2",
+        ]
+
+
+class TestGetBatchStarNeighbours:
+    @pytest.fixture
+    def mock_github_api(self):
+        api = Mock(spec=GitHubAPI)
+        api.token = None
+        api.scheduler = PriorityScheduler(10)
+        api.get_stargazers_by_repo = AsyncMock()
+        api.get_starred_repos_by_username = AsyncMock()
+        return api
+
+    @pytest.mark.asyncio
+    async def test_rejected_below_the_bulk_rate_limit_floor(self, mock_github_api):
+        from app.routers.githubble import get_batch_star_neighbours
+
+        mock_github_api.scheduler.update_rate_limit(
+            remaining=1000, limit=5000, reset=time() + 600
+        )
+
+        with pytest.raises(HTTPException) as error:
+            await get_batch_star_neighbours(
+                batch=BatchStarNeighboursRequest(repos=["owner/repo_a"]),
+                background_tasks=BackgroundTasks(),
+                github_api=mock_github_api,
+                sketch_index=Mock(spec=SketchIndex),
+            )
+
+        assert error.value.status_code == 429
+        assert "Retry-After" in error.value.headers
+        mock_github_api.get_stargazers_by_repo.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_shared_fan_out(self, mock_github_api):
+        stargazers = {
+            "owner/repo_a": [{"login": "user1"}, {"login": "user2"}],
+            "owner/repo_b": [{"login": "user2"}, {"login": "user3"}],
+        }
+
+        async def mock_fetch_stargazers(owner, repo, max_stargazers, strategy):
+            if repo == "missing":
+                mock_response = Mock(spec=Response)
+                mock_response.status_code = 404
+                raise HTTPStatusError(
+                    "Not Found", request=Mock(), response=mock_response
+                )
+            return stargazers[f"{owner}/{repo}"]
+
+        async def mock_fetch_starred_repos(username):
+            return username, MOCK_STARRED_REPOS[username]
+
+        mock_github_api.get_stargazers_by_repo.side_effect = mock_fetch_stargazers
+        mock_github_api.get_starred_repos_by_username.side_effect = (
+            mock_fetch_starred_repos
+        )
+
+        from app.routers.githubble import get_batch_star_neighbours
+
+        result = await get_batch_star_neighbours(
+            batch=BatchStarNeighboursRequest(
+                repos=["owner/repo_a", "owner/repo_b", "owner/missing"]
+            ),
+            background_tasks=BackgroundTasks(),
+            github_api=mock_github_api,
+            sketch_index=Mock(spec=SketchIndex),
+        )
+
+        # user2 stargazes both repositories but is only fetched once
+        assert mock_github_api.get_starred_repos_by_username.call_count == 3
+        results = {r.repo: r for r in result.results}
+        repo_a_neighbours = results["owner/repo_a"].star_neighbours
+        assert {n.repo for n in repo_a_neighbours[:3]} == {
+            "owner/repo_a",
+            "repo2",
+            MOCK_REPO,
+        }
+        assert repo_a_neighbours[3].repo == "repo1"
+        repo_b_neighbours = {
+            n.repo: n.stargazers for n in results["owner/repo_b"].star_neighbours
+        }
+        assert repo_b_neighbours["repo2"] == ["user2"]
+        assert set(repo_b_neighbours[MOCK_REPO]) == {"user2", "user3"}
+        assert results["owner/missing"].error == "API Error: 404"
+        assert results["owner/missing"].star_neighbours == []
+
+    @pytest.mark.asyncio
+    async def test_bounded_fan_out(self, mock_github_api, monkeypatch):
+        async def mock_fetch_stargazers(owner, repo, max_stargazers, strategy):
+            if repo == "broken":
+                raise HTTPException(status_code=503)
+            if repo == "failing":
+                raise ValueError("invalid page")
+            return [{"login": f"{repo}_user{i}"} for i in range(10)]
+
+        async def mock_fetch_starred_repos(username):
+            return username, ["repo1"]
+
+        mock_github_api.get_stargazers_by_repo.side_effect = mock_fetch_stargazers
+        mock_github_api.get_starred_repos_by_username.side_effect = (
+            mock_fetch_starred_repos
+        )
+        from app.routers import githubble
+
+        monkeypatch.setattr(githubble.settings, "batch_max_stargazers", 6)
+
+        result = await githubble.get_batch_star_neighbours(
+            batch=BatchStarNeighboursRequest(
+                repos=["o/repo_a", "o/repo_b", "o/broken", "o/failing"]
+            ),
+            background_tasks=BackgroundTasks(),
+            github_api=mock_github_api,
+            sketch_index=Mock(spec=SketchIndex),
+        )
+
+        assert mock_github_api.get_starred_repos_by_username.call_count == 6
+        results = {r.repo: r for r in result.results}
+        # Each repository gets its share of the fetched stargazers
+        assert results["o/repo_a"].coverage == pytest.approx(0.3)
+        assert results["o/repo_b"].coverage == pytest.approx(0.3)
+        assert results["o/broken"].error == "API Error: 503"
+        assert results["o/failing"].error == "Failed to fetch the stargazers"
+
+
+class TestGetRepoConstellation:
+    # repo -> stargazers, and user -> starred repos
+    STARGAZERS = {
+        "o/root": ["u1", "u2"],
+        "o/a": ["u1", "u2", "u3"],
+        "o/b": ["u2"],
+        "o/c": ["u3"],
+    }
+    STARRED = {
+        "u1": ["o/root", "o/a"],
+        "u2": ["o/root", "o/a", "o/b"],
+        "u3": ["o/a", "o/c"],
+    }
+
+    @pytest.fixture
+    def mock_github_api(self):
+        api = Mock(spec=GitHubAPI)
+        api.token = None
+        api.request_count = 0
+
+        async def mock_fetch_stargazers(owner, repo, max_stargazers):
+            api.request_count += 1
+            return [{"login": u} for u in self.STARGAZERS[f"{owner}/{repo}"]]
+
+        async def mock_fetch_starred_repos(username):
+            api.request_count += 1
+            return username, self.STARRED[username]
+
+        api.get_stargazers_by_repo = AsyncMock(side_effect=mock_fetch_stargazers)
+        api.get_starred_repos_by_username = AsyncMock(
+            side_effect=mock_fetch_starred_repos
+        )
+        return api
+
+    @pytest.mark.asyncio
+    async def test_best_first_expansion(self, mock_github_api):
+        from app.routers.githubble import get_repo_constellation
+
+        result = await get_repo_constellation(
+            user="o",
+            repo="root",
+            github_api=mock_github_api,
+            depth=2,
+            budget=100,
+            max_stargazers=20,
+            per_node=5,
+        )
+
+        nodes = {node.repo: (node.depth, node.weight) for node in result.nodes}
+        assert nodes == {"o/root": (0, 0), "o/a": (1, 2), "o/b": (1, 1), "o/c": (2, 1)}
+        expanded = [
+            call.args[:2]
+            for call in mock_github_api.get_stargazers_by_repo.call_args_list
+        ]
+        # o/a shares more stargazers with the root than o/b, so it's expanded first
+        assert expanded == [("o", "root"), ("o", "a"), ("o", "b")]
+        assert not result.budget_exhausted
+        assert result.github_calls == mock_github_api.request_count
+
+    @pytest.mark.asyncio
+    async def test_budget_exhausted(self, mock_github_api):
+        from app.routers.githubble import get_repo_constellation
+
+        result = await get_repo_constellation(
+            user="o",
+            repo="root",
+            github_api=mock_github_api,
+            depth=2,
+            budget=4,
+            max_stargazers=20,
+            per_node=5,
+        )
+
+        # The root expansion costs 3 calls, the single remaining one can't pay for more
+        assert result.budget_exhausted
+        assert mock_github_api.get_stargazers_by_repo.call_count == 1
+        assert {node.repo for node in result.nodes} == {"o/root", "o/a", "o/b"}
+
+    @pytest.mark.asyncio
+    async def test_retries_count_against_budget(self, mock_github_api, monkeypatch):
+        from app.routers import githubble
+
+        stargazers = [{"login": f"u{i % 3 + 1}"} for i in range(3)]
+        mock_github_api.get_stargazers_by_repo.side_effect = None
+        mock_github_api.get_stargazers_by_repo.return_value = stargazers
+
+        async def mock_fetch_starred_repos(username):
+            # Each starred list is retried once
+            mock_github_api.request_count += 2
+            return username, self.STARRED[username]
+
+        mock_github_api.get_starred_repos_by_username.side_effect = (
+            mock_fetch_starred_repos
+        )
+        monkeypatch.setattr(githubble, "CONSTELLATION_WAVE_SIZE", 1)
+
+        result = await githubble.get_repo_constellation(
+            user="o",
+            repo="root",
+            github_api=mock_github_api,
+            depth=2,
+            budget=4,
+            max_stargazers=20,
+            per_node=5,
+        )
+
+        # The second wave already used the budget, the third one isn't sent
+        assert result.budget_exhausted
+        assert mock_github_api.get_starred_repos_by_username.call_count == 2
+        assert result.github_calls == 4
@@ -0,0 +1,166 @@
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import orjson
+import pytest
+
+from app.benchmarks.memory_redis import get_memory_redis_client
+from app.cli.replay_webhooks import replay
+from app.main import app
+from app.repositories.star import StarRepository
+from app.routers import webhooks
+from app.services.github.api import GitHubAPI
+from app.services.sketch import SketchIndex
+from app.services.webhooks import (
+    StarEventHandler,
+    get_star_event_handler,
+    sign_payload,
+)
+
+SECRET = "webhook-secret"
+WEBHOOK_URL = "http://test/webhooks/github"
+SENDER = {"id": 1, "login": "user1", "html_url": "https://github.com/user1"}
+REPOSITORY = {"id": 10, "full_name": "owner/repo"}
+
+
+def star_delivery(action: str) -> tuple[str, dict]:
+    return "star", {
+        "action": action,
+        "starred_at": "2024-01-01T15:00:00+00:00" if action == "created" else None,
+        "repository": REPOSITORY,
+        "sender": SENDER,
+    }
+
+
+class TestGitHubWebhook:
+    @pytest.fixture
+    def github_api(self):
+        return GitHubAPI(
+            base_url="https://api.github.com/",
+            redis_client=get_memory_redis_client(),
+        )
+
+    @pytest.fixture
+    def star_repository(self):
+        return Mock(spec=StarRepository)
+
+    @pytest.fixture
+    def client(self, github_api, star_repository, monkeypatch):
+        sketch_index = Mock(spec=SketchIndex)
+        sketch_index.update = AsyncMock()
+        app.dependency_overrides[get_star_event_handler] = lambda: StarEventHandler(
+            github_api, sketch_index, star_repository
+        )
+        monkeypatch.setattr(webhooks.settings, "github_webhook_secret", SECRET)
+        yield httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+        app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_stars_patch_the_cached_lists(
+        self, client, github_api, star_repository
+    ):
+        stargazers_key = GitHubAPI.STARGAZERS_ENTITY_KEY.format(
+            owner="owner", repo="repo"
+        )
+        starred_key = GitHubAPI.STARRED_ENTITY_KEY.format(username="user1")
+        await github_api.redis_client.set_cache_value(
+            stargazers_key,
+            {
+                "records": [{"login": "user0", "html_url": ""}],
+                "total": 1,
+                "watermark": 1,
+            },
+        )
+        await github_api.redis_client.set_cache_value(
+            starred_key, {"records": ["other/repo"], "total": None, "watermark": 1}
+        )
+
+        statuses = await replay(
+            client,
+            WEBHOOK_URL,
+            [("watch", {**star_delivery("created")[1], "action": "started"})]
+            + [star_delivery("created")],
+            SECRET,
+        )
+
+        assert statuses == {200: 2}
+        stargazers = await github_api.redis_client.get_cached_value_by_key(
+            stargazers_key
+        )
+        # Both events of the same star are applied once
+        assert stargazers["records"] == [
+            {"login": "user0", "html_url": ""},
+            {"login": "user1", "html_url": "https://github.com/user1"},
+        ]
+        assert stargazers["total"] == 2
+        starred = await github_api.redis_client.get_cached_value_by_key(starred_key)
+        assert starred["records"] == ["owner/repo", "other/repo"]
+        assert starred["total"] is None
+        assert star_repository.upsert_stars.call_count == 2
+
+        assert await replay(
+            client, WEBHOOK_URL, [star_delivery("deleted")], SECRET
+        ) == {200: 1}
+        stargazers = await github_api.redis_client.get_cached_value_by_key(
+            stargazers_key
+        )
+        assert stargazers["total"] == 1
+        star_repository.delete_star.assert_called_once_with(1, 10)
+
+    @pytest.mark.asyncio
+    async def test_invalid_signature_is_refused(self, client, star_repository):
+        statuses = await replay(
+            client, WEBHOOK_URL, [star_delivery("created")], "wrong-secret"
+        )
+
+        assert statuses == {401: 1}
+        star_repository.upsert_stars.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_other_events_are_ignored(self, client):
+        response = await client.post(
+            WEBHOOK_URL,
+            content=b"{}",
+            headers={
+                "X-GitHub-Event": "push",
+                "X-Hub-Signature-256": sign_payload(SECRET, b"{}"),
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json()["action"] == "ignored"
+
+    async def post_delivery(self, client, delivery_id: str):
+        event, payload = star_delivery("created")
+        body = orjson.dumps(payload)
+        return await client.post(
+            WEBHOOK_URL,
+            content=body,
+            headers={
+                "X-GitHub-Event": event,
+                "X-GitHub-Delivery": delivery_id,
+                "X-Hub-Signature-256": sign_payload(SECRET, body),
+            },
+        )
+
+    @pytest.mark.asyncio
+    async def test_redeliveries_are_applied_once(self, client, star_repository):
+        first = await self.post_delivery(client, "delivery-1")
+        redelivery = await self.post_delivery(client, "delivery-1")
+
+        assert first.json()["action"] == "starred"
+        assert redelivery.json()["action"] == "duplicate"
+        star_repository.upsert_stars.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_failed_delivery_is_applied_when_redelivered(
+        self, client, star_repository
+    ):
+        star_repository.upsert_stars.side_effect = [ConnectionError("db down"), None]
+
+        with pytest.raises(ConnectionError):
+            await self.post_delivery(client, "delivery-1")
+        redelivery = await self.post_delivery(client, "delivery-1")
+
+        assert redelivery.json()["action"] == "starred"
+        assert star_repository.upsert_stars.call_count == 2
@@ -1,9 +1,47 @@
 import pytest
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, Mock
 from fastapi import HTTPException
+from app.schemas.github import GitHubAPIResponseSchema, SamplingStrategy
 from app.services.github.api import GitHubAPI
+from app.services.github.formaters import StarredRepositoryFormater
 from app.redis.engine import RedisClient
 from httpx import Response
+import httpx
+import orjson
+
+
+def stargazers_page(page: int, last_page: int):
+    return GitHubAPIResponseSchema(
+        links={
+            "last": {
+                "url": f"https://api.github.com/repos/o/r/stargazers?per_page=100&page={last_page}"
+            }
+        },
+        content=orjson.dumps(
+            [
+                {"login": f"user{(page - 1) * 100 + i}", "html_url": ""}
+                for i in range(100)
+            ]
+        ).decode("utf-8"),
+    )
+
+
+def star_page(*stars: tuple[str, str], last_page: int | None = None):
+    links = {}
+    if last_page:
+        links["last"] = {
+            "url": f"https://api.github.com/repos/o/r/stargazers?per_page=100&page={last_page}"
+        }
+    return GitHubAPIResponseSchema(
+        links=links,
+        content=orjson.dumps(
+            [
+                {"starred_at": starred_at, "user": {"id": i, "login": login}}
+                for i, (login, starred_at) in enumerate(stars)
+            ]
+        ).decode("utf-8"),
+    )
 
 
 class TestGitHubAPI:
@@ -12,6 +50,7 @@ class TestGitHubAPI:
         mock_client = Mock(spec=RedisClient)
         mock_client.get_cached_value_by_key = AsyncMock(return_value=None)
         mock_client.set_cache_value = AsyncMock()
+        mock_client.compare_and_set_cache_value = AsyncMock(return_value=True)
         mock_client.key_exists = AsyncMock(return_value=False)
         return mock_client
 
@@ -46,3 +85,357 @@ class TestGitHubAPI:
 
         assert exc_info.value.status_code == 403
         assert "GitHub rate limit reached" in str(exc_info.value.detail["error"])
+
+    @pytest.mark.asyncio
+    async def test_stargazers_since_stops_at_known_star(self, github_api_service):
+        pages = {
+            1: star_page(("a", "2024-01-01T00:00:00Z"), last_page=3),
+            2: star_page(("b", "2024-01-15T00:00:00Z"), ("c", "2024-02-01T00:00:00Z")),
+            3: star_page(("d", "2024-04-01T00:00:00Z")),
+        }
+        requested_urls = []
+
+        async def make_request(url, accept=None, use_cache=True):
+            requested_urls.append(url)
+            assert accept == GitHubAPI.STAR_MEDIA_TYPE
+            assert use_cache is False
+            page = int(url.split("&page=")[-1]) if "&page=" in url else 1
+            return pages[page]
+
+        github_api_service.make_request = make_request
+
+        stargazers = await github_api_service.get_stargazers_since(
+            "o", "r", since=datetime(2024, 2, 1, tzinfo=timezone.utc)
+        )
+
+        # The star given at since is kept, it may not be the only one at that time
+        assert [s["login"] for s in stargazers] == ["d", "c"]
+        # The first page is never walked since page 2 already holds an older star
+        assert len(requested_urls) == 3
+        assert requested_urls[-1].endswith("&page=2")
+
+    @pytest.mark.asyncio
+    async def test_uncached_request_isnt_cached(
+        self, github_api_service, mock_redis_client, mock_httpx_response
+    ):
+        github_api_service.send_request = AsyncMock(
+            return_value=(mock_httpx_response, b"[]")
+        )
+
+        await github_api_service.make_request(
+            "https://api.github.com/repos/o/r/stargazers?per_page=100", use_cache=False
+        )
+
+        mock_redis_client.get_cached_value_by_key.assert_not_called()
+        mock_redis_client.set_cache_value.assert_not_called()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "strategy, expected_pages, expected_first_logins",
+        [
+            (SamplingStrategy.UNIFORM, [1, 5, 10], ["user0", "user1", "user2"]),
+            (SamplingStrategy.RECENT, [1, 10, 9, 8, 7], ["user999", "user998"]),
+        ],
+    )
+    async def test_sampled_stargazers(
+        self, github_api_service, strategy, expected_pages, expected_first_logins
+    ):
+        requested_pages = []
+
+        async def get_formatted_page(url, formatter, cache_page=True):
+            page = int(url.split("&page=")[-1]) if "&page=" in url else 1
+            requested_pages.append(page)
+            response = stargazers_page(page, last_page=10)
+            return response.links, await formatter(response)
+
+        github_api_service.get_formatted_page = get_formatted_page
+
+        stargazers = await github_api_service.get_stargazers_by_repo(
+            "o", "r", 250, strategy
+        )
+
+        assert sorted(requested_pages) == sorted(expected_pages)
+        assert len(stargazers) == 250
+        logins = [s["login"] for s in stargazers]
+        assert logins[: len(expected_first_logins)] == expected_first_logins
+        if strategy == SamplingStrategy.UNIFORM:
+            # Records are picked evenly inside the fetched pages too
+            assert logins[-1] == "user998"
+            assert 80 <= len([login for login in logins if int(login[4:]) >= 900]) <= 86
+
+    @pytest.mark.asyncio
+    async def test_recent_stargazers_with_partial_last_page(self, github_api_service):
+        async def get_formatted_page(url, formatter, cache_page=True):
+            page = int(url.split("&page=")[-1]) if "&page=" in url else 1
+            response = stargazers_page(page, last_page=10)
+            records = await formatter(response)
+            # 930 stargazers
+            return response.links, records[:30] if page == 10 else records
+
+        github_api_service.get_formatted_page = get_formatted_page
+
+        stargazers = await github_api_service.get_stargazers_by_repo(
+            "o", "r", 100, SamplingStrategy.RECENT
+        )
+
+        assert len(stargazers) == 100
+        assert stargazers[0]["login"] == "user929"
+        assert stargazers[-1]["login"] == "user830"
+
+    @pytest.mark.asyncio
+    async def test_formatted_page_is_pruned(
+        self, github_api_service, mock_redis_client
+    ):
+        def handler(request):
+            return httpx.Response(
+                200,
+                headers={
+                    "Link": '<https://api.github.com/users/u/starred?per_page=100&page=3>; rel="last"'
+                },
+                json=[
+                    {"full_name": "o/r1", "description": "x" * 1000, "owner": {}},
+                    {"full_name": "o/r2", "description": "y" * 1000, "owner": {}},
+                ],
+            )
+
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        url = "https://api.github.com/users/u/starred?per_page=100"
+
+        links, data = await github_api_service.get_formatted_page(
+            url, StarredRepositoryFormater()
+        )
+
+        assert data == ["o/r1", "o/r2"]
+        assert await github_api_service.get_nb_pages(links) == 3
+        cache_key, cached_value = mock_redis_client.set_cache_value.call_args.args
+        # The whole responses cached by make_request keep the url
+        assert cache_key == f"{url}|fields=full_name"
+        # Only the formatter fields are kept in the cache
+        assert orjson.loads(cached_value["content"]) == [
+            {"full_name": "o/r1"},
+            {"full_name": "o/r2"},
+        ]
+        assert github_api_service.request_count == 1
+
+    @pytest.mark.parametrize(
+        "nb_pages, limit, strategy, expected",
+        [
+            (10, 250, SamplingStrategy.FIRST, [1, 2, 3]),
+            (2, 250, SamplingStrategy.FIRST, [1, 2]),
+            (10, None, SamplingStrategy.FIRST, list(range(1, 11))),
+            (10, 20, SamplingStrategy.FIRST, [1]),
+            (10, 250, SamplingStrategy.RECENT, [10, 9, 8, 7]),
+            (3, 300, SamplingStrategy.RECENT, [3, 2, 1]),
+            (10, 250, SamplingStrategy.UNIFORM, [1, 5, 10]),
+            (3, 1000, SamplingStrategy.UNIFORM, [1, 2, 3]),
+        ],
+    )
+    def test_plan_pages(self, nb_pages, limit, strategy, expected):
+        assert GitHubAPI.plan_pages(nb_pages, limit, strategy) == expected
+
+    @pytest.mark.asyncio
+    async def test_paginated_data_single_wave(
+        self, github_api_service, mock_redis_client
+    ):
+        requested_urls = []
+
+        async def get_formatted_page(url, formatter, cache_page=True):
+            requested_urls.append(url)
+            page = int(url.split("&page=")[-1]) if "&page=" in url else 1
+            response = stargazers_page(page, last_page=10)
+            return response.links, await formatter(response)
+
+        async def get_cached_value_by_key(key):
+            # The number of pages is known from a previous call
+            return 10 if key == "github_nb_pages_repos/o/r/stargazers" else None
+
+        github_api_service.get_formatted_page = get_formatted_page
+        mock_redis_client.get_cached_value_by_key.side_effect = get_cached_value_by_key
+
+        stargazers = await github_api_service.get_stargazers_by_repo("o", "r", 250)
+
+        assert requested_urls == [
+            "https://api.github.com/repos/o/r/stargazers?per_page=100",
+            "https://api.github.com/repos/o/r/stargazers?per_page=100&page=2",
+            "https://api.github.com/repos/o/r/stargazers?per_page=100&page=3",
+        ]
+        assert [s["login"] for s in stargazers] == [f"user{i}" for i in range(250)]
+        # The number of pages didn't change, only the entity record is written
+        mock_redis_client.set_cache_value.assert_not_called()
+        entity_key, entity, replaces = (
+            mock_redis_client.compare_and_set_cache_value.call_args.args
+        )
+        assert entity_key == "github_entity_stargazers_o/r"
+        assert len(entity["records"]) == 300
+        assert entity["total"] is None
+        assert entity["watermark"] == 3
+        # Only a deeper crawl replaces the entity
+        assert replaces({"watermark": 2})
+        assert not replaces({"watermark": 3})
+
+    @pytest.mark.asyncio
+    async def test_paginated_data_small_limit_uses_full_pages(
+        self, github_api_service, mock_redis_client
+    ):
+        requested_urls = []
+
+        async def get_formatted_page(url, formatter, cache_page=True):
+            requested_urls.append(url)
+            response = stargazers_page(1, last_page=10)
+            return response.links, await formatter(response)
+
+        github_api_service.get_formatted_page = get_formatted_page
+
+        stargazers = await github_api_service.get_stargazers_by_repo("o", "r", 20)
+
+        assert requested_urls == [
+            "https://api.github.com/repos/o/r/stargazers?per_page=100"
+        ]
+        assert len(stargazers) == 20
+        # A single page is needed, the number of pages isn't even looked up
+        mock_redis_client.get_cached_value_by_key.assert_called_once_with(
+            "github_entity_stargazers_o/r"
+        )
+
+    @pytest.mark.asyncio
+    async def test_entity_serves_smaller_limits(
+        self, github_api_service, mock_redis_client
+    ):
+        github_api_service.get_formatted_page = AsyncMock()
+        mock_redis_client.get_cached_value_by_key.return_value = {
+            "records": [{"login": f"user{i}", "html_url": ""} for i in range(200)],
+            "total": None,
+            "watermark": 2,
+        }
+
+        stargazers = await github_api_service.get_stargazers_by_repo("o", "r", 150)
+
+        assert [s["login"] for s in stargazers] == [f"user{i}" for i in range(150)]
+        github_api_service.get_formatted_page.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_entity_is_extended_by_bigger_limits(
+        self, github_api_service, mock_redis_client
+    ):
+        requested_urls = []
+
+        async def get_formatted_page(url, formatter, cache_page=True):
+            requested_urls.append(url)
+            page = int(url.split("&page=")[-1]) if "&page=" in url else 1
+            response = stargazers_page(page, last_page=2)
+            return response.links, await formatter(response)
+
+        async def get_cached_value_by_key(key):
+            if key == "github_entity_stargazers_o/r":
+                return {
+                    "records": [
+                        {"login": f"user{i}", "html_url": ""} for i in range(100)
+                    ],
+                    "total": None,
+                    "watermark": 1,
+                }
+            return None
+
+        github_api_service.get_formatted_page = get_formatted_page
+        mock_redis_client.get_cached_value_by_key.side_effect = get_cached_value_by_key
+
+        stargazers = await github_api_service.get_stargazers_by_repo("o", "r", 500)
+
+        assert [s["login"] for s in stargazers] == [f"user{i}" for i in range(200)]
+        # The crawl resumes after the watermark
+        assert requested_urls == [
+            "https://api.github.com/repos/o/r/stargazers?per_page=100&page=2"
+        ]
+        entity_key, entity, _ = (
+            mock_redis_client.compare_and_set_cache_value.call_args.args
+        )
+        assert entity == {"records": stargazers, "total": 200, "watermark": 2}
+
+    @pytest.mark.asyncio
+    async def test_complete_entity_serves_any_limit(
+        self, github_api_service, mock_redis_client
+    ):
+        github_api_service.get_formatted_page = AsyncMock()
+        mock_redis_client.get_cached_value_by_key.return_value = {
+            "records": ["o/r"],
+            "total": 1,
+            "watermark": 1,
+        }
+
+        assert await github_api_service.get_starred_repos_by_username("user") == (
+            "user",
+            ["o/r"],
+        )
+        github_api_service.get_formatted_page.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_page_fails_the_list(
+        self, github_api_service, mock_redis_client
+    ):
+        async def get_formatted_page(url, formatter, cache_page=True):
+            if url.endswith("&page=2"):
+                raise HTTPException(status_code=503)
+            return {"last": {"url": f"{url}&page=3"}}, ["o/r"]
+
+        github_api_service.get_formatted_page = get_formatted_page
+
+        # The user is counted as failed by the fan-out instead of missing stars
+        with pytest.raises(HTTPException):
+            await github_api_service.get_starred_repos_by_username("u", 300)
+        assert not any(
+            call.args[0].startswith("github_entity_")
+            for call in mock_redis_client.set_cache_value.call_args_list
+        )
+
+    @pytest.mark.asyncio
+    async def test_missing_repository_is_negatively_cached(
+        self, github_api_service, mock_redis_client
+    ):
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(404, json={"message": "Not Found"})
+            )
+        )
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            await github_api_service.get_stargazers_by_repo("o", "missing", 20)
+
+        assert exc_info.value.response.status_code == 404
+        cache_key, cached_value = mock_redis_client.set_cache_value.call_args.args
+        assert cache_key == (
+            "https://api.github.com/repos/o/missing/stargazers?per_page=100"
+            "|fields=login,html_url"
+        )
+        assert cached_value["status_code"] == 404
+        assert mock_redis_client.set_cache_value.call_args.kwargs["ex"] == 3600
+
+    @pytest.mark.asyncio
+    async def test_negative_cache_hit(self, github_api_service, mock_redis_client):
+        mock_redis_client.get_cached_value_by_key.return_value = {
+            "status_code": 404,
+            "content": '{"message": "Not Found"}',
+        }
+        github_api_service.send_request = AsyncMock()
+
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            await github_api_service.make_request("https://api.github.com/users/ghost")
+
+        assert exc_info.value.response.json() == {"message": "Not Found"}
+        github_api_service.send_request.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_deleted_user_has_no_starred_repos(
+        self, github_api_service, mock_redis_client
+    ):
+        mock_redis_client.get_cached_value_by_key.side_effect = lambda key: (
+            None
+            if key.startswith("github_entity_")
+            else {"status_code": 404, "content": ""}
+        )
+
+        assert await github_api_service.get_starred_repos_by_username("ghost") == (
+            "ghost",
+            [],
+        )
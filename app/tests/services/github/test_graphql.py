@@ -0,0 +1,182 @@
+from typing import Any
+from unittest.mock import AsyncMock, Mock
+
+import httpx
+import orjson
+import pytest
+
+from app.redis.engine import RedisClient
+from app.schemas.github import GitHubAPIResponseSchema
+from app.services.github.api import GitHubAPI
+from app.services.github.graphql import GitHubGraphQLAPI
+
+
+def graphql_response(aliases: dict[str, str], cost: int = 1, remaining: int = 4999):
+    data: dict[str, Any] = {
+        alias: (
+            None
+            if username == "ghost"
+            else {
+                "starredRepositories": {
+                    "nodes": [{"nameWithOwner": f"{username}/repo"}]
+                }
+            }
+        )
+        for alias, username in aliases.items()
+    }
+    data["rateLimit"] = {"cost": cost, "remaining": remaining, "resetAt": ""}
+    return GitHubAPIResponseSchema(
+        links={}, content=orjson.dumps({"data": data}).decode()
+    )
+
+
+class TestGitHubGraphQLAPI:
+    @pytest.fixture(autouse=True)
+    def reset_batch_size(self, monkeypatch):
+        monkeypatch.setattr(
+            GitHubGraphQLAPI, "batch_size", GitHubGraphQLAPI.INITIAL_BATCH_SIZE
+        )
+
+    @pytest.fixture
+    def mock_redis_client(self):
+        mock_client = Mock(spec=RedisClient)
+        mock_client.get_cached_values_by_keys = AsyncMock(
+            side_effect=lambda keys: [
+                (
+                    {"records": ["cached/repo"], "total": 1, "watermark": 1}
+                    if "cached" in key
+                    else None
+                )
+                for key in keys
+            ]
+        )
+        mock_client.compare_and_set_cache_value = AsyncMock(return_value=True)
+        mock_client.key_exists = AsyncMock(return_value=False)
+        return mock_client
+
+    @pytest.fixture
+    def graphql_api(self, mock_redis_client):
+        github_api = GitHubAPI(
+            base_url="https://api.github.com/",
+            redis_client=mock_redis_client,
+            token="test-token",
+        )
+        return GitHubGraphQLAPI(github_api)
+
+    def test_build_query(self):
+        query, aliases = GitHubGraphQLAPI.build_query(["joe", 'inj"ection'], 100)
+
+        assert aliases == {"u0": "joe", "u1": 'inj"ection'}
+        assert 'u0: user(login: "joe")' in query
+        assert 'u1: user(login: "inj\\"ection")' in query
+        assert "starredRepositories(first: 100" in query
+        assert "rateLimit { cost remaining resetAt }" in query
+
+    @pytest.mark.asyncio
+    async def test_get_starred_repos_by_usernames(self, graphql_api, mock_redis_client):
+        queries = []
+
+        async def make_request(query):
+            queries.append(query)
+            return graphql_response(
+                {
+                    alias: username
+                    for alias, username in GitHubGraphQLAPI.build_query(
+                        usernames_by_query[len(queries) - 1], 100
+                    )[1].items()
+                }
+            )
+
+        usernames = ["cached"] + [f"user{i}" for i in range(30)] + ["ghost"]
+        pending = usernames[1:]
+        batch_size = GitHubGraphQLAPI.INITIAL_BATCH_SIZE
+        usernames_by_query = [pending[:batch_size], pending[batch_size:]]
+        graphql_api.make_request = make_request
+
+        results = dict(await graphql_api.get_starred_repos_by_usernames(usernames))
+
+        assert len(queries) == 2
+        assert results["cached"] == ["cached/repo"]
+        assert results["user29"] == ["user29/repo"]
+        assert "ghost" not in results
+        assert len(results) == 31
+        # Stored in the entity records of the REST api
+        assert mock_redis_client.compare_and_set_cache_value.await_count == 30
+        entity_key, entity, _ = (
+            mock_redis_client.compare_and_set_cache_value.await_args_list[0].args
+        )
+        assert entity_key == "github_entity_starred_user0"
+        assert entity == {"records": ["user0/repo"], "total": 1, "watermark": 1}
+
+    @pytest.mark.asyncio
+    async def test_partial_lists_keep_deeper_entities(
+        self, graphql_api, mock_redis_client
+    ):
+        await graphql_api.cache_starred_repos(
+            "user0", [f"o/r{i}" for i in range(100)], 100
+        )
+
+        _, entity, replaces = (
+            mock_redis_client.compare_and_set_cache_value.await_args.args
+        )
+        assert entity["total"] is None
+        assert entity["watermark"] == 1
+        assert not replaces(
+            {"records": [f"o/r{i}" for i in range(200)], "total": None, "watermark": 2}
+        )
+        assert replaces({"records": ["o/r0"], "total": None, "watermark": 0})
+
+    @pytest.mark.asyncio
+    async def test_query_is_sent_through_the_retries(self, graphql_api):
+        statuses = iter([502, 200])
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            assert request.method == "POST"
+            assert b"starredRepositories" in request.content
+            return httpx.Response(next(statuses), json={"data": {"rateLimit": None}})
+
+        github_api = graphql_api.github_api
+        github_api.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        github_api.retry_policy.base_delay = 0
+        github_api.rate_limit_reached = AsyncMock(return_value=False)
+
+        response = await graphql_api.make_request(
+            GitHubGraphQLAPI.build_query(["joe"], 100)[0]
+        )
+
+        assert orjson.loads(response.content) == {"data": {"rateLimit": None}}
+        assert github_api.request_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_queries_are_retried_then_reported(self, graphql_api):
+        nb_queries = 0
+
+        async def make_request(query):
+            nonlocal nb_queries
+            nb_queries += 1
+            # GitHub answers a 200 without data when the query times out
+            return GitHubAPIResponseSchema(
+                links={},
+                content=orjson.dumps(
+                    {"errors": [{"message": "Something went wrong"}]}
+                ).decode(),
+            )
+
+        graphql_api.make_request = make_request
+        usernames = [f"user{i}" for i in range(5)]
+
+        results = await graphql_api.get_starred_repos_by_usernames(usernames)
+
+        assert nb_queries == GitHubGraphQLAPI.MAX_ATTEMPTS
+        assert len(results) == 5
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_adjust_batch_size(self, graphql_api):
+        graphql_api.adjust_batch_size({"cost": 1, "remaining": 4000}, 25)
+        assert graphql_api.batch_size == 50
+
+        # Only 40 points left for 4 parallel batches of users costing 1 point each
+        graphql_api.adjust_batch_size({"cost": 20, "remaining": 40}, 20)
+        assert graphql_api.batch_size == 10
+        # The size is kept for the next requests
+        assert GitHubGraphQLAPI(graphql_api.github_api).batch_size == 10
@@ -0,0 +1,219 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi import HTTPException
+from app.redis.engine import RedisClient
+from app.services.github import resilience
+from app.services.github.api import GitHubAPI
+from app.services.github.resilience import CircuitBreaker, RetryPolicy, hedged
+from app.services.github.scheduler import PriorityScheduler
+import httpx
+
+
+class TestRetryPolicy:
+    def test_retryable_statuses(self):
+        policy = RetryPolicy(3, 0.5, 10)
+
+        assert policy.is_retryable(httpx.Response(502))
+        assert not policy.is_retryable(httpx.Response(404))
+        # Throttling is only retried when GitHub tells us when
+        assert not policy.is_retryable(httpx.Response(403))
+        assert policy.is_retryable(httpx.Response(429, headers={"Retry-After": "2"}))
+
+    def test_delay(self):
+        policy = RetryPolicy(3, 0.5, 10)
+
+        assert (
+            policy.get_delay(0, httpx.Response(429, headers={"Retry-After": "7"})) == 7
+        )
+        assert all(0 <= policy.get_delay(2) <= 2 for _ in range(100))
+        assert all(policy.get_delay(10) <= 10 for _ in range(100))
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_time=30)
+
+        circuit_breaker.record_failure()
+        assert circuit_breaker.allow_request()
+        circuit_breaker.record_failure()
+
+        assert not circuit_breaker.allow_request()
+        assert 0 < circuit_breaker.retry_after <= 30
+
+    def test_half_open_single_trial(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        circuit_breaker.record_failure()
+
+        assert circuit_breaker.allow_request()
+        assert not circuit_breaker.allow_request()
+        circuit_breaker.record_success()
+        assert circuit_breaker.allow_request()
+        assert circuit_breaker.failures == 0
+
+    def test_cancelled_trial_is_handed_back(self):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        circuit_breaker.record_failure()
+
+        assert circuit_breaker.allow_request()
+        circuit_breaker.cancel_trial()
+        assert circuit_breaker.allow_request()
+
+
+class TestHedged:
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged(self):
+        calls = []
+
+        async def call():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+                return "slow"
+            return "fast"
+
+        assert await hedged(call, 0.01) == "fast"
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        call = AsyncMock(return_value="result")
+
+        assert await hedged(call, 1) == "result"
+        call.assert_called_once()
+
+
+class TestSendRequest:
+    @pytest.fixture(autouse=True)
+    def reset_circuit_breakers(self):
+        resilience._circuit_breakers.clear()
+        yield
+        resilience._circuit_breakers.clear()
+
+    @pytest.fixture
+    def github_api_service(self):
+        mock_redis_client = Mock(spec=RedisClient)
+        mock_redis_client.key_exists = AsyncMock(return_value=False)
+        mock_redis_client.set_cache_value = AsyncMock()
+        return GitHubAPI(
+            base_url="https://api.github.com/",
+            redis_client=mock_redis_client,
+            token="test-token",
+        )
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self, github_api_service):
+        statuses = iter([502, 503, 200])
+
+        def handler(request):
+            return httpx.Response(next(statuses), json=[])
+
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+
+        with patch("app.services.github.api.asyncio.sleep", new=AsyncMock()):
+            response, body = await github_api_service.send_request(
+                "https://api.github.com/users/u/starred"
+            )
+
+        assert response.status_code == 200
+        assert body == b"[]"
+        assert github_api_service.request_count == 3
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self, github_api_service):
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+
+        with pytest.raises(httpx.HTTPStatusError):
+            await github_api_service.send_request("https://api.github.com/users/u")
+        assert github_api_service.request_count == 1
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self, github_api_service):
+        def handler(request):
+            raise httpx.ConnectError("connection refused")
+
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        url = "https://api.github.com/users/u"
+
+        with patch("app.services.github.api.asyncio.sleep", new=AsyncMock()):
+            for _ in range(4):
+                with pytest.raises(HTTPException):
+                    await github_api_service.send_request(url)
+            request_count = github_api_service.request_count
+
+            with pytest.raises(HTTPException) as exc_info:
+                await github_api_service.send_request(url)
+
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+        # No call is sent to GitHub while the circuit is open
+        assert github_api_service.request_count == request_count
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "url, nb_calls",
+        [
+            ("https://api.github.com/users/u/starred", 2),
+            ("https://api.github.com/repos/o/r/stargazers", 1),
+        ],
+    )
+    async def test_only_fan_out_calls_are_hedged(
+        self, github_api_service, monkeypatch, url, nb_calls
+    ):
+        monkeypatch.setattr("app.services.github.api.settings.github_hedge_delay", 0.01)
+
+        async def handler(request):
+            if github_api_service.request_count == 1:
+                await asyncio.sleep(0.05)
+            return httpx.Response(200, json=[])
+
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+
+        await github_api_service.send_request(url)
+
+        assert github_api_service.request_count == nb_calls
+
+    @pytest.mark.asyncio
+    async def test_failed_trial_without_answer_keeps_the_circuit_usable(
+        self, github_api_service
+    ):
+        circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        circuit_breaker.record_failure()
+        resilience._circuit_breakers["api.github.com"] = circuit_breaker
+        # The bulk lane is out of rate limit budget
+        github_api_service.fetch = AsyncMock(side_effect=HTTPException(429))
+
+        with pytest.raises(HTTPException):
+            await github_api_service.send_request("https://api.github.com/users/u")
+
+        assert circuit_breaker.allow_request()
+
+    @pytest.mark.asyncio
+    async def test_hedge_delay_starts_with_the_slot(
+        self, github_api_service, monkeypatch
+    ):
+        monkeypatch.setattr("app.services.github.api.settings.github_hedge_delay", 0.01)
+        scheduler = github_api_service.scheduler = PriorityScheduler(2)
+        github_api_service.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        )
+
+        async def hold_slot():
+            async with scheduler.slot():
+                await asyncio.sleep(0.05)
+
+        holders = [asyncio.create_task(hold_slot()) for _ in range(2)]
+        await asyncio.sleep(0)
+        await github_api_service.send_request("https://api.github.com/users/u/starred")
+        await asyncio.gather(*holders)
+
+        # The time spent waiting for a slot doesn't trigger the hedge
+        assert github_api_service.request_count == 1
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from time import time
+
+from fastapi import HTTPException
+
+from app.services.github.scheduler import Priority, PriorityScheduler, github_priority
+
+NO_RESERVATION = {lane: 0 for lane in Priority}
+
+
+class TestPriorityScheduler:
+    @pytest.mark.asyncio
+    async def test_interactive_calls_overtake_queued_bulk_calls(self):
+        scheduler = PriorityScheduler(1, NO_RESERVATION)
+        order = []
+
+        async def call(priority: Priority, name: str):
+            with github_priority(priority):
+                async with scheduler.slot():
+                    order.append(name)
+                    await asyncio.sleep(0)
+
+        with github_priority(Priority.BULK):
+            async with scheduler.slot():
+                tasks = [
+                    asyncio.create_task(call(Priority.BULK, "bulk")),
+                    asyncio.create_task(call(Priority.REFRESH, "refresh")),
+                    asyncio.create_task(call(Priority.INTERACTIVE, "interactive")),
+                ]
+                await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        assert order == ["interactive", "refresh", "bulk"]
+        assert scheduler.in_use == {lane: 0 for lane in Priority}
+
+    @pytest.mark.asyncio
+    async def test_reserved_slots(self):
+        scheduler = PriorityScheduler(
+            4, {Priority.INTERACTIVE: 0.5, Priority.REFRESH: 0, Priority.BULK: 0}
+        )
+        scheduler.in_use[Priority.BULK] = 2
+        scheduler.waiters[Priority.INTERACTIVE].append(
+            asyncio.get_running_loop().create_future()
+        )
+
+        # The two free slots are kept for the waiting interactive calls
+        assert not scheduler.can_run(Priority.BULK)
+        assert scheduler.can_run(Priority.INTERACTIVE)
+
+    @pytest.mark.asyncio
+    async def test_lanes_spare_the_rate_limit(self):
+        scheduler = PriorityScheduler(10)
+        scheduler.update_rate_limit(remaining=10, limit=100, reset=time() + 3600)
+
+        async with scheduler.slot():
+            pass
+        with pytest.raises(HTTPException) as error:
+            await scheduler.acquire(Priority.REFRESH)
+
+        # The refresh request isn't held until the reset
+        assert error.value.status_code == 429
+        assert not scheduler.waiters[Priority.REFRESH]
+        assert scheduler.can_run(Priority.INTERACTIVE)
+
+    @pytest.mark.asyncio
+    async def test_spent_rate_limit_fails_fast(self):
+        scheduler = PriorityScheduler(10)
+        scheduler.update_rate_limit(remaining=0, limit=100, reset=time() + 3600)
+
+        with pytest.raises(HTTPException) as error:
+            await scheduler.acquire(Priority.INTERACTIVE)
+
+        assert error.value.status_code == 403
+        assert "GitHub rate limit reached" in error.value.detail["error"]
+        assert int(error.value.headers["Retry-After"]) > 3500
+
+    @pytest.mark.asyncio
+    async def test_lanes_not_rejected_pause(self):
+        scheduler = PriorityScheduler(10, rejected_lanes=frozenset())
+        scheduler.update_rate_limit(remaining=10, limit=100, reset=time() + 3600)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acquire(Priority.REFRESH), 0.01)
+
+        # The cancelled call left the queue
+        assert not scheduler.waiters[Priority.REFRESH]
+
+    @pytest.mark.asyncio
+    async def test_bulk_calls_are_rejected_below_their_floor(self):
+        scheduler = PriorityScheduler(1, NO_RESERVATION)
+        scheduler.update_rate_limit(remaining=30, limit=100, reset=time() + 60)
+
+        with pytest.raises(HTTPException) as error:
+            await scheduler.acquire(Priority.BULK)
+
+        assert error.value.status_code == 429
+        assert 0 < int(error.value.headers["Retry-After"]) <= 60
+        assert scheduler.can_run(Priority.REFRESH)
+
+    @pytest.mark.asyncio
+    async def test_queued_bulk_calls_are_rejected_below_their_floor(self):
+        scheduler = PriorityScheduler(1, NO_RESERVATION)
+        await scheduler.acquire(Priority.INTERACTIVE)
+        waiting = asyncio.create_task(scheduler.acquire(Priority.BULK))
+        await asyncio.sleep(0)
+
+        scheduler.update_rate_limit(remaining=30, limit=100, reset=time() + 60)
+
+        with pytest.raises(HTTPException):
+            await waiting
+        assert not scheduler.waiters[Priority.BULK]
+        assert scheduler.in_use[Priority.BULK] == 0
@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import Mock
+from fastapi import HTTPException
+from app.benchmarks.memory_redis import get_memory_redis_client
+from app.models import User
+from app.services.admission import (
+    AdmissionController,
+    estimate_star_neighbours_calls,
+)
+from app.services.github.api import GitHubAPI
+
+
+class TestAdmissionController:
+    @pytest.fixture
+    def controller(self):
+        controller = AdmissionController(get_memory_redis_client())
+        controller.quota = 100
+        controller.max_concurrent_requests = 2
+        return controller
+
+    @pytest.fixture
+    def user(self):
+        return User(id="00000000-0000-0000-0000-000000000001", email="user@test.com")
+
+    @pytest.mark.asyncio
+    async def test_quota_in_github_calls(self, controller, user):
+        async with controller.admit(user, 60):
+            pass
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with controller.admit(user, 60):
+                pass
+
+        assert exc_info.value.status_code == 429
+        assert int(exc_info.value.headers["Retry-After"]) >= 1
+
+    @pytest.mark.asyncio
+    async def test_quota_is_corrected_with_the_actual_calls(self, controller, user):
+        github_api = Mock(spec=GitHubAPI)
+        # Served from the cache
+        github_api.request_count = 0
+        async with controller.admit(user, 60, github_api):
+            pass
+
+        async with controller.admit(user, 60):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap(self, controller, user):
+        async with controller.admit(user, 1):
+            async with controller.admit(user, 1):
+                with pytest.raises(HTTPException) as exc_info:
+                    async with controller.admit(user, 1):
+                        pass
+
+        assert exc_info.value.headers["Retry-After"] == "1"
+        # The slots are released
+        async with controller.admit(user, 1):
+            pass
+
+    @pytest.mark.asyncio
+    async def test_load_shedding(self, controller, user, monkeypatch):
+        monkeypatch.setattr(GitHubAPI, "pending_calls", 10**6)
+
+        with pytest.raises(HTTPException) as exc_info:
+            async with controller.admit(user, 1):
+                pass
+
+        assert exc_info.value.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_star_neighbours_estimate(self):
+        def request(**params):
+            return Mock(query_params=params)
+
+        assert (
+            await estimate_star_neighbours_calls(request(max_stargazers="250")) == 253
+        )
+        assert await estimate_star_neighbours_calls(request()) == 21
+        assert await estimate_star_neighbours_calls(request(source="store")) == 0
+        assert (
+            await estimate_star_neighbours_calls(
+                request(max_stargazers="1000", approx="true")
+            )
+            == 10
+        )
@@ -0,0 +1,94 @@
+import httpx
+import pytest
+
+from app.benchmarks.github_stub import SyntheticStarGraph, create_github_stub
+from app.benchmarks.memory_redis import MemoryRedis, get_memory_redis_client
+from app.redis.keys import KeyInfo, get_key_namespace, parse_cache_key
+from app.services.cache_admin import CacheAdmin
+from app.services.github.api import GitHubAPI
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        (
+            "https://api.github.com/repos/o/r/stargazers?per_page=100&page=2",
+            KeyInfo("github:stargazers", "repo", "o/r"),
+        ),
+        (
+            "https://api.github.com/users/u/starred?per_page=100",
+            KeyInfo("github:starred", "user", "u"),
+        ),
+        (
+            "https://api.github.com/repos/o/r",
+            KeyInfo("github:repository", "repo", "o/r"),
+        ),
+        (
+            "github_nb_pages_repos/o/r/stargazers",
+            KeyInfo("github:pages", "repo", "o/r"),
+        ),
+        ("github_entity_starred_u", KeyInfo("github:starred", "user", "u")),
+        ("graphql_starred_u_100", KeyInfo("github:starred", "user", "u")),
+        ("minhash_signature_o/r", KeyInfo("sketch:signature", "repo", "o/r")),
+        ("quota_1_42", KeyInfo("admission")),
+        ("webhook_delivery_abc", KeyInfo("webhook")),
+        ("unknown", KeyInfo(None)),
+    ],
+)
+def test_parse_cache_key(key, expected):
+    assert parse_cache_key(key) == expected
+
+
+def test_stored_key_namespace():
+    assert get_key_namespace("github:stargazers:abc") == "github:stargazers"
+    assert get_key_namespace("index:repo:o/r") == "index:repo"
+    assert get_key_namespace("abc") == "other"
+
+
+class TestCacheAdmin:
+    @pytest.fixture
+    def redis(self):
+        return MemoryRedis()
+
+    @pytest.fixture
+    def github_api(self, redis):
+        stub = create_github_stub(SyntheticStarGraph(nb_users=500, nb_repos=100))
+        return GitHubAPI(
+            base_url="http://github.stub/",
+            redis_client=get_memory_redis_client(redis),
+            transport=httpx.ASGITransport(app=stub),
+        )
+
+    @pytest.mark.asyncio
+    async def test_stats_per_namespace(self, github_api):
+        stargazers = await github_api.get_stargazers_by_repo("bench", "repo0", 20)
+        for stargazer in stargazers[:5]:
+            await github_api.get_starred_repos_by_username(stargazer["login"])
+
+        stats = await CacheAdmin(github_api.redis_client).get_stats()
+
+        namespaces = {stats.namespace: stats for stats in stats.namespaces}
+        # An entity record for the repository and each user
+        assert namespaces["github:stargazers"].keys == 1
+        assert namespaces["github:starred"].keys == 5
+        assert namespaces["index:user"].keys == 5
+        assert namespaces["github:starred"].bytes > 0
+        assert stats.keys == sum(stats.keys for stats in stats.namespaces)
+        assert namespaces["github:stargazers"].hit_ratio is not None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_repo(self, github_api, redis):
+        await github_api.get_stargazers_by_repo("bench", "repo0", 20)
+        await github_api.get_stargazers_by_repo("bench", "repo1", 20)
+        request_count = github_api.request_count
+
+        result = await CacheAdmin(github_api.redis_client).invalidate(
+            "repo", "Bench/Repo0"
+        )
+
+        assert result.deleted_keys == 1
+        assert "index:repo:bench/repo0" not in redis.values
+        await github_api.get_stargazers_by_repo("bench", "repo1", 20)
+        assert github_api.request_count == request_count
+        await github_api.get_stargazers_by_repo("bench", "repo0", 20)
+        assert github_api.request_count == request_count + 1
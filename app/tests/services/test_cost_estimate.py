@@ -0,0 +1,77 @@
+import pytest
+from app.schemas.github import SamplingStrategy
+from app.benchmarks.github_stub import SyntheticStarGraph, create_github_stub
+from app.benchmarks.memory_redis import get_memory_redis_client
+from app.services.cost_estimate import estimate_star_neighbours
+from app.services.github.api import GitHubAPI
+import httpx
+
+
+class TestEstimateStarNeighbours:
+    @pytest.fixture
+    def github_api(self):
+        stub = create_github_stub(SyntheticStarGraph(nb_users=500, nb_repos=100))
+        return GitHubAPI(
+            base_url="http://github.stub/",
+            redis_client=get_memory_redis_client(),
+            transport=httpx.ASGITransport(app=stub),
+        )
+
+    @pytest.mark.asyncio
+    async def test_cold_cache(self, github_api):
+        estimate = await estimate_star_neighbours(github_api, "bench", "repo0", 20)
+
+        assert estimate.github_calls == 21
+        assert estimate.cached_requests == 0
+        assert estimate.expected_latency > 0
+        assert github_api.request_count == 0
+
+    @pytest.mark.asyncio
+    async def test_partially_cached(self, github_api):
+        stargazers = await github_api.get_stargazers_by_repo("bench", "repo0", 20)
+        for stargazer in stargazers[:5]:
+            await github_api.get_starred_repos_by_username(stargazer["login"])
+        request_count = github_api.request_count
+
+        estimate = await estimate_star_neighbours(github_api, "bench", "repo0", 20)
+
+        assert estimate.stargazers == 20
+        assert estimate.cached_requests == 6
+        assert estimate.github_calls == 15
+        assert estimate.rate_limit_remaining_after == estimate.rate_limit_remaining - 15
+        # Nothing was fetched
+        assert github_api.request_count == request_count
+
+    @pytest.mark.asyncio
+    async def test_smaller_limit_served_by_entity(self, github_api):
+        await github_api.get_stargazers_by_repo("bench", "repo0", 150)
+
+        estimate = await estimate_star_neighbours(github_api, "bench", "repo0", 120)
+
+        assert estimate.stargazers == 120
+        assert estimate.github_calls == 120
+        assert estimate.cached_requests == 1
+
+    @pytest.mark.asyncio
+    async def test_bigger_limit_resumes_the_entity(self, github_api):
+        await github_api.get_stargazers_by_repo("bench", "repo0", 150)
+
+        estimate = await estimate_star_neighbours(github_api, "bench", "repo0", 250)
+
+        # The entity is cached, only the third stargazers page is left
+        assert estimate.cached_requests == 1
+        assert estimate.github_calls == 1 + 250
+
+    @pytest.mark.asyncio
+    async def test_sampled_pages_cached(self, github_api):
+        await github_api.get_stargazers_by_repo(
+            "bench", "repo0", 20, SamplingStrategy.UNIFORM
+        )
+
+        estimate = await estimate_star_neighbours(
+            github_api, "bench", "repo0", 20, SamplingStrategy.UNIFORM
+        )
+
+        # The pruned stargazers page is found, only the starred lists are left
+        assert estimate.cached_requests == 1
+        assert estimate.github_calls == 20
@@ -0,0 +1,103 @@
+import os
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from app.cli import build_neighbour_index
+from app.cli.build_neighbour_index import compute_neighbours
+from app.services import neighbour_index as neighbour_index_module
+from app.services.neighbour_index import (
+    NeighbourIndex,
+    get_neighbour_index,
+    write_neighbour_index,
+)
+
+# user -> starred repositories
+STARS = {
+    1: [0, 1, 2],
+    2: [0, 1],
+    3: [0, 2],
+    4: [1],
+}
+NAMES = ["encode/starlette", "encode/uvicorn", "tiangolo/fastapi"]
+
+
+@pytest.fixture
+def neighbour_index(tmp_path):
+    stars = [(user, repo) for user, repos in STARS.items() for repo in repos]
+    path = str(tmp_path / "neighbours.idx")
+    write_neighbour_index(
+        path, NAMES, compute_neighbours(stars, top_k=2, min_stargazers=3), top_k=2
+    )
+    index = NeighbourIndex(path)
+    yield index
+    index.close()
+
+
+class TestNeighbourIndex:
+    def test_get_neighbours(self, neighbour_index):
+        assert neighbour_index.get_neighbours("encode/starlette") == [
+            ("encode/starlette", 3),
+            ("encode/uvicorn", 2),
+        ]
+        assert neighbour_index.get_neighbours("encode/uvicorn") == [
+            ("encode/uvicorn", 3),
+            ("encode/starlette", 2),
+        ]
+
+    def test_repository_not_covered(self, neighbour_index):
+        # Known name but less stargazers than min_stargazers
+        assert neighbour_index.get_id("tiangolo/fastapi") == 2
+        assert neighbour_index.get_neighbours("tiangolo/fastapi") is None
+        assert neighbour_index.get_neighbours("unknown/repo") is None
+
+    def test_invalid_file(self, tmp_path):
+        path = tmp_path / "invalid.idx"
+        path.write_bytes(b"\0" * 64)
+
+        with pytest.raises(ValueError):
+            NeighbourIndex(str(path))
+
+    def test_build_merges_repositories_sharing_a_name(self, tmp_path, monkeypatch):
+        star_repository = Mock()
+        # The repository 3 was deleted, and recreated under the same name as 2
+        star_repository.get_repository_names.return_value = {
+            1: "encode/starlette",
+            2: "encode/uvicorn",
+            3: "encode/uvicorn",
+        }
+        star_repository.iter_stars.return_value = [(1, 1), (1, 2), (1, 3), (2, 3)]
+        monkeypatch.setattr(build_neighbour_index, "SessionLocal", MagicMock())
+        monkeypatch.setattr(
+            build_neighbour_index, "StarRepository", lambda session: star_repository
+        )
+        path = str(tmp_path / "neighbours.idx")
+
+        assert build_neighbour_index.build(path, top_k=2, min_stargazers=1) == 2
+
+        index = NeighbourIndex(path)
+        assert index.nb_repos == 2
+        assert index.get_neighbours("encode/uvicorn") == [
+            ("encode/uvicorn", 2),
+            ("encode/starlette", 1),
+        ]
+        index.close()
+
+    def test_rebuilt_index_is_reopened(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "neighbours.idx")
+        write_neighbour_index(path, NAMES, [(0, [(0, 1)])], top_k=1)
+        monkeypatch.setattr(
+            neighbour_index_module.settings, "neighbour_index_path", path
+        )
+        monkeypatch.setattr(neighbour_index_module, "_neighbour_index", None)
+        previous_index = get_neighbour_index()
+
+        write_neighbour_index(path, NAMES, [(1, [(1, 1)])], top_k=1)
+        os.utime(path, ns=(0, 0))
+        index = get_neighbour_index()
+
+        assert index is not previous_index
+        assert index.get_neighbours("encode/uvicorn") == [("encode/uvicorn", 1)]
+        # The previous mapping is released
+        assert previous_index._mmap.closed
+        index.close()
@@ -0,0 +1,110 @@
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from app.redis.engine import RedisClient
+from app.services.sketch import MinHasher, SketchIndex
+
+
+@pytest.fixture
+def mock_redis_client():
+    values: dict = {}
+    sets: dict = {}
+
+    async def get_cached_values_by_keys(keys):
+        return [values.get(key) for key in keys]
+
+    async def set_cache_values(new_values, ex=None):
+        values.update(new_values)
+
+    async def add_set_members(members_by_key, ex=None):
+        for key, members in members_by_key.items():
+            sets.setdefault(key, set()).update(members)
+
+    async def remove_set_members(members_by_key):
+        for key, members in members_by_key.items():
+            sets.get(key, set()).difference_update(members)
+
+    async def get_random_set_members(keys, count):
+        return [list(sets.get(key, set()))[:count] for key in keys]
+
+    client = Mock(spec=RedisClient)
+    client.get_cached_values_by_keys = AsyncMock(side_effect=get_cached_values_by_keys)
+    client.set_cache_values = AsyncMock(side_effect=set_cache_values)
+    client.add_set_members = AsyncMock(side_effect=add_set_members)
+    client.remove_set_members = AsyncMock(side_effect=remove_set_members)
+    client.get_random_set_members = AsyncMock(side_effect=get_random_set_members)
+    return client
+
+
+class TestMinHasher:
+    def test_jaccard_estimation(self):
+        minhasher = MinHasher(num_perm=256)
+        a = {f"user{i}" for i in range(100)}
+        b = {f"user{i}" for i in range(50, 150)}
+        signatures = minhasher.signatures({"a": a, "b": b})
+
+        similarity, error = minhasher.jaccard(signatures["a"], signatures["b"])
+
+        # Exact Jaccard similarity is 50 / 150
+        assert abs(similarity - 1 / 3) < 4 * error
+        assert 0 < error < 0.1
+
+    def test_merge_is_union(self):
+        minhasher = MinHasher()
+        signatures = minhasher.signatures(
+            {"a": {"u1", "u2"}, "b": {"u3"}, "union": {"u1", "u2", "u3"}}
+        )
+
+        assert minhasher.merge(signatures["a"], signatures["b"]) == signatures["union"]
+
+
+class TestSketchIndex:
+    @pytest.mark.asyncio
+    async def test_similar_repos(self, mock_redis_client):
+        sketch_index = SketchIndex(mock_redis_client)
+        stargazers = {f"user{i}" for i in range(20)}
+        await sketch_index.update(
+            {
+                "owner/repo": stargazers,
+                "owner/twin": stargazers,
+                "owner/lonely": {"user1"},
+            }
+        )
+
+        similar_repos = await sketch_index.get_similar_repos("owner/repo")
+
+        assert similar_repos == [("owner/twin", 1.0, 0.0)]
+        assert await sketch_index.get_similar_repos("owner/lonely") is None
+
+    @pytest.mark.asyncio
+    async def test_update_moves_buckets(self, mock_redis_client):
+        sketch_index = SketchIndex(mock_redis_client)
+        await sketch_index.update({"owner/repo": {"user1", "user2"}})
+        await sketch_index.update({"owner/repo": {"user3", "user4"}})
+
+        [signature] = await sketch_index.get_signatures(["owner/repo"])
+        expected = sketch_index.minhasher.signatures(
+            {"union": {"user1", "user2", "user3", "user4"}}
+        )["union"]
+        assert signature == expected
+        mock_redis_client.remove_set_members.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_single_stargazer_extends_known_signatures_only(
+        self, mock_redis_client
+    ):
+        sketch_index = SketchIndex(mock_redis_client)
+        await sketch_index.update({"owner/repo": {"user1", "user2"}})
+        await sketch_index.update({"owner/repo": {"user3"}, "owner/new": {"user3"}})
+
+        signature, new_signature = await sketch_index.get_signatures(
+            ["owner/repo", "owner/new"]
+        )
+        assert (
+            signature
+            == sketch_index.minhasher.signatures(
+                {"union": {"user1", "user2", "user3"}}
+            )["union"]
+        )
+        assert new_signature is None
@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from prometheus_client import REGISTRY
+from app.main import app
+from app.redis.engine import RedisClient
+from app.routers import metrics
+from app.services.github.api import GitHubAPI
+import httpx
+
+
+class TestMetrics:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(metrics.settings, "metrics_token", "scrape-token")
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    @pytest.mark.asyncio
+    async def test_exposition(self, client):
+        response = await client.get(
+            "/metrics", headers={"Authorization": "Bearer scrape-token"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "# TYPE githubble_github_calls_total counter" in response.text
+
+    @pytest.mark.asyncio
+    async def test_scrapes_are_authenticated(self, client, monkeypatch):
+        response = await client.get(
+            "/metrics", headers={"Authorization": "Bearer wrong-token"}
+        )
+        assert response.status_code == 401
+        assert (await client.get("/metrics")).status_code == 401
+
+        monkeypatch.setattr(metrics.settings, "metrics_token", None)
+        assert (await client.get("/metrics")).status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_github_calls_are_counted(self):
+        redis_client = Mock(spec=RedisClient)
+        redis_client.get_cached_value_by_key = AsyncMock(return_value=None)
+        redis_client.set_cache_value = AsyncMock()
+        redis_client.key_exists = AsyncMock(return_value=False)
+        github_api = GitHubAPI(
+            base_url="https://api.github.com/",
+            redis_client=redis_client,
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[])),
+        )
+        labels = {"token": "anonymous", "endpoint": "starred"}
+        nb_calls = REGISTRY.get_sample_value("githubble_github_calls_total", labels)
+
+        await github_api.get_starred_repos_by_username("u")
+
+        assert (
+            REGISTRY.get_sample_value("githubble_github_calls_total", labels)
+            == (nb_calls or 0) + 1
+        )
@@ -0,0 +1,142 @@
+from unittest.mock import MagicMock, Mock
+
+import httpx
+import pytest
+
+from app import models
+
+from app.benchmarks.memory_redis import MemoryRedis, get_memory_redis_client
+from app.main import app
+from app.redis.engine import RedisClient, local_cache
+from app.routers import health
+
+STARRED_URL = "https://api.github.com/users/user1/starred?per_page=100"
+
+
+class TestHotKeysPreload:
+    @pytest.fixture(autouse=True)
+    def clear_local_cache(self):
+        local_cache.values.clear()
+        yield
+        local_cache.values.clear()
+
+    @pytest.mark.asyncio
+    async def test_hot_keys_are_served_locally(self):
+        redis = MemoryRedis()
+        redis_client = get_memory_redis_client(redis)
+        await redis_client.set_cache_value(STARRED_URL, {"content": "hot"})
+        await redis_client.set_cache_value("github_entity_starred_cold", [])
+        hot_key = await redis_client.generate_cache_key(STARRED_URL)
+        await redis.zincrby(RedisClient.HOT_KEYS_KEY, 100, hot_key)
+
+        assert await redis_client.preload_hot_keys(10) == 1
+
+        await redis.delete(hot_key)
+        assert await redis_client.get_cached_value_by_key(STARRED_URL) == {
+            "content": "hot"
+        }
+
+    @pytest.mark.asyncio
+    async def test_entity_records_arent_served_locally(self):
+        redis_client = get_memory_redis_client()
+        entity_key = "github_entity_starred_user1"
+        await redis_client.set_cache_value(entity_key, {"records": ["fresh"]})
+        hashed_key = await redis_client.generate_cache_key(entity_key)
+        # Preloaded before the entity was patched by another worker
+        local_cache.set_many({hashed_key: '{"records": ["stale"]}'})
+
+        assert await redis_client.get_cached_value_by_key(entity_key) == {
+            "records": ["fresh"]
+        }
+
+    @pytest.mark.asyncio
+    async def test_writes_discard_local_values(self):
+        redis_client = get_memory_redis_client()
+        hot_key = await redis_client.generate_cache_key(STARRED_URL)
+        local_cache.set_many({hot_key: '{"content": "stale"}'})
+
+        await redis_client.set_cache_value(STARRED_URL, {"content": "fresh"})
+
+        assert await redis_client.get_cached_values_by_keys([STARRED_URL]) == [
+            {"content": "fresh"}
+        ]
+
+
+class TestInitDb:
+    @pytest.fixture
+    def session(self, monkeypatch):
+        session = MagicMock()
+        session.__enter__.return_value = session
+        monkeypatch.setattr(models, "SessionLocal", Mock(return_value=session))
+        monkeypatch.setattr(models.Base.metadata, "create_all", Mock())
+        monkeypatch.setattr(models, "SCHEMA_VERSION", 3)
+        monkeypatch.setattr(
+            models, "MIGRATIONS", {2: ["ALTER 2"], 3: ["ALTER 3a", "ALTER 3b"]}
+        )
+        return session
+
+    def executed(self, session):
+        return [str(call.args[0]) for call in session.execute.call_args_list]
+
+    def test_migrations_above_the_recorded_version(self, session):
+        session.query.return_value.scalar.return_value = 2
+
+        models.init_db()
+
+        assert self.executed(session) == ["ALTER 3a", "ALTER 3b"]
+        assert session.merge.call_args.args[0].version == 3
+        session.commit.assert_called_once()
+
+    def test_unversioned_database_is_fully_migrated(self, session):
+        session.query.return_value.scalar.return_value = None
+
+        models.init_db()
+
+        assert self.executed(session) == ["ALTER 2", "ALTER 3a", "ALTER 3b"]
+
+
+class TestHealth:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(health, "get_redis_client", get_memory_redis_client)
+        monkeypatch.setattr(health, "ping_db", lambda: None)
+        monkeypatch.setattr(app.state, "warm", True, raising=False)
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    @pytest.mark.asyncio
+    async def test_ready(self, client):
+        response = await client.get("/health/ready")
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["status"] == "ready"
+        assert body["dependencies"]["redis"]["latency_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_unavailable_dependency(self, client, monkeypatch):
+        def ping_db():
+            raise ConnectionError("connection refused")
+
+        monkeypatch.setattr(health, "ping_db", ping_db)
+
+        response = await client.get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["dependencies"]["postgres"] == {
+            "ok": False,
+            "latency_ms": None,
+            "error": "connection refused",
+        }
+        # Liveness doesn't depend on the dependencies
+        assert (await client.get("/health/live")).status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_cold_worker_isnt_ready(self, client, monkeypatch):
+        monkeypatch.setattr(app.state, "warm", False)
+
+        response = await client.get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["warm"] is False
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi import APIRouter, FastAPI
+from app.profiling import profiling_middleware
+from app.timing import TimedRoute, server_timing_middleware, timed
+import httpx
+
+
+def create_app() -> FastAPI:
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/neighbours")
+    async def get_neighbours() -> dict[str, int]:
+        with timed("fanout"):
+            await asyncio.gather(*[asyncio.sleep(0.01) for _ in range(3)])
+        with timed("sort"):
+            pass
+        return {"repo": 1}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.middleware("http")(server_timing_middleware)
+    app.middleware("http")(profiling_middleware)
+    return app
+
+
+async def get(url: str, **kwargs) -> httpx.Response:
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_app()), base_url="http://test"
+    ) as client:
+        return await client.get(url, **kwargs)
+
+
+class TestServerTiming:
+    @pytest.mark.asyncio
+    async def test_phases_header(self):
+        response = await get("/neighbours")
+
+        phases = dict(
+            phase.split(";dur=")
+            for phase in response.headers["Server-Timing"].split(", ")
+        )
+        assert list(phases) == ["fanout", "sort", "serialize", "total"]
+        assert float(phases["fanout"]) >= 10
+        assert float(phases["total"]) >= float(phases["fanout"])
+        assert response.json() == {"repo": 1}
+
+    def test_timed_outside_of_a_request(self):
+        with timed("fanout"):
+            pass
+
+
+class TestProfiling:
+    @pytest.mark.asyncio
+    async def test_reserved_to_admins(self):
+        with patch("app.profiling.is_admin_api_key", return_value=False):
+            response = await get("/neighbours?profile=1", headers={"X-API-Key": "key"})
+
+        assert response.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_admin_gets_the_report(self):
+        with patch("app.profiling.is_admin_api_key", return_value=True):
+            response = await get("/neighbours?profile=1", headers={"X-API-Key": "key"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        assert "pyinstrument" in response.text
@@ -0,0 +1,79 @@
+"""
+Per-request phases timing, returned in the Server-Timing header.
+
+The phases are accumulated in a context variable set by the middleware, so the
+services time their work with `timed(phase)` without threading any state, and
+concurrent fan-out tasks add up in the same request.
+"""
+
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Iterator
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+
+class Timings:
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+        self.endpoint_end: float | None = None
+
+    def add(self, phase: str, duration: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0) + duration
+
+    def header(self, total: float) -> str:
+        return ", ".join(
+            f"{phase};dur={duration * 1000:.1f}"
+            for phase, duration in (*self.phases.items(), ("total", total))
+        )
+
+
+_timings: ContextVar[Timings | None] = ContextVar("timings", default=None)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        if timings := _timings.get():
+            timings.add(phase, perf_counter() - start)
+
+
+class TimedRoute(APIRoute):
+    """
+    Marks the end of the endpoint function, what follows until the response is
+    the serialization of the returned model
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        @functools.wraps(endpoint)
+        async def timed_endpoint(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if timings := _timings.get():
+                    timings.endpoint_end = perf_counter()
+
+        super().__init__(path, timed_endpoint, **kwargs)
+
+
+async def server_timing_middleware(
+    request: Request, call_next: Callable[[Request], Any]
+) -> Response:
+    timings = Timings()
+    token = _timings.set(timings)
+    start = perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _timings.reset(token)
+    end = perf_counter()
+    if timings.endpoint_end:
+        timings.add("serialize", end - timings.endpoint_end)
+    response.headers["Server-Timing"] = timings.header(end - start)
+    return response